@@ -0,0 +1,161 @@
+"""
+Drive the full upload + /compare pipeline of a running app against the local Azure OpenAI
+stand-in and report latency percentiles, throughput and the model traffic it caused.
+
+Typical use (two terminals):
+    python benchmarks/bench_compare.py --mock-port 8090 --requests 50 --concurrency 8
+    cd src && AZURE_AI_ENDPOINT=http://127.0.0.1:8090 AZURE_AI_API_KEY=mock python main.py
+
+The benchmark starts the mock in-process, waits for the app at --app-url, then replays
+the comparisons. Use --mock-url instead of --mock-port to read stats from a mock that
+is already running.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_azure_openai import MockAzureOpenAIServer, add_config_arguments, config_from_args  # noqa: E402
+
+UPLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "uploads")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(latencies):
+    return {
+        "count": len(latencies),
+        "mean_s": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p90_s": round(percentile(latencies, 90), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "max_s": round(max(latencies), 4) if latencies else 0.0,
+    }
+
+
+def wait_for_app(app_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{app_url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def run_compare(session, app_url, doc1_path, doc2_path, timeout):
+    """
+    Upload both documents through the index form and follow the redirect into /compare.
+    Returns (ok, seconds).
+    """
+    start = time.perf_counter()
+    try:
+        with open(doc1_path, "rb") as f1, open(doc2_path, "rb") as f2:
+            response = session.post(
+                f"{app_url}/",
+                files={
+                    "document1": (os.path.basename(doc1_path), f1),
+                    "document2": (os.path.basename(doc2_path), f2),
+                },
+                timeout=timeout,
+            )
+        ok = response.status_code == 200 and "/compare" in response.url
+    except requests.RequestException:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /compare against the mock Azure OpenAI endpoint.")
+    parser.add_argument("--app-url", default="http://127.0.0.1:8080")
+    parser.add_argument("--doc1", default=os.path.join(UPLOADS, "resume-example1.pdf"))
+    parser.add_argument("--doc2", default=os.path.join(UPLOADS, "resume-example2.pdf"))
+    parser.add_argument("--requests", type=int, default=20, help="Total comparisons to run.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Comparisons in flight at once.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--wait", type=float, default=120.0, help="Seconds to wait for the app to come up.")
+    parser.add_argument("--mock-url", help="Read stats from an already running mock instead of starting one.")
+    parser.add_argument("--mock-host", default="127.0.0.1")
+    parser.add_argument("--mock-port", type=int, default=8090)
+    parser.add_argument("--output", help="Write the JSON report to this file as well as stdout.")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    mock_url = args.mock_url
+    if not mock_url:
+        server = MockAzureOpenAIServer(config_from_args(args), host=args.mock_host, port=args.mock_port).start()
+        mock_url = server.url
+        print(f"Mock Azure OpenAI listening on {mock_url}; start the app with "
+              f"AZURE_AI_ENDPOINT={mock_url} AZURE_AI_API_KEY=mock", file=sys.stderr)
+
+    try:
+        if not wait_for_app(args.app_url, args.wait):
+            print(f"App not reachable at {args.app_url}", file=sys.stderr)
+            return 1
+        requests.post(f"{mock_url}/stats/reset", timeout=5)
+
+        local = threading.local()
+
+        def one(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            return run_compare(local.session, args.app_url, args.doc1, args.doc2, args.timeout)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [seconds for ok, seconds in results if ok]
+        errors = sum(1 for ok, _ in results if not ok)
+        mock_stats = requests.get(f"{mock_url}/stats", timeout=5).json()
+        by_status = mock_stats.get("by_status", {})
+        completed = max(len(latencies), 1)
+        report = {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / args.requests, 4) if args.requests else 0.0,
+            "latency": summarize_latencies(latencies),
+            "model_traffic": {
+                "calls": mock_stats.get("requests", 0),
+                "calls_per_compare": round(mock_stats.get("requests", 0) / completed, 2),
+                "throttled_429": by_status.get("429", 0),
+                "server_errors_5xx": sum(v for k, v in by_status.items() if k.startswith("5")),
+                "prompt_tokens_per_compare": round(mock_stats.get("prompt_tokens", 0) / completed, 1),
+                "max_concurrent_calls": mock_stats.get("max_in_flight", 0),
+            },
+        }
+        text = json.dumps(report, indent=2)
+        print(text)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text)
+        return 0
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
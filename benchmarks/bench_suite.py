@@ -0,0 +1,309 @@
+"""
+Time the analysis code in-process on synthetic document pairs and the PDFs in src/uploads,
+write the results as JSON and optionally compare them with a stored baseline.
+
+Every public method of DiffView, SemanticAnalyzer, SentimentRiskClassifier and
+ToneShiftAnalyzer is timed, plus utils.metrics.get_all_metrics and the full
+InsightsGenerator.get_document_insights. AI-backed methods run against the local Azure
+OpenAI stand-in when --mock-ai is given and are otherwise measured on their offline path.
+
+    python benchmarks/bench_suite.py --sizes 1KB,10KB,100KB --edit-rates 0.05,0.3
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --threshold 0.25 \\
+        --threshold-override "InsightsGenerator.*=0.5"
+
+The exit status is 1 when any method regressed beyond its threshold.
+"""
+import argparse
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+sys.path.insert(0, HERE)
+sys.path.insert(0, SRC)
+
+from synthetic import format_size, make_pair, parse_size  # noqa: E402
+from models import Document  # noqa: E402
+
+UPLOADS = os.path.join(SRC, "uploads")
+FIXTURE_PAIRS = [
+    ("Balance-Sheet-Example.pdf", "IAC_2020-Balance-Sheet-Example.pdf"),
+    ("resume-example1.pdf", "resume-example2.pdf"),
+]
+SKIPPED_METHODS = {"health_check"}
+
+
+def read_pdf(path):
+    import PyPDF2
+    with open(path, "rb") as f:
+        return "\n".join(page.extract_text() or "" for page in PyPDF2.PdfReader(f).pages)
+
+
+def build_cases(sizes, edit_rates, seed, include_fixtures=True):
+    """
+    Return [(case name, doc1, doc2)] for every size x edit rate plus the PDF fixture pairs.
+    """
+    cases = []
+    for size in sizes:
+        for rate in edit_rates:
+            doc1, doc2 = make_pair(size, rate, seed)
+            cases.append((f"synthetic-{format_size(size)}-edit{rate:g}", doc1, doc2))
+    if include_fixtures:
+        for name1, name2 in FIXTURE_PAIRS:
+            path1, path2 = os.path.join(UPLOADS, name1), os.path.join(UPLOADS, name2)
+            if not (os.path.exists(path1) and os.path.exists(path2)):
+                continue
+            try:
+                doc1, doc2 = read_pdf(path1), read_pdf(path2)
+            except ImportError:
+                print("PyPDF2 not installed; skipping PDF fixtures", file=sys.stderr)
+                break
+            cases.append((f"pdf-{os.path.splitext(name1)[0]}-vs-{os.path.splitext(name2)[0]}", doc1, doc2))
+    return cases
+
+
+def build_components(ai_endpoint=None):
+    """
+    Construct the analyzers the way main.py does. With ai_endpoint, the Azure AI service
+    points at that (mock) endpoint; otherwise AI-backed paths run offline.
+    """
+    from services.azure_services import AzureAIService, LocalNLPService
+    from comparison.multilingual import MultilingualService
+    from comparison.semantic_analysis import SemanticAnalyzer
+    from comparison.sentiment_risk import SentimentRiskClassifier
+    from comparison.tone_shift import ToneShiftAnalyzer
+    from comparison.diff_view import DiffView
+    from comparison.insights import InsightsGenerator
+
+    azure_ai_service = None
+    if ai_endpoint:
+        os.environ["AZURE_AI_ENDPOINT"] = ai_endpoint
+        os.environ["AZURE_AI_API_KEY"] = "mock"
+        azure_ai_service = AzureAIService()
+    multilingual_service = MultilingualService(azure_ai_service=azure_ai_service)
+    nlp = LocalNLPService()
+    semantic = SemanticAnalyzer(nlp, multilingual_service, azure_ai_service)
+    sentiment = SentimentRiskClassifier(nlp, multilingual_service, azure_ai_service)
+    tone = ToneShiftAnalyzer(nlp, multilingual_service, azure_ai_service)
+    diff = DiffView(multilingual_service, azure_ai_service)
+    insights = InsightsGenerator(semantic, sentiment, tone, diff, azure_ai_service)
+    return {
+        "DiffView": diff,
+        "SemanticAnalyzer": semantic,
+        "SentimentRiskClassifier": sentiment,
+        "ToneShiftAnalyzer": tone,
+        "InsightsGenerator": insights,
+        "_azure_ai_service": azure_ai_service,
+    }
+
+
+def build_arguments(components, doc1, doc2):
+    """
+    Values for the parameter names used by the benchmarked methods. Derived inputs
+    (sentiment results, heatmap data) are computed here so they are not timed.
+    """
+    sentiment = components["SentimentRiskClassifier"]
+    sentiment_result = sentiment.classify_sentiment(doc1)
+    return {
+        "doc1": doc1, "doc2": doc2,
+        "document1": doc1, "document2": doc2,
+        "document": doc1, "document_content": doc1, "text": doc1,
+        "documents": [doc1, doc2],
+        "sentiment_result": sentiment_result,
+        "keywords": ["confidential", "payment", "termination", "liability", "personal data"],
+        "timestamps": ["2024-01-01", "2024-06-01"],
+        "conversation": [{"participant": "a", "text": doc1[:500]}, {"participant": "b", "text": doc2[:500]}],
+    }
+
+
+def benchmark_targets(components):
+    """
+    Yield (name, callable, required parameter names) for every method to time.
+    """
+    from utils.metrics import get_all_metrics
+
+    for class_name in ("DiffView", "SemanticAnalyzer", "SentimentRiskClassifier", "ToneShiftAnalyzer"):
+        instance = components[class_name]
+        for name, fn in inspect.getmembers(type(instance), inspect.isfunction):
+            if name.startswith("_") or name in SKIPPED_METHODS:
+                continue
+            yield f"{class_name}.{name}", getattr(instance, name), _required_parameters(fn)
+    yield "metrics.get_all_metrics", get_all_metrics, ["doc1", "doc2"]
+    insights = components["InsightsGenerator"]
+    yield "InsightsGenerator.get_document_insights", insights.get_document_insights, ["doc1", "doc2"]
+
+
+def _required_parameters(fn):
+    return [
+        p.name for p in inspect.signature(fn).parameters.values()
+        if p.name != "self" and p.default is inspect.Parameter.empty
+    ]
+
+
+def reset_caches(components):
+    # Measure cold paths: cached model answers would make every repeat after the first free.
+    azure_ai_service = components.get("_azure_ai_service")
+    if azure_ai_service is not None:
+        azure_ai_service.response_cache.clear()
+        azure_ai_service.summarizer.clear()
+    Document.clear_cache()
+
+
+def time_call(fn, args, repeat, max_seconds, components):
+    runs = []
+    for _ in range(repeat):
+        reset_caches(components)
+        start = time.perf_counter()
+        fn(*args)
+        runs.append(time.perf_counter() - start)
+        if runs[-1] > max_seconds:
+            break
+    return {
+        "median_s": round(statistics.median(runs), 6),
+        "min_s": round(min(runs), 6),
+        "max_s": round(max(runs), 6),
+        "runs": len(runs),
+    }
+
+
+def run_suite(cases, components, repeat=3, max_seconds=30.0, patterns=None, verbose=True):
+    results = {}
+    for case_name, doc1, doc2 in cases:
+        arguments = build_arguments(components, doc1, doc2)
+        case_results = results[case_name] = {}
+        for name, fn, params in benchmark_targets(components):
+            if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+                continue
+            missing = [p for p in params if p not in arguments]
+            if missing:
+                case_results[name] = {"skipped": f"no benchmark input for {', '.join(missing)}"}
+                continue
+            try:
+                case_results[name] = time_call(fn, [arguments[p] for p in params], repeat, max_seconds, components)
+            except Exception as exc:
+                case_results[name] = {"error": f"{type(exc).__name__}: {exc}"}
+            if verbose:
+                outcome = case_results[name]
+                shown = f"{outcome['median_s'] * 1000:10.2f} ms" if "median_s" in outcome else "   skipped/error"
+                print(f"{case_name:45s} {name:60s} {shown}", file=sys.stderr)
+    return results
+
+
+def parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        pattern, _, threshold = value.rpartition("=")
+        if not pattern:
+            raise ValueError(f"Expected PATTERN=THRESHOLD, got {value!r}")
+        overrides[pattern] = float(threshold)
+    return overrides
+
+
+def compare_with_baseline(results, baseline, threshold, min_delta, overrides=None):
+    """
+    Compare medians against a baseline. A method regresses when it is slower by more than
+    its relative threshold AND by more than min_delta seconds (to ignore timer noise).
+
+    Returns:
+    dict: {"regressions": [...], "improvements": [...], "missing": [...]}
+    """
+    overrides = dict(baseline.get("thresholds", {}), **(overrides or {}))
+    report = {"regressions": [], "improvements": [], "missing": []}
+    for case_name, methods in results.items():
+        base_case = baseline.get("results", {}).get(case_name, {})
+        for name, current in methods.items():
+            base = base_case.get(name)
+            if not base or "median_s" not in base or "median_s" not in current:
+                if "median_s" in current:
+                    report["missing"].append(f"{case_name} {name}")
+                continue
+            limit = next((t for p, t in overrides.items() if fnmatch.fnmatch(name, p)), threshold)
+            before, after = base["median_s"], current["median_s"]
+            entry = {
+                "case": case_name, "method": name, "baseline_s": before, "current_s": after,
+                "change": round((after - before) / before, 4) if before else None, "threshold": limit,
+            }
+            if after - before > min_delta and after > before * (1 + limit):
+                report["regressions"].append(entry)
+            elif before - after > min_delta and after < before * (1 - limit):
+                report["improvements"].append(entry)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1KB,10KB,100KB",
+                        help="comma-separated document sizes, e.g. 1KB,1MB,20MB")
+    parser.add_argument("--edit-rates", default="0.05,0.3", help="comma-separated fractions of edited sentences")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-fixtures", action="store_true", help="skip the PDFs in src/uploads")
+    parser.add_argument("--methods", action="append", help="only run methods matching this glob (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=30.0,
+                        help="stop repeating a method once a single run takes longer than this")
+    parser.add_argument("--mock-ai", action="store_true", help="run AI-backed methods against the local mock")
+    parser.add_argument("--output", default=os.path.join(HERE, "results.json"))
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="also write the results to this path as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="ignore slowdowns smaller than this (s)")
+    parser.add_argument("--threshold-override", action="append", metavar="PATTERN=THRESHOLD",
+                        help="per-method relative threshold, e.g. 'DiffView.get_ai_*=1.0' (repeatable)")
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    edit_rates = [float(r) for r in args.edit_rates.split(",") if r.strip()]
+    cases = build_cases(sizes, edit_rates, args.seed, include_fixtures=not args.no_fixtures)
+
+    mock = None
+    if args.mock_ai:
+        from mock_azure_openai import MockAzureOpenAIServer
+        mock = MockAzureOpenAIServer().start()
+    try:
+        components = build_components(mock.url if mock else None)
+        results = run_suite(cases, components, args.repeat, args.max_seconds, args.methods)
+    finally:
+        if mock:
+            mock.stop()
+
+    output = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "edit_rates": args.edit_rates,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "mock_ai": args.mock_ai,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report = compare_with_baseline(results, baseline, args.threshold, args.min_delta,
+                                       parse_overrides(args.threshold_override))
+        print(json.dumps(report, indent=2))
+        if report["regressions"]:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""
+End-to-end load test of the app with local stand-ins for every external dependency.
+
+Starts the mock Azure OpenAI and Translator endpoints, launches `src/main.py` with
+USE_LOCAL_STANDINS=1 (SQLite audit table, on-disk blob store) in a temporary working area,
+then replays upload + compare sessions at a target arrival rate. Arrivals are open-loop: a
+session starts every 1/rps seconds whether or not earlier ones finished, so queueing in the
+app shows up as latency instead of being hidden by a slower client.
+
+    python benchmarks/load_test.py --rps 2 --duration 60 --size 20KB --repeat-ratio 0.3
+
+The report lists p50/p95/p99 latency, throughput and error rate per route, plus the app
+worker's resident memory (start, peak, end). Use --app-url and --app-pid to drive an app
+that is already running instead.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_compare import summarize_latencies, wait_for_app  # noqa: E402
+from mock_azure_openai import MockAzureOpenAIServer, add_config_arguments, config_from_args  # noqa: E402
+from mock_azure_translator import MockAzureTranslatorServer, TranslatorConfig  # noqa: E402
+from synthetic import make_pair, parse_size  # noqa: E402
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+FIXTURE_PAIRS = [
+    ("resume-example1.pdf", "resume-example2.pdf"),
+    ("Balance-Sheet-Example.pdf", "IAC_2020-Balance-Sheet-Example.pdf"),
+]
+
+
+def read_rss_kb(pid):
+    """
+    Resident set size of a process in KiB from /proc, or None where unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class MemorySampler:
+    """
+    Polls the RSS of a process on a background thread and keeps start, peak and last values.
+    """
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.start_kb = read_rss_kb(pid) if pid else None
+        self.peak_kb = self.start_kb
+        self.end_kb = self.start_kb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = read_rss_kb(self.pid) if self.pid else None
+        if rss is None:
+            return
+        self.end_kb = rss
+        self.peak_kb = max(self.peak_kb or 0, rss)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def report(self):
+        to_mb = lambda kb: round(kb / 1024.0, 1) if kb is not None else None  # noqa: E731
+        return {"pid": self.pid, "start_mb": to_mb(self.start_kb), "peak_mb": to_mb(self.peak_kb),
+                "end_mb": to_mb(self.end_kb)}
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, ok, seconds):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(route, []).append(seconds)
+            else:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, elapsed):
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            latencies = self.latencies.get(route, [])
+            errors = self.errors.get(route, 0)
+            total = len(latencies) + errors
+            routes[route] = {
+                "requests": total,
+                "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "latency": summarize_latencies(latencies),
+            }
+        return routes
+
+
+class SessionSource:
+    """
+    Produces document pairs for sessions. A `repeat_ratio` share of sessions re-submits a
+    pair seen before (exercising the result and translation caches); the rest are fresh
+    synthetic pairs, or the PDF fixtures when --fixtures is given.
+    """
+
+    def __init__(self, workdir, size, edit_rate, repeat_ratio, use_fixtures, seed=0):
+        self.workdir = workdir
+        self.size = size
+        self.edit_rate = edit_rate
+        self.repeat_ratio = repeat_ratio
+        self.random = random.Random(seed)
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.seen = []
+        self.fixtures = []
+        if use_fixtures:
+            uploads = os.path.join(SRC, "uploads")
+            self.fixtures = [(os.path.join(uploads, a), os.path.join(uploads, b)) for a, b in FIXTURE_PAIRS
+                             if os.path.exists(os.path.join(uploads, a)) and os.path.exists(os.path.join(uploads, b))]
+
+    def next_pair(self):
+        with self.lock:
+            if self.seen and self.random.random() < self.repeat_ratio:
+                return self.random.choice(self.seen)
+            index = next(self.counter)
+        if self.fixtures:
+            pair = self.fixtures[index % len(self.fixtures)]
+        else:
+            original, revised = make_pair(self.size, self.edit_rate, seed=index)
+            pair = (os.path.join(self.workdir, f"session{index}_a.txt"),
+                    os.path.join(self.workdir, f"session{index}_b.txt"))
+            for path, text in zip(pair, (original, revised)):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+        with self.lock:
+            self.seen.append(pair)
+        return pair
+
+
+def run_session(session, app_url, pair, recorder, timeout, audit):
+    """
+    Upload a pair through the index form, then load the /compare page it redirects to.
+    """
+    doc1, doc2 = pair
+    start = time.perf_counter()
+    try:
+        with open(doc1, "rb") as f1, open(doc2, "rb") as f2:
+            response = session.post(
+                f"{app_url}/",
+                files={"document1": (os.path.basename(doc1), f1), "document2": (os.path.basename(doc2), f2)},
+                allow_redirects=False,
+                timeout=timeout,
+            )
+        location = response.headers.get("Location", "")
+        ok = response.status_code in (302, 303) and "/compare" in location
+    except requests.RequestException:
+        ok, location = False, ""
+    recorder.record("POST /", ok, time.perf_counter() - start)
+    if not ok:
+        return
+    start = time.perf_counter()
+    try:
+        response = session.get(requests.compat.urljoin(app_url + "/", location), timeout=timeout)
+        ok = response.status_code == 200 and "/compare" in response.url
+    except requests.RequestException:
+        ok = False
+    recorder.record("GET /compare", ok, time.perf_counter() - start)
+    if audit:
+        start = time.perf_counter()
+        try:
+            ok = session.get(f"{app_url}/audit", timeout=timeout).status_code == 200
+        except requests.RequestException:
+            ok = False
+        recorder.record("GET /audit", ok, time.perf_counter() - start)
+
+
+def start_app(workdir, port, ai_url, translator_url, log_file):
+    env = dict(os.environ)
+    env.update({
+        "USE_LOCAL_STANDINS": "1",
+        "FLASK_DEBUG": "0",
+        "PORT": str(port),
+        "UPLOAD_FOLDER": os.path.join(workdir, "uploads"),
+        "LOCAL_BLOB_ROOT": os.path.join(workdir, "blob_store"),
+        "LOCAL_TABLE_PATH": os.path.join(workdir, "audit_log.db"),
+        "AUDIT_SPOOL_PATH": os.path.join(workdir, "audit_spool.jsonl"),
+        "TRANSLATION_MEMORY_PATH": os.path.join(workdir, "translation_memory.db"),
+        "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        "AZURE_AI_ENDPOINT": ai_url,
+        "AZURE_AI_API_KEY": "mock",
+        "AZURE_TRANSLATOR_ENDPOINT": translator_url,
+        "AZURE_TRANSLATOR_KEY": "mock",
+    })
+    return subprocess.Popen([sys.executable, "main.py"], cwd=os.path.abspath(SRC), env=env,
+                            stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test upload + compare sessions against local stand-ins.")
+    parser.add_argument("--rps", type=float, default=1.0, help="Session arrival rate (sessions per second).")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep starting sessions.")
+    parser.add_argument("--sessions", type=int, help="Stop after this many sessions instead of --duration.")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Client threads; arrivals beyond this queue.")
+    parser.add_argument("--size", default="20KB", help="Synthetic document size, e.g. 5KB or 1MB.")
+    parser.add_argument("--edit-rate", type=float, default=0.1)
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="Share of sessions re-submitting a known pair.")
+    parser.add_argument("--fixtures", action="store_true", help="Upload the PDFs in src/uploads instead of synthetic text.")
+    parser.add_argument("--audit", action="store_true", help="Also load /audit after each comparison.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--wait", type=float, default=180.0, help="Seconds to wait for the app to come up.")
+    parser.add_argument("--app-url", help="Drive an already running app instead of starting one.")
+    parser.add_argument("--app-pid", type=int, help="PID to sample memory from when --app-url is given.")
+    parser.add_argument("--app-port", type=int, default=8085)
+    parser.add_argument("--translator-latency-ms", type=float, default=40.0)
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--output", help="Write the JSON report to this file as well as stdout.")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    docs_dir = os.path.join(workdir, "docs")
+    os.makedirs(docs_dir)
+    ai_server = MockAzureOpenAIServer(config_from_args(args)).start()
+    translator = MockAzureTranslatorServer(TranslatorConfig(latency_ms=args.translator_latency_ms)).start()
+    app_process, log_file = None, None
+    try:
+        app_url, app_pid = args.app_url, args.app_pid
+        if not app_url:
+            log_file = open(os.path.join(workdir, "app.log"), "wb")
+            app_process = start_app(workdir, args.app_port, ai_server.url, translator.url, log_file)
+            app_url, app_pid = f"http://127.0.0.1:{args.app_port}", app_process.pid
+        if not wait_for_app(app_url, args.wait):
+            print(f"App not reachable at {app_url}; see {os.path.join(workdir, 'app.log')}", file=sys.stderr)
+            args.keep_workdir = True
+            return 1
+        requests.post(f"{ai_server.url}/stats/reset", timeout=5)
+        requests.post(f"{translator.url}/stats/reset", timeout=5)
+
+        source = SessionSource(docs_dir, parse_size(args.size), args.edit_rate, args.repeat_ratio,
+                               args.fixtures, args.seed or 0)
+        recorder = Recorder()
+        local = threading.local()
+
+        def one():
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            run_session(local.session, app_url, source.next_pair(), recorder, args.timeout, args.audit)
+
+        memory = MemorySampler(app_pid).start()
+        interval = 1.0 / args.rps
+        started = time.perf_counter()
+        launched = 0
+        with ThreadPoolExecutor(max_workers=args.max_in_flight) as executor:
+            while True:
+                if args.sessions is not None and launched >= args.sessions:
+                    break
+                if args.sessions is None and time.perf_counter() - started >= args.duration:
+                    break
+                delay = started + launched * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(one)
+                launched += 1
+        elapsed = time.perf_counter() - started
+        memory.stop()
+
+        ai_stats = requests.get(f"{ai_server.url}/stats", timeout=5).json()
+        report = {
+            "target_rps": args.rps,
+            "sessions": launched,
+            "elapsed_s": round(elapsed, 3),
+            "achieved_session_rps": round(launched / elapsed, 3) if elapsed else 0.0,
+            "routes": recorder.report(elapsed),
+            "worker_memory": memory.report(),
+            "dependencies": {
+                "openai_calls": ai_stats.get("requests", 0),
+                "openai_throttled_429": ai_stats.get("by_status", {}).get("429", 0),
+                "translator": translator.stats.snapshot(),
+            },
+        }
+        text = json.dumps(report, indent=2)
+        print(text)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text)
+        return 0
+    finally:
+        if app_process:
+            # SIGINT lets the app run its exit hooks (blob and audit flushes); SIGTERM would not.
+            app_process.send_signal(signal.SIGINT)
+            try:
+                app_process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                app_process.kill()
+        if log_file:
+            log_file.close()
+        ai_server.stop()
+        translator.stop()
+        if args.keep_workdir:
+            print(f"Work directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
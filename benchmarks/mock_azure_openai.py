@@ -0,0 +1,313 @@
+"""
+Local stand-in for the Azure OpenAI chat-completions endpoint.
+
+Implements POST /openai/deployments/<deployment>/chat/completions as called by the
+AzureOpenAI SDK, with configurable latency, token throughput, injected 429/5xx errors
+and canned responses, so the AI paths can be load-tested offline.
+
+Run it and point the app at it:
+    python benchmarks/mock_azure_openai.py --port 8090 --latency-ms 800 --rate-429 0.05
+    AZURE_AI_ENDPOINT=http://127.0.0.1:8090 AZURE_AI_API_KEY=mock python src/main.py
+
+GET /stats returns request counters; POST /stats/reset clears them.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAT_PATH = re.compile(r"^/openai/deployments/(?P<deployment>[^/]+)/chat/completions$")
+
+LOREM = (
+    "The revised document updates several clauses, clarifies payment terms and adjusts the "
+    "notice period while keeping the overall structure and intent of the original unchanged."
+).split()
+
+
+class MockConfig:
+    def __init__(self, latency_dist="lognormal", latency_ms=500.0, latency_jitter_ms=150.0,
+                 tokens_per_second=60.0, rate_429=0.0, rate_5xx=0.0, retry_after=1,
+                 completion_tokens=120, responses=None, seed=None):
+        self.latency_dist = latency_dist
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.completion_tokens = completion_tokens
+        self.responses = responses or []
+        self.random = random.Random(seed)
+
+    def sample_latency(self):
+        """
+        Time to first token, in seconds, drawn from the configured distribution.
+        """
+        mean, jitter = self.latency_ms, self.latency_jitter_ms
+        if self.latency_dist == "fixed":
+            ms = mean
+        elif self.latency_dist == "uniform":
+            ms = self.random.uniform(mean - jitter, mean + jitter)
+        elif self.latency_dist == "normal":
+            ms = self.random.gauss(mean, jitter)
+        elif self.latency_dist == "exponential":
+            ms = self.random.expovariate(1.0 / mean) if mean > 0 else 0.0
+        else:
+            # Lognormal with the requested mean and standard deviation gives a realistic long tail.
+            import math
+            variance = jitter ** 2
+            sigma2 = math.log(1 + variance / (mean ** 2)) if mean > 0 else 0.0
+            mu = math.log(mean) - sigma2 / 2 if mean > 0 else 0.0
+            ms = self.random.lognormvariate(mu, math.sqrt(sigma2)) if mean > 0 else 0.0
+        return max(ms, 0.0) / 1000.0
+
+
+class MockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.by_status = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.max_in_flight = self.in_flight
+
+    def start(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finish(self, status, prompt_tokens=0, completion_tokens=0):
+        with self.lock:
+            self.in_flight -= 1
+            self.by_status[str(status)] = self.by_status.get(str(status), 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "by_status": dict(self.by_status),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+            }
+
+
+def _estimate_tokens(text):
+    return len(text) // 4 + 1 if text else 0
+
+
+def _json_for_format(response_format, text):
+    """
+    Build a JSON answer that satisfies the requested response_format.
+    """
+    schema = (response_format.get("json_schema") or {}).get("schema") or {}
+    properties = schema.get("properties") or {}
+    if not properties:
+        return json.dumps({"result": text})
+    answer = {}
+    for name, spec in properties.items():
+        kind = spec.get("type")
+        if kind == "array":
+            answer[name] = [text]
+        elif kind in ("number", "integer"):
+            answer[name] = 0
+        elif kind == "boolean":
+            answer[name] = False
+        else:
+            answer[name] = f"{name.replace('_', ' ').capitalize()}: {text}"
+    return json.dumps(answer)
+
+
+def build_completion(config, body):
+    """
+    Choose the content for a request: the first matching canned response, else a generated one.
+    """
+    messages = body.get("messages") or []
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    max_tokens = int(body.get("max_tokens") or config.completion_tokens)
+    n_tokens = max(1, min(config.completion_tokens, max_tokens))
+    for canned in config.responses:
+        if re.search(canned.get("match", ""), prompt):
+            return canned["content"], _estimate_tokens(prompt), _estimate_tokens(canned["content"])
+    text = " ".join(LOREM[i % len(LOREM)] for i in range(n_tokens))
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") in ("json_object", "json_schema"):
+        content = _json_for_format(response_format, text)
+    elif "personally identifiable information" in prompt:
+        content = "[]"
+    else:
+        content = text
+    return content, _estimate_tokens(prompt), n_tokens
+
+
+def make_handler(config, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.split("?")[0] == "/stats":
+                return self._send_json(200, stats.to_dict())
+            self._send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if path == "/stats/reset":
+                stats.reset()
+                return self._send_json(200, {"status": "reset"})
+            match = CHAT_PATH.match(path)
+            if not match:
+                return self._send_json(404, {"error": {"code": "DeploymentNotFound", "message": path}})
+            stats.start()
+            status, prompt_tokens, completion_tokens = 500, 0, 0
+            try:
+                body = json.loads(raw or b"{}")
+                roll = config.random.random()
+                if roll < config.rate_429:
+                    status = 429
+                    time.sleep(min(config.sample_latency(), 0.05))
+                    return self._send_json(429, {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                                           {"Retry-After": str(config.retry_after)})
+                if roll < config.rate_429 + config.rate_5xx:
+                    status = config.random.choice([500, 502, 503])
+                    time.sleep(config.sample_latency())
+                    return self._send_json(status, {"error": {"code": str(status), "message": "Injected failure."}})
+                content, prompt_tokens, completion_tokens = build_completion(config, body)
+                delay = config.sample_latency()
+                if config.tokens_per_second > 0:
+                    delay += completion_tokens / config.tokens_per_second
+                time.sleep(delay)
+                status = 200
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": match.group("deployment"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+            finally:
+                stats.finish(status, prompt_tokens, completion_tokens)
+
+    return Handler
+
+
+class MockAzureOpenAIServer:
+    """
+    Runs the mock endpoint on a background thread; usable as a context manager.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency-dist", default="lognormal",
+                        choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Mean time to first token.")
+    parser.add_argument("--latency-jitter-ms", type=float, default=150.0, help="Spread of the latency distribution.")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0, help="Completion throughput; 0 disables.")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Tokens generated per answer (capped by max_tokens).")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of requests answered with 500/502/503.")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s.")
+    parser.add_argument("--responses", help="JSON file with a list of {\"match\": regex, \"content\": str} canned answers.")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args):
+    responses = []
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = json.load(f)
+    return MockConfig(
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        completion_tokens=args.completion_tokens,
+        responses=responses,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Azure OpenAI chat-completions stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server = MockAzureOpenAIServer(config_from_args(args), host=args.host, port=args.port)
+    print(f"Mock Azure OpenAI listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
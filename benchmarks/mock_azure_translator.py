@@ -0,0 +1,178 @@
+"""
+Local stand-in for the Azure Translator v3 REST API (/translate and /detect).
+
+Translations are identity by default (optionally tagged with the target language) so
+downstream analysis sees realistic text. Latency grows with the characters in the request,
+and a fraction of requests can be answered with 429 to exercise the client's throttling path.
+
+    python benchmarks/mock_azure_translator.py --port 8091
+    AZURE_TRANSLATOR_ENDPOINT=http://127.0.0.1:8091 AZURE_TRANSLATOR_KEY=mock python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class TranslatorConfig:
+    def __init__(self, latency_ms=40.0, ms_per_kchar=2.0, rate_429=0.0, retry_after=1, tag=False, seed=None):
+        self.latency_ms = latency_ms
+        self.ms_per_kchar = ms_per_kchar
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.tag = tag
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self):
+        with self.lock:
+            return self.random.random()
+
+
+class TranslatorStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.characters = 0
+            self.elements = 0
+            self.by_status = {}
+
+    def record(self, status, elements=0, characters=0):
+        with self.lock:
+            self.requests += 1
+            self.elements += elements
+            self.characters += characters
+            self.by_status[str(status)] = self.by_status.get(str(status), 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "elements": self.elements,
+                "characters": self.characters,
+                "by_status": dict(self.by_status),
+            }
+
+
+def make_handler(config, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                return self._send_json(200, stats.snapshot())
+            self._send_json(404, {"error": {"code": 404000, "message": "Not found"}})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if url.path == "/stats/reset":
+                stats.reset()
+                return self._send_json(200, {"ok": True})
+            try:
+                body = json.loads(raw or b"[]")
+            except ValueError:
+                stats.record(400)
+                return self._send_json(400, {"error": {"code": 400000, "message": "Invalid JSON"}})
+            texts = [item.get("text", "") if isinstance(item, dict) else "" for item in body]
+            characters = sum(len(t) for t in texts)
+            if config.rate_429 and config.roll() < config.rate_429:
+                stats.record(429, len(texts), characters)
+                return self._send_json(429, {"error": {"code": 429001, "message": "Too many requests"}},
+                                       {"Retry-After": str(config.retry_after)})
+            time.sleep((config.latency_ms + config.ms_per_kchar * characters / 1000.0) / 1000.0)
+            query = parse_qs(url.query)
+            if url.path == "/translate":
+                target = (query.get("to") or ["en"])[0]
+                source = (query.get("from") or [None])[0]
+                result = []
+                for text in texts:
+                    item = {"translations": [{"text": f"[{target}] {text}" if config.tag else text, "to": target}]}
+                    if not source:
+                        item["detectedLanguage"] = {"language": "en", "score": 1.0}
+                    result.append(item)
+            elif url.path == "/detect":
+                result = [{"language": "en", "score": 1.0, "isTranslationSupported": True} for _ in texts]
+            else:
+                stats.record(404, len(texts), characters)
+                return self._send_json(404, {"error": {"code": 404000, "message": "Not found"}})
+            stats.record(200, len(texts), characters)
+            self._send_json(200, result)
+
+    return Handler
+
+
+class MockAzureTranslatorServer:
+    """
+    Runs the mock Translator on a background thread; usable as a context manager.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or TranslatorConfig()
+        self.stats = TranslatorStats()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Azure Translator v3 endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--ms-per-kchar", type=float, default=2.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--tag", action="store_true", help="prefix translations with [<target>]")
+    args = parser.parse_args()
+    config = TranslatorConfig(args.latency_ms, args.ms_per_kchar, args.rate_429, tag=args.tag)
+    server = MockAzureTranslatorServer(config, args.host, args.port)
+    print(f"Mock Azure Translator listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
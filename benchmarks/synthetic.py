@@ -0,0 +1,118 @@
+"""
+Deterministic synthetic document pairs for benchmarks.
+
+make_pair(size, edit_rate, seed) builds a contract-like English document of roughly
+`size` bytes and a revised copy in which about `edit_rate` of the sentences were
+rewritten, inserted or deleted, so diff-heavy and similarity-heavy code paths see
+realistic inputs at any scale.
+"""
+import random
+import re
+
+SUBJECTS = [
+    "The supplier", "The customer", "Each party", "The contractor", "The service provider", "The licensee",
+    "The company", "The auditor", "The tenant", "The landlord", "The data processor", "The board",
+]
+VERBS = [
+    "shall deliver", "must provide", "will review", "agrees to maintain", "is responsible for",
+    "shall not disclose", "may terminate", "must report", "will reimburse", "shall indemnify",
+    "guarantees", "is entitled to",
+]
+OBJECTS = [
+    "all confidential information", "the quarterly financial statements", "the agreed service levels",
+    "any personal data received", "the outstanding invoices", "the insurance certificates",
+    "the security incident report", "the project deliverables", "reasonable written notice",
+    "the audit findings", "the warranty obligations", "the payment schedule",
+]
+QUALIFIERS = [
+    "within thirty days", "without undue delay", "at its own expense", "in accordance with applicable law",
+    "unless otherwise agreed in writing", "to the satisfaction of the customer", "on a best efforts basis",
+    "before the end of each calendar quarter", "subject to the limitations below", "with immediate effect",
+]
+TONES = [
+    "This is an excellent outcome for both parties.", "Failure to comply may result in significant penalties.",
+    "We are pleased to confirm the arrangement.", "Any breach is a serious concern and will be escalated.",
+    "The risk of loss remains with the supplier.", "Payment is urgent and overdue.",
+]
+HEADINGS = ["Definitions", "Scope of Services", "Payment Terms", "Confidentiality", "Data Protection",
+            "Liability", "Termination", "Governing Law", "Warranties", "Reporting"]
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2}
+
+
+def parse_size(value):
+    """
+    Parse sizes such as "1KB", "250kb" or "20MB" into bytes.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B)?\s*", str(value), re.I)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[(match.group(2) or "B").upper()])
+
+
+def format_size(size):
+    for unit in ("MB", "KB"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def _sentence(rng):
+    if rng.random() < 0.12:
+        return rng.choice(TONES)
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(QUALIFIERS)}."
+
+
+def make_document(size, seed=0):
+    """
+    Return (text, paragraphs) where paragraphs is a list of sentence lists.
+    """
+    rng = random.Random(seed)
+    paragraphs, total, section = [], 0, 0
+    while total < size:
+        if len(paragraphs) % 6 == 0:
+            heading = f"{section + 1}. {HEADINGS[section % len(HEADINGS)]}"
+            paragraphs.append([heading])
+            total += len(heading) + 2
+            section += 1
+        sentences = [_sentence(rng) for _ in range(rng.randint(2, 6))]
+        paragraphs.append(sentences)
+        total += sum(len(s) + 1 for s in sentences) + 1
+    return render(paragraphs), paragraphs
+
+
+def render(paragraphs):
+    return "\n\n".join(" ".join(sentences) for sentences in paragraphs)
+
+
+def revise(paragraphs, edit_rate, seed=1):
+    """
+    Copy of paragraphs with about edit_rate of the sentences rewritten, inserted or deleted.
+    """
+    rng = random.Random(seed)
+    revised = []
+    for sentences in paragraphs:
+        if len(sentences) == 1 and sentences[0][:1].isdigit():
+            revised.append(list(sentences))
+            continue
+        out = []
+        for sentence in sentences:
+            if rng.random() >= edit_rate:
+                out.append(sentence)
+                continue
+            action = rng.random()
+            if action < 0.5:
+                out.append(_sentence(rng))
+            elif action < 0.75:
+                out.extend([sentence, _sentence(rng)])
+            # else: deleted
+        revised.append(out or [_sentence(rng)])
+    return revised
+
+
+def make_pair(size, edit_rate=0.1, seed=0):
+    """
+    Return (original, revised) documents of roughly `size` bytes each.
+    """
+    original, paragraphs = make_document(size, seed)
+    return original, render(revise(paragraphs, edit_rate, seed + 1))
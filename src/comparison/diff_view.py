@@ -1,3 +1,42 @@
+import numpy as np
+
+from models import Document
+from utils.keyword_matcher import KeywordMatcher
+from utils.tokenizer import encode_documents
+
+# Facets produced by the consolidated AI diff analysis, with the instruction sent for each
+# and the message returned when the AI service is unavailable.
+AI_DIFF_FACETS = {
+    "explanation": (
+        "A concise plain-language summary of the key differences between the documents.",
+        "AI explanation not available."
+    ),
+    "similarity": (
+        "Why the documents are similar or different, covering content, tone and structure.",
+        "AI similarity explanation not available."
+    ),
+    "suggested_edits": (
+        "Specific edits to Document 1 that would make it match Document 2, listed as actionable steps.",
+        "AI edit suggestions not available."
+    ),
+    "structural_comparison": (
+        "Differences in sections, headings and the order of content.",
+        "AI structural comparison not available."
+    ),
+    "section_alignment": (
+        "A mapping of corresponding sections or headings, explaining any that do not align.",
+        "AI section alignment not available."
+    ),
+    "highlighted_changes": (
+        "The most important changes, listed in order of significance.",
+        "AI highlighted changes not available."
+    ),
+    "risk_assessment": (
+        "Whether any change introduces risk or compliance issues or needs urgent attention.",
+        "AI risk assessment not available."
+    ),
+}
+
 class DiffView:
     def __init__(self, multilingual_service=None, azure_ai_service=None):
         self.multilingual_service = multilingual_service
@@ -5,7 +44,7 @@ class DiffView:
 
     def translate_document(self, document, target_language='en'):
         if self.multilingual_service:
-            return self.multilingual_service.translate(document, target_language)
+            return self.multilingual_service.prepare_document(document, target_language)
         return document
 
     def generate_diff_view(self, doc1, doc2, lang1='en', lang2='en'):
@@ -50,8 +89,8 @@ class DiffView:
 
         html_diff = HtmlDiff(tabsize=4, wrapcolumn=80)
         html = html_diff.make_file(
-            doc1.splitlines(),
-            doc2.splitlines(),
+            Document.for_text(doc1).lines,
+            Document.for_text(doc2).lines,
             fromdesc='Document 1',
             todesc='Document 2',
             context=True,
@@ -76,8 +115,8 @@ class DiffView:
 
         html_diff = HtmlDiff(tabsize=4, wrapcolumn=80)
         html = html_diff.make_table(
-            doc1.splitlines(),
-            doc2.splitlines(),
+            Document.for_text(doc1).lines,
+            Document.for_text(doc2).lines,
             fromdesc='Document 1',
             todesc='Document 2',
             context=False,
@@ -94,7 +133,7 @@ class DiffView:
         """
         from difflib import Differ
         differ = Differ()
-        diff = list(differ.compare(doc1.splitlines(), doc2.splitlines()))
+        diff = list(differ.compare(Document.for_text(doc1).lines, Document.for_text(doc2).lines))
         added = sum(1 for line in diff if line.startswith('+ '))
         removed = sum(1 for line in diff if line.startswith('- '))
         changed = sum(1 for line in diff if line.startswith('? '))
@@ -109,7 +148,7 @@ class DiffView:
         change_type: 'added', 'removed', or 'changed'
         """
         from difflib import ndiff
-        diff = list(ndiff(doc1.splitlines(), doc2.splitlines()))
+        diff = list(ndiff(Document.for_text(doc1).lines, Document.for_text(doc2).lines))
         changes = []
         line_num1 = line_num2 = 0
         for line in diff:
@@ -135,13 +174,13 @@ class DiffView:
         dict: {'total_doc1': int, 'total_doc2': int, 'unchanged': int, 'added': int, 'removed': int}
         """
         from difflib import ndiff
-        diff = list(ndiff(doc1.splitlines(), doc2.splitlines()))
+        diff = list(ndiff(Document.for_text(doc1).lines, Document.for_text(doc2).lines))
         unchanged = sum(1 for line in diff if line.startswith('  '))
         added = sum(1 for line in diff if line.startswith('+ '))
         removed = sum(1 for line in diff if line.startswith('- '))
         return {
-            'total_doc1': len(doc1.splitlines()),
-            'total_doc2': len(doc2.splitlines()),
+            'total_doc1': len(Document.for_text(doc1).lines),
+            'total_doc2': len(Document.for_text(doc2).lines),
             'unchanged': unchanged,
             'added': added,
             'removed': removed
@@ -159,24 +198,29 @@ class DiffView:
         Return a list of tuples showing word-level changes for each changed line.
         Each tuple: (line_num, changes), where changes is a list of (type, word).
         """
-        from difflib import ndiff
-        lines1 = doc1.splitlines()
-        lines2 = doc2.splitlines()
+        from difflib import SequenceMatcher
+        document1, document2 = Document.for_text(doc1), Document.for_text(doc2)
+        lines1, lines2 = document1.lines, document2.lines
+        words1, words2 = document1.words, document2.words
+        starts1, starts2 = document1.line_word_starts.tolist(), document2.line_word_starts.tolist()
+        ids1, ids2 = encode_documents([document1, document2], attr="word_ids")
         max_lines = max(len(lines1), len(lines2))
         results = []
         for i in range(max_lines):
             l1 = lines1[i] if i < len(lines1) else ""
             l2 = lines2[i] if i < len(lines2) else ""
             if l1 != l2:
-                word_diff = list(ndiff(l1.split(), l2.split()))
+                # Word spans of the line, diffed as interned IDs rather than strings.
+                s1, e1 = (starts1[i], starts1[i + 1]) if i < len(lines1) else (0, 0)
+                s2, e2 = (starts2[i], starts2[i + 1]) if i < len(lines2) else (0, 0)
+                matcher = SequenceMatcher(None, ids1[s1:e1].tolist(), ids2[s2:e2].tolist(), autojunk=False)
                 changes = []
-                for w in word_diff:
-                    if w.startswith('  '):
-                        changes.append(('unchanged', w[2:]))
-                    elif w.startswith('- '):
-                        changes.append(('removed', w[2:]))
-                    elif w.startswith('+ '):
-                        changes.append(('added', w[2:]))
+                for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                    if tag == 'equal':
+                        changes.extend(('unchanged', w) for w in words1[s1 + i1:s1 + i2])
+                        continue
+                    changes.extend(('removed', w) for w in words1[s1 + i1:s1 + i2])
+                    changes.extend(('added', w) for w in words2[s2 + j1:s2 + j2])
                 results.append((i + 1, changes))
         return results
 
@@ -201,7 +245,7 @@ class DiffView:
         Return the diff as a dictionary: {'added': [...], 'removed': [...], 'unchanged': [...]}
         """
         from difflib import ndiff
-        diff = list(ndiff(doc1.splitlines(), doc2.splitlines()))
+        diff = list(ndiff(Document.for_text(doc1).lines, Document.for_text(doc2).lines))
         result = {'added': [], 'removed': [], 'unchanged': []}
         for line in diff:
             if line.startswith('  '):
@@ -217,8 +261,8 @@ class DiffView:
         Return the percentage of changed lines between two documents.
         """
         from difflib import ndiff
-        lines1 = doc1.splitlines()
-        lines2 = doc2.splitlines()
+        lines1 = Document.for_text(doc1).lines
+        lines2 = Document.for_text(doc2).lines
         diff = list(ndiff(lines1, lines2))
         total = max(len(lines1), len(lines2))
         changed = sum(1 for line in diff if line.startswith('- ') or line.startswith('+ '))
@@ -229,7 +273,7 @@ class DiffView:
         Return lists of added and removed lines.
         """
         from difflib import ndiff
-        diff = list(ndiff(doc1.splitlines(), doc2.splitlines()))
+        diff = list(ndiff(Document.for_text(doc1).lines, Document.for_text(doc2).lines))
         added = [line[2:] for line in diff if line.startswith('+ ')]
         removed = [line[2:] for line in diff if line.startswith('- ')]
         return {'added': added, 'removed': removed}
@@ -240,8 +284,8 @@ class DiffView:
         """
         from difflib import unified_diff
         diff = unified_diff(
-            doc1.splitlines(),
-            doc2.splitlines(),
+            Document.for_text(doc1).lines,
+            Document.for_text(doc2).lines,
             fromfile='Document 1',
             tofile='Document 2',
             n=context,
@@ -256,8 +300,8 @@ class DiffView:
         list of tuples: (line_num_doc1, line_num_doc2, content)
         """
         from difflib import SequenceMatcher
-        lines1 = doc1.splitlines()
-        lines2 = doc2.splitlines()
+        lines1 = Document.for_text(doc1).lines
+        lines2 = Document.for_text(doc2).lines
         matcher = SequenceMatcher(None, lines1, lines2)
         mapping = []
         for tag, i1, i2, j1, j2 in matcher.get_opcodes():
@@ -290,13 +334,28 @@ class DiffView:
         Returns:
         dict: {'added': int, 'removed': int, 'common': int}
         """
-        from difflib import ndiff
-        words1 = doc1.split()
-        words2 = doc2.split()
-        diff = list(ndiff(words1, words2))
-        added = sum(1 for w in diff if w.startswith('+ '))
-        removed = sum(1 for w in diff if w.startswith('- '))
-        common = sum(1 for w in diff if w.startswith('  '))
+        from difflib import SequenceMatcher
+        ids1, ids2 = encode_documents([Document.for_text(doc1), Document.for_text(doc2)], attr="word_ids")
+        # Identical leading and trailing words are found with one vectorized comparison;
+        # only the middle goes through the matcher ndiff uses, run on interned IDs. Only
+        # the counts are needed, so the per-word diff lines are never built.
+        n = min(ids1.size, ids2.size)
+        mismatch = np.flatnonzero(ids1[:n] != ids2[:n])
+        prefix = int(mismatch[0]) if mismatch.size else n
+        tail1, tail2 = ids1[prefix:][::-1], ids2[prefix:][::-1]
+        m = min(tail1.size, tail2.size)
+        mismatch = np.flatnonzero(tail1[:m] != tail2[:m])
+        suffix = int(mismatch[0]) if mismatch.size else m
+        middle1 = ids1[prefix:ids1.size - suffix].tolist()
+        middle2 = ids2[prefix:ids2.size - suffix].tolist()
+        added = removed = 0
+        common = prefix + suffix
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, middle1, middle2).get_opcodes():
+            if tag == 'equal':
+                common += i2 - i1
+            else:
+                removed += i2 - i1
+                added += j2 - j1
         return {'added': added, 'removed': removed, 'common': common}
 
     def get_diff_blocks(self, doc1, doc2, context=2):
@@ -305,8 +364,8 @@ class DiffView:
         Each block is a dict: {'start1': int, 'end1': int, 'start2': int, 'end2': int, 'lines1': list, 'lines2': list}
         """
         from difflib import SequenceMatcher
-        lines1 = doc1.splitlines()
-        lines2 = doc2.splitlines()
+        lines1 = Document.for_text(doc1).lines
+        lines2 = Document.for_text(doc2).lines
         matcher = SequenceMatcher(None, lines1, lines2)
         blocks = []
         for tag, i1, i2, j1, j2 in matcher.get_opcodes():
@@ -320,8 +379,8 @@ class DiffView:
                     'end1': end1,
                     'start2': start2 + 1,
                     'end2': end2,
-                    'lines1': lines1[start1:end1],
-                    'lines2': lines2[start2:end2],
+                    'lines1': list(lines1[start1:end1]),
+                    'lines2': list(lines2[start2:end2]),
                     'change_type': tag
                 })
         return blocks
@@ -329,7 +388,8 @@ class DiffView:
     def keyword_based_comparison(self, doc1, doc2, keywords, case_sensitive=False):
         """
         Compare two documents based on user-supplied keywords (can be multiple).
-        Returns a dict with keyword presence and context in both documents.
+        Returns a dict with keyword presence and context in both documents. Keywords match
+        whole words only and are found in one pass per document (see utils.keyword_matcher).
 
         Parameters:
         doc1 (str): The first document text.
@@ -348,22 +408,18 @@ class DiffView:
         }
         """
         if not case_sensitive:
-            doc1_lines = [line.lower() for line in doc1.splitlines()]
-            doc2_lines = [line.lower() for line in doc2.splitlines()]
             keywords = [kw.lower() for kw in keywords]
-        else:
-            doc1_lines = doc1.splitlines()
-            doc2_lines = doc2.splitlines()
+        matcher = KeywordMatcher.for_keywords(keywords, case_sensitive)
+        lines1 = matcher.lines(doc1)
+        lines2 = matcher.lines(doc2)
 
         result = {}
-        for kw in keywords:
-            lines1 = [i+1 for i, line in enumerate(doc1_lines) if kw in line]
-            lines2 = [i+1 for i, line in enumerate(doc2_lines) if kw in line]
+        for kw in matcher.keywords:
             result[kw] = {
-                'in_doc1': bool(lines1),
-                'in_doc2': bool(lines2),
-                'lines_in_doc1': lines1,
-                'lines_in_doc2': lines2
+                'in_doc1': bool(lines1[kw]),
+                'in_doc2': bool(lines2[kw]),
+                'lines_in_doc1': lines1[kw],
+                'lines_in_doc2': lines2[kw]
             }
         return result
 
@@ -371,109 +427,292 @@ class DiffView:
         """
         Use Azure AI Service (OpenAI or similar) to generate a natural language explanation of the diff.
         Returns a string explanation.
+        Built from the changed hunks only; see get_ai_change_analysis.
         """
-        if self.azure_ai_service:
-            prompt = (
-                "Compare the following two documents and explain the main differences in plain language:\n\n"
-                f"Document 1:\n{doc1}\n\nDocument 2:\n{doc2}\n\n"
-                "Provide a concise summary of the key differences.\n"
-                "Format it in a way that is easy to understand for a non-technical audience.\n"
-            )
-            result = self.azure_ai_service.generate_text(prompt, language=lang1)
-            return result.get("generated_text", "")
-        return "AI explanation not available."
+        return self._single_facet(doc1, doc2, "explanation", lang1, lang2)
 
     def get_ai_similarity_explanation(self, doc1, doc2, lang1='en', lang2='en'):
         """
         Use Azure AI to generate a plain-language explanation of why the documents are similar or different.
+        Built from the changed hunks only; see get_ai_change_analysis.
         """
-        if self.azure_ai_service:
-            prompt = (
-                "Given the following two documents, explain in simple terms why they are similar or different. "
-                "Highlight any important similarities or differences in content, tone, or structure.\n\n"
-                f"Document 1:\n{doc1}\n\nDocument 2:\n{doc2}\n"
-                                "Format it in a way that is easy to understand for a non-technical audience.\n"
-            )
-            result = self.azure_ai_service.generate_text(prompt, language=lang1)
-            return result.get("generated_text", "")
-        return "AI similarity explanation not available."
+        return self._single_facet(doc1, doc2, "similarity", lang1, lang2)
 
     def get_ai_suggested_edits(self, doc1, doc2, lang1='en', lang2='en'):
         """
         Use Azure AI to suggest edits to make doc1 more similar to doc2.
         Returns a string with suggested edits or instructions.
+        Built from the changed hunks only; see get_ai_change_analysis.
         """
-        if self.azure_ai_service:
-            prompt = (
-                "Suggest specific edits or changes to Document 1 so that it matches Document 2 as closely as possible. "
-                "List the edits as actionable steps.\n\n"
-                f"Document 1:\n{doc1}\n\nDocument 2:\n{doc2}\n"
-                                "Format it in a way that is easy to understand for a non-technical audience.\n"
-            )
-            result = self.azure_ai_service.generate_text(prompt, language=lang1)
-            return result.get("generated_text", "")
-        return "AI edit suggestions not available."
+        return self._single_facet(doc1, doc2, "suggested_edits", lang1, lang2)
 
     def get_ai_structural_comparison(self, doc1, doc2, lang1='en', lang2='en'):
         """
         Use Azure AI to compare the structure (sections, headings, order) of two documents.
         Returns a string with structural comparison.
+        Built from the changed hunks only; see get_ai_change_analysis.
         """
-        if self.azure_ai_service:
-            prompt = (
-                "Compare the structure of the following two documents. "
-                "Describe differences in sections, headings, and order of content.\n\n"
-                f"Document 1:\n{doc1}\n\nDocument 2:\n{doc2}\n"
-                                "Format it in a way that is easy to understand for a non-technical audience.\n"
-            )
-            result = self.azure_ai_service.generate_text(prompt, language=lang1)
-            return result.get("generated_text", "")
-        return "AI structural comparison not available."
+        return self._single_facet(doc1, doc2, "structural_comparison", lang1, lang2)
 
     def get_ai_section_alignment(self, doc1, doc2, lang1='en', lang2='en'):
         """
         Use Azure AI to align and compare sections/headings between two documents.
         Returns a mapping or explanation of section alignment.
+        Built from the changed hunks only; see get_ai_change_analysis.
         """
-        if self.azure_ai_service:
-            prompt = (
-                "Analyze the following two documents and provide a mapping of corresponding sections or headings. "
-                "If sections do not align, explain the differences.\n\n"
-                f"Document 1:\n{doc1}\n\nDocument 2:\n{doc2}\n"
-                                "Format it in a way that is easy to understand for a non-technical audience.\n"
-            )
-            result = self.azure_ai_service.generate_text(prompt, language=lang1)
-            return result.get("generated_text", "")
-        return "AI section alignment not available."
+        return self._single_facet(doc1, doc2, "section_alignment", lang1, lang2)
 
     def get_ai_highlighted_changes(self, doc1, doc2, lang1='en', lang2='en'):
         """
         Use Azure AI to highlight the most important changes between two documents.
         Returns a summary or list of highlighted changes.
+        Built from the changed hunks only; see get_ai_change_analysis.
         """
-        if self.azure_ai_service:
-            prompt = (
-                "Highlight the most important changes between the following two documents. "
-                "List the changes in order of significance.\n\n"
-                f"Document 1:\n{doc1}\n\nDocument 2:\n{doc2}\n"
-                                "Format it in a way that is easy to understand for a non-technical audience.\n"
-            )
-            result = self.azure_ai_service.generate_text(prompt, language=lang1)
-            return result.get("generated_text", "")
-        return "AI highlighted changes not available."
+        return self._single_facet(doc1, doc2, "highlighted_changes", lang1, lang2)
 
     def get_ai_risk_assessment_on_diff(self, doc1, doc2, lang1='en', lang2='en'):
         """
         Use Azure AI to assess if any changes between the documents introduce risk or compliance issues.
         Returns a risk assessment summary.
+        Built from the changed hunks only; see get_ai_change_analysis.
+        """
+        return self._single_facet(doc1, doc2, "risk_assessment", lang1, lang2)
+
+    def _single_facet(self, doc1, doc2, facet, lang1, lang2):
+        return self.get_ai_change_analysis(doc1, doc2, facets=[facet], lang1=lang1, lang2=lang2)[facet]
+
+    def get_ai_change_analysis(self, doc1, doc2, facets=None, token_budget=6000, context=2, max_workers=4, lang1='en', lang2='en'):
+        """
+        Use Azure AI to analyze only the changed regions of two documents.
+        The prompt is built from get_diff_blocks hunks (with `context` surrounding lines) packed
+        into batches of at most `token_budget` tokens, so cost scales with the size of the change
+        rather than the size of the documents. Each batch is analyzed separately and the
+        partial answers are merged into one answer per facet. Answers are written in lang1.
+
+        Parameters:
+        facets (list[str]): Keys of AI_DIFF_FACETS to request. Defaults to all of them.
+
+        Returns:
+        dict: {facet: text} for every requested facet.
         """
-        if self.azure_ai_service:
+        return self.get_ai_change_analysis_with_status(
+            doc1, doc2, facets, token_budget, context, max_workers, lang1, lang2
+        )[0]
+
+    def get_ai_change_analysis_with_status(self, doc1, doc2, facets=None, token_budget=6000, context=2, max_workers=4, lang1='en', lang2='en'):
+        """
+        get_ai_change_analysis, also reporting whether the answers cover every change.
+
+        Returns:
+        tuple: ({facet: text}, complete), where complete is False if the AI service is not
+        configured, any batch of hunks went unanswered or any facet fell back to its
+        "not available" message
+        """
+        facets = [f for f in (facets or AI_DIFF_FACETS) if f in AI_DIFF_FACETS]
+        fallback = {f: AI_DIFF_FACETS[f][1] for f in facets}
+        if not facets:
+            return fallback, True
+        if not self.azure_ai_service:
+            return fallback, False
+        blocks = self.get_diff_blocks(doc1, doc2, context=context)
+        if not blocks:
+            return {f: "No changes detected." for f in facets}, True
+        hunks = [self._format_hunk(part) for block in blocks for part in self._split_block(block, token_budget)]
+        batches = self._pack_hunks(hunks, token_budget)
+
+        def analyze(batch):
             prompt = (
-                "Review the differences between the following two documents and assess if any changes introduce risk, "
-                "compliance issues, or require urgent attention. Summarize your findings.\n\n"
-                f"Document 1:\n{doc1}\n\nDocument 2:\n{doc2}\n"
-                                "Format it in a way that is easy to understand for a non-technical audience.\n"
+                "The following are the changed regions (hunks) between two versions of a document, "
+                f"each shown with up to {context} unchanged lines of surrounding context. "
+                "Everything outside these hunks is identical in both versions.\n"
+                "Answer every field of the JSON object below about these changes, in plain language "
+                "that is easy to understand for a non-technical audience.\n"
+                + self._language_instruction(lang1, lang2) + "\n"
+                + "\n".join(f"- {f}: {AI_DIFF_FACETS[f][0]}" for f in facets)
+                + "\n\n" + "\n\n".join(batch) + "\n"
+            )
+            return self.azure_ai_service.generate_json(
+                prompt,
+                schema=self._facet_schema(facets),
+                schema_name="change_analysis",
+                max_tokens=256 * len(facets)
             )
-            result = self.azure_ai_service.generate_text(prompt, language=lang1)
-            return result.get("generated_text", "")
-        return "AI risk assessment not available."
\ No newline at end of file
+
+        if len(batches) == 1:
+            partials = [analyze(batches[0])]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            from services.http_client import run_in_context
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+                partials = list(executor.map(run_in_context(analyze), batches))
+        answered = [p for p in partials if p]
+        if not answered:
+            return fallback, False
+        result = self._reduce_facet_answers(answered, facets, token_budget, lang1)
+        values = self._facet_values(result, facets, fallback)
+        complete = len(answered) == len(partials) and all(values[f] != fallback[f] for f in facets)
+        return values, complete
+
+    def _format_hunk(self, block):
+        """
+        Render one get_diff_blocks entry (or a part of one from _split_block) as a compact
+        prompt fragment.
+        """
+        def side(number, start, end, lines):
+            if lines is None:
+                return f"Document {number}: no lines in this part"
+            return f"Document {number}, lines {start}-{end}:\n" + ("\n".join(lines) if lines else "(no lines)")
+
+        part = f", part {block['part']} of {block['parts']}" if 'part' in block else ""
+        return (
+            f"Hunk ({block['change_type']}{part}):\n"
+            f"{side(1, block['start1'], block['end1'], block['lines1'])}\n"
+            f"{side(2, block['start2'], block['end2'], block['lines2'])}"
+        )
+
+    def _split_block(self, block, token_budget):
+        """
+        Split a get_diff_blocks entry whose rendered hunk does not fit token_budget into
+        line-aligned parts that each do, so every changed line reaches the map step. Each
+        document gets half the budget per part; a single line longer than that is cut into
+        pieces that keep its line number.
+        """
+        from itertools import zip_longest
+        from utils.helpers import estimate_tokens
+        if estimate_tokens(self._format_hunk(block)) <= token_budget:
+            return [block]
+        side_budget = max((token_budget - 32) // 2, 3)
+        sides = zip_longest(
+            self._slice_lines(block['lines1'], block['start1'], side_budget),
+            self._slice_lines(block['lines2'], block['start2'], side_budget)
+        )
+        parts = []
+        for slice1, slice2 in sides:
+            start1, end1, lines1 = slice1 or (None, None, None)
+            start2, end2, lines2 = slice2 or (None, None, None)
+            parts.append({
+                'start1': start1, 'end1': end1, 'start2': start2, 'end2': end2,
+                'lines1': lines1, 'lines2': lines2, 'change_type': block['change_type']
+            })
+        for number, part in enumerate(parts, 1):
+            part.update(part=number, parts=len(parts))
+        return parts
+
+    @staticmethod
+    def _slice_lines(lines, first_line, token_budget):
+        """
+        Group consecutive lines into [(first line number, last line number, lines)] slices of
+        at most token_budget estimated tokens each.
+        """
+        from utils.helpers import estimate_tokens
+        piece_chars = (token_budget - 2) * 4
+        slices, current, used = [], [], 0
+        for number, line in enumerate(lines, first_line):
+            for offset in range(0, max(len(line), 1), piece_chars):
+                piece = line[offset:offset + piece_chars]
+                cost = estimate_tokens(piece) + 1
+                if current and used + cost > token_budget:
+                    slices.append(current)
+                    current, used = [], 0
+                current.append((number, piece))
+                used += cost
+        if current:
+            slices.append(current)
+        return [(group[0][0], group[-1][0], [piece for _, piece in group]) for group in slices]
+
+    @staticmethod
+    def _pack_hunks(hunks, token_budget):
+        """
+        Greedily pack formatted hunks into batches whose estimated size fits token_budget.
+        A hunk larger than the budget gets a batch of its own; split oversized diff blocks
+        with _split_block first.
+        """
+        from utils.helpers import estimate_tokens
+        batches, current, used = [], [], 0
+        for hunk in hunks:
+            cost = estimate_tokens(hunk)
+            if current and used + cost > token_budget:
+                batches.append(current)
+                current, used = [], 0
+            current.append(hunk)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _language_instruction(lang1, lang2):
+        if lang1 == lang2:
+            return f"Both versions are written in '{lang1}'. Write every answer in '{lang1}'.\n"
+        return f"Document 1 is written in '{lang1}' and Document 2 in '{lang2}'. Write every answer in '{lang1}'.\n"
+
+    @staticmethod
+    def _concatenate_facet_answers(partials, facets):
+        """
+        Fallback merge without the AI service: each facet's distinct partial answers joined in order.
+        """
+        merged = {}
+        for f in facets:
+            answers = [DiffView._facet_values(p, [f], {f: ""})[f] for p in partials]
+            merged[f] = "\n\n".join(dict.fromkeys(a for a in answers if a))
+        return merged
+
+    def _reduce_facet_answers(self, partials, facets, token_budget, language='en'):
+        """
+        Merge per-batch facet answers into one answer per facet, hierarchically when the
+        partial answers themselves do not fit in one request. If a merge request fails, the
+        group's answers are concatenated instead so no partial answer is lost.
+        """
+        import json
+        from utils.helpers import log_error
+        while len(partials) > 1:
+            serialized = [json.dumps(p, ensure_ascii=False) for p in partials]
+            groups = self._pack_hunks(serialized, token_budget)
+            if len(groups) == len(partials):
+                # Every answer fills the budget on its own; merge pairwise instead.
+                groups = [serialized[i:i + 2] for i in range(0, len(serialized), 2)]
+            merged = []
+            for group in groups:
+                if len(group) == 1:
+                    merged.append(json.loads(group[0]))
+                    continue
+                prompt = (
+                    "Each JSON object below analyzes a different part of the changes between two versions "
+                    "of a document. Combine them into a single JSON object with the same fields, merging "
+                    "and de-duplicating the answers and keeping the most significant points first. "
+                    f"Write every answer in '{language}'.\n\n"
+                    + "\n\n".join(group) + "\n"
+                )
+                combined = self.azure_ai_service.generate_json(
+                    prompt,
+                    schema=self._facet_schema(facets),
+                    schema_name="change_analysis",
+                    max_tokens=256 * len(facets)
+                )
+                if not combined:
+                    log_error(f"AI merge of {len(group)} partial change analyses failed; concatenating them")
+                    combined = self._concatenate_facet_answers([json.loads(g) for g in group], facets)
+                merged.append(combined)
+            partials = merged
+        return partials[0]
+
+    @staticmethod
+    def _facet_schema(facets):
+        return {
+            "type": "object",
+            "properties": {f: {"type": "string"} for f in facets},
+            "required": list(facets),
+            "additionalProperties": False
+        }
+
+    @staticmethod
+    def _facet_values(result, facets, fallback):
+        values = {}
+        for f in facets:
+            value = (result or {}).get(f)
+            if isinstance(value, list):
+                value = "\n".join(f"- {item}" for item in value)
+            elif isinstance(value, dict):
+                value = "\n".join(f"{k}: {v}" for k, v in value.items())
+            values[f] = value.strip() if isinstance(value, str) and value.strip() else fallback[f]
+        return values
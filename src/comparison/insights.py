@@ -12,6 +12,13 @@ import io
 import base64
 from wordcloud import WordCloud
 import numpy as np
+from utils.instrumentation import histogram
+
+INSIGHTS_STAGE_SECONDS = histogram("insights_stage_seconds", "Duration of each InsightsGenerator stage.", ["stage"])
+
+# Bump whenever analyzers, prompts or metrics change in a way that alters results;
+# stored comparison results are keyed by it and older ones are ignored.
+PIPELINE_VERSION = "1"
 
 class InsightsGenerator:
     def __init__(self, semantic_analyzer, sentiment_classifier, tone_analyzer, diff_view, azure_ai_service=None):
@@ -24,65 +31,88 @@ class InsightsGenerator:
     def get_document_insights(self, doc1, doc2):
         """
         Generate insights from two documents using all analysis modules.
-        Returns a dict with all metrics and insights.
+        Returns a dict with all metrics and insights. "fallbacks" lists the stages whose AI or
+        translation output was replaced by a fallback (service failing or not configured);
+        such results should be shown but not stored for reuse.
         """
+        fallbacks = []
+        # Translate each document once up front; every analyzer reuses the result.
+        multilingual_service = self.semantic_analyzer.multilingual_service
+        detected_lang_doc1 = detected_lang_doc2 = 'en'
+        if multilingual_service:
+            with INSIGHTS_STAGE_SECONDS.time(stage="translate"):
+                doc1, detected_lang_doc1, complete1 = multilingual_service.resolve_document_with_status(doc1)
+                doc2, detected_lang_doc2, complete2 = multilingual_service.resolve_document_with_status(doc2)
+            if not (complete1 and complete2):
+                fallbacks.append("translation")
+
         # Semantic Analysis
-        semantic = self.semantic_analyzer.analyze_semantics(doc1, doc2)
-        semantic_outlier = None
-        if hasattr(self.semantic_analyzer, "get_semantic_outliers"):
-            semantic_outlier = self.semantic_analyzer.get_semantic_outliers([doc1, doc2])
-        semantic_topics_doc1 = self.semantic_analyzer.get_document_topics(doc1)
-        semantic_topics_doc2 = self.semantic_analyzer.get_document_topics(doc2)
-        semantic_diversity = self.semantic_analyzer.get_semantic_diversity_score([doc1, doc2])
-        semantic_common_unique = self.semantic_analyzer.get_common_and_unique_phrases([doc1, doc2])
+        with INSIGHTS_STAGE_SECONDS.time(stage="semantic"):
+            semantic = self.semantic_analyzer.analyze_semantics(doc1, doc2)
+            semantic_outlier = None
+            if hasattr(self.semantic_analyzer, "get_semantic_outliers"):
+                semantic_outlier = self.semantic_analyzer.get_semantic_outliers([doc1, doc2])
+            semantic_topics_doc1 = self.semantic_analyzer.get_document_topics(doc1)
+            semantic_topics_doc2 = self.semantic_analyzer.get_document_topics(doc2)
+            semantic_diversity = self.semantic_analyzer.get_semantic_diversity_score([doc1, doc2])
+            semantic_common_unique = self.semantic_analyzer.get_common_and_unique_phrases([doc1, doc2])
 
         # Sentiment Analysis
-        sentiment1 = self.sentiment_classifier.classify_sentiment(doc1)
-        sentiment2 = self.sentiment_classifier.classify_sentiment(doc2)
-        sentiment_comparison = self.sentiment_classifier.compare_sentiment(doc1, doc2)
-        sentiment_risk1 = self.sentiment_classifier.assess_risk(sentiment1)
-        sentiment_risk2 = self.sentiment_classifier.assess_risk(sentiment2)
-        sentiment_alerts = self.sentiment_classifier.get_sentiment_alerts([doc1, doc2])
-        sentiment_trend = self.sentiment_classifier.get_sentiment_trend([doc1, doc2])
-        sentiment_variance = self.sentiment_classifier.get_sentiment_variance([doc1, doc2])
-        sentiment_extreme = self.sentiment_classifier.get_most_extreme_sentiment([doc1, doc2])
+        with INSIGHTS_STAGE_SECONDS.time(stage="sentiment"):
+            sentiment1 = self.sentiment_classifier.classify_sentiment(doc1)
+            sentiment2 = self.sentiment_classifier.classify_sentiment(doc2)
+            sentiment_comparison = self.sentiment_classifier.compare_sentiment(doc1, doc2)
+            sentiment_risk1 = self.sentiment_classifier.assess_risk(sentiment1)
+            sentiment_risk2 = self.sentiment_classifier.assess_risk(sentiment2)
+            sentiment_alerts = self.sentiment_classifier.get_sentiment_alerts([doc1, doc2])
+            sentiment_trend = self.sentiment_classifier.get_sentiment_trend([doc1, doc2])
+            sentiment_variance = self.sentiment_classifier.get_sentiment_variance([doc1, doc2])
+            sentiment_extreme = self.sentiment_classifier.get_most_extreme_sentiment([doc1, doc2])
 
         # Tone Shift
-        tone_shift = self.tone_analyzer.analyze_tone_shift(doc1, doc2)
-        tone_distribution = self.tone_analyzer.get_tone_distribution([doc1, doc2])
-        tone_trend = self.tone_analyzer.get_tone_trend([doc1, doc2])
-        tone_change_summary = self.tone_analyzer.get_tone_change_summary([doc1, doc2])
-        tone_controversial_1 = self.tone_analyzer.is_tone_controversial(doc1)
-        tone_controversial_2 = self.tone_analyzer.is_tone_controversial(doc2)
-        
+        with INSIGHTS_STAGE_SECONDS.time(stage="tone"):
+            tone_shift = self.tone_analyzer.analyze_tone_shift(doc1, doc2)
+            tone_distribution = self.tone_analyzer.get_tone_distribution([doc1, doc2])
+            tone_trend = self.tone_analyzer.get_tone_trend([doc1, doc2])
+            tone_change_summary = self.tone_analyzer.get_tone_change_summary([doc1, doc2])
+            tone_controversial_1 = self.tone_analyzer.is_tone_controversial(doc1)
+            tone_controversial_2 = self.tone_analyzer.is_tone_controversial(doc2)
+
         # Diff
-        diff_summary = self.diff_view.generate_diff_summary(doc1, doc2)
-        diff_percentage = self.diff_view.get_diff_percentage(doc1, doc2)
-        diff_stats = self.diff_view.get_diff_stats(doc1, doc2)
-        diff_blocks = self.diff_view.get_diff_blocks(doc1, doc2)
-        diff_word_stats = self.diff_view.get_word_diff_stats(doc1, doc2)
-        diff_as_dict = self.diff_view.get_diff_as_dict(doc1, doc2)
-        ai_diff_changes=self.diff_view.get_ai_generated_diff_explanation(doc1, doc2) if self.azure_ai_service else None
-        ai_highlighted_changes = self.diff_view.get_ai_highlighted_changes(doc1, doc2) if self.azure_ai_service else None
-        ai_risk_assessment = self.diff_view.get_ai_risk_assessment_on_diff(doc1, doc2) if self.azure_ai_service else None
+        with INSIGHTS_STAGE_SECONDS.time(stage="diff"):
+            diff_summary = self.diff_view.generate_diff_summary(doc1, doc2)
+            diff_percentage = self.diff_view.get_diff_percentage(doc1, doc2)
+            diff_stats = self.diff_view.get_diff_stats(doc1, doc2)
+            diff_blocks = self.diff_view.get_diff_blocks(doc1, doc2)
+            diff_word_stats = self.diff_view.get_word_diff_stats(doc1, doc2)
+            diff_as_dict = self.diff_view.get_diff_as_dict(doc1, doc2)
+        with INSIGHTS_STAGE_SECONDS.time(stage="ai_diff"):
+            ai_diff, complete = self.diff_view.get_ai_change_analysis_with_status(
+                doc1, doc2, facets=["explanation", "highlighted_changes", "risk_assessment"]
+            ) if self.azure_ai_service else ({}, False)
+        if not complete:
+            fallbacks.append("ai_diff")
+        ai_diff_changes = ai_diff.get("explanation")
+        ai_highlighted_changes = ai_diff.get("highlighted_changes")
+        ai_risk_assessment = ai_diff.get("risk_assessment")
 
-        # Multilingual/Translation
-        detected_lang_doc1 = self.semantic_analyzer.multilingual_service.detect_language(doc1) if self.semantic_analyzer.multilingual_service else 'en'
-        detected_lang_doc2 = self.semantic_analyzer.multilingual_service.detect_language(doc2) if self.semantic_analyzer.multilingual_service else 'en'
-     
         # Compliance & PII
-        compliance_flags_doc1 = self.tone_analyzer.get_compliance_flags(doc1)
-        compliance_flags_doc2 = self.tone_analyzer.get_compliance_flags(doc2)
-        pii_doc1 = self.sentiment_classifier.detect_pii(doc1) if self.azure_ai_service else []
-        pii_doc2 = self.sentiment_classifier.detect_pii(doc2) if self.azure_ai_service else []
-
-
+        with INSIGHTS_STAGE_SECONDS.time(stage="compliance"):
+            compliance_flags_doc1 = self.tone_analyzer.get_compliance_flags(doc1)
+            compliance_flags_doc2 = self.tone_analyzer.get_compliance_flags(doc2)
+        with INSIGHTS_STAGE_SECONDS.time(stage="pii"):
+            pii_doc1 = self.sentiment_classifier.detect_pii(doc1) if self.azure_ai_service else []
+            pii_doc2 = self.sentiment_classifier.detect_pii(doc2) if self.azure_ai_service else []
+        if not self.azure_ai_service or pii_doc1 is None or pii_doc2 is None:
+            fallbacks.append("pii")
 
         # Visualizations
-        docs = [doc1, doc2]
-        sentiment_heatmap = self.sentiment_classifier.get_sentiment_heatmap_data(docs)
-        heatmap_img = self.generate_sentiment_heatmap(sentiment_heatmap)
-        metrics_bar_img = self.generate_metrics_comparison_chart(doc1, doc2)
+        with INSIGHTS_STAGE_SECONDS.time(stage="charts"):
+            docs = [doc1, doc2]
+            sentiment_heatmap = self.sentiment_classifier.get_sentiment_heatmap_data(docs)
+            heatmap_img = self.generate_sentiment_heatmap(sentiment_heatmap)
+            metrics_bar_img = self.generate_metrics_comparison_chart(doc1, doc2)
+            dashboard_charts = self.generate_dashboard_charts(doc1, doc2)
 
 
 
@@ -137,9 +167,11 @@ class InsightsGenerator:
             "pii_doc2": pii_doc2,
 
             # Visualizations
-            "charts": self.generate_dashboard_charts(doc1, doc2),
+            "charts": dashboard_charts,
             "sentiment_heatmap": heatmap_img,
             "metrics_comparison": metrics_bar_img,
+
+            "fallbacks": fallbacks,
         }
         return insights
 
@@ -1,30 +1,104 @@
 import requests
 import os
-import time
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from models import Document
+from services.translation_memory import TranslationMemory, normalize_sentence
+from services.http_client import get_client, run_in_context
+from utils.langid import detect_language as detect_language_offline
+from utils.instrumentation import CACHE_REQUESTS
 
 load_dotenv()
 
+# Azure Translator v3 limits per /translate request.
+TRANSLATOR_MAX_ELEMENTS = 1000
+TRANSLATOR_MAX_CHARS = 50000
+
 def chunk_text(text, max_chars=4000):
     if not text:
         return []
     return [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
 
-def azure_post_with_retry(url, headers, body, max_retries=5, timeout=10):
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=body, timeout=timeout)
-            if response.status_code == 429:
-                retry_after = int(response.headers.get("Retry-After", "2"))
-                time.sleep(retry_after * (attempt + 1))
-                continue
-            if response.status_code in (502, 503, 504):
-                time.sleep(2 ** attempt)
-                continue
-            return response
-        except requests.RequestException:
-            time.sleep(2 ** attempt)
-    return None
+def split_sentences(text, max_chars=4000):
+    """
+    Split text into sentence pieces that concatenate back to the original text exactly.
+    Each piece keeps its trailing whitespace; sentences longer than max_chars are broken
+    at the last space before the limit, or hard-split when there is none.
+    """
+    if not text:
+        return []
+    pieces = []
+    for sentence in re.split(r'(?<=[.!?\u3002\uff01\uff1f])(?=\s)|(?<=\n)', text):
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars) + 1 or max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:]
+        if sentence:
+            pieces.append(sentence)
+    # Attach leading whitespace of each piece to the previous one so pieces start with text.
+    merged = []
+    for piece in pieces:
+        stripped = piece.lstrip()
+        if merged and stripped != piece:
+            merged[-1] += piece[:len(piece) - len(stripped)]
+            piece = stripped
+        if piece:
+            merged.append(piece)
+    return merged
+
+def group_sentences(sentences, max_chars=4000):
+    """
+    Group consecutive sentence pieces into elements of at most max_chars, keeping
+    sentences intact so each element gives the translator whole-sentence context.
+    """
+    elements, current = [], ""
+    for sentence in sentences:
+        if current and len(current) + len(sentence) > max_chars:
+            elements.append(current)
+            current = ""
+        current += sentence
+    if current:
+        elements.append(current)
+    return elements
+
+def pack_translation_batches(elements, max_elements=TRANSLATOR_MAX_ELEMENTS, max_chars=TRANSLATOR_MAX_CHARS):
+    """
+    Pack elements into request batches within the Translator element and character limits.
+    Returns a list of lists of element indices.
+    """
+    batches, current, size = [], [], 0
+    for index, element in enumerate(elements):
+        if current and (len(current) >= max_elements or size + len(element) > max_chars):
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += len(element)
+    if current:
+        batches.append(current)
+    return batches
+
+def same_language(code1, code2):
+    """
+    True if two language codes name the same language ('en' and 'en-US' match; Chinese
+    script variants such as 'zh-Hans' and 'zh-Hant' do not).
+    """
+    code1, code2 = (code1 or '').lower(), (code2 or '').lower()
+    if code1 == code2:
+        return True
+    primary1, primary2 = code1.split('-')[0], code2.split('-')[0]
+    return primary1 == primary2 and primary1 not in ('zh', 'sr')
+
+def azure_post_with_retry(url, headers, body, session=None):
+    """
+    POST to an Azure endpoint through the shared client layer (rate limiting, circuit breaker,
+    jittered backoff and request deadline). Returns the response, or None on failure.
+    """
+    return get_client(url).post(url, headers=headers, json=body, session=session)
 
 class MultilingualService:
     def __init__(self, azure_translate_client=None, subscription_key=None, endpoint=None, region=None, azure_ai_service=None):
@@ -33,67 +107,214 @@ class MultilingualService:
         self.endpoint = endpoint or os.getenv('AZURE_TRANSLATOR_ENDPOINT')
         self.region = region or os.getenv('AZURE_TRANSLATOR_REGION')
         self.azure_ai_service = azure_ai_service
+        self.max_workers = int(os.getenv('AZURE_TRANSLATOR_MAX_WORKERS', '4'))
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(self.max_workers, 10))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.document_cache_size = int(os.getenv('TRANSLATION_DOCUMENT_CACHE_SIZE', '256'))
+        self._document_cache = OrderedDict()
+        self._document_lock = threading.Lock()
+        self.local_detection_threshold = float(os.getenv('LANGUAGE_DETECTION_THRESHOLD', '0.5'))
+        self.translation_memory = None
+        memory_path = os.getenv('TRANSLATION_MEMORY_PATH', 'translation_memory.db')
+        if self.subscription_key and self.endpoint and memory_path:
+            try:
+                self.translation_memory = TranslationMemory(memory_path)
+            except Exception:
+                self.translation_memory = None
+
+    def _translator_headers(self):
+        return {
+            'Ocp-Apim-Subscription-Key': self.subscription_key,
+            'Ocp-Apim-Subscription-Region': self.region or 'global',
+            'Content-type': 'application/json'
+        }
+
+    def is_translation_configured(self):
+        return bool(self.azure_translate_client or (self.subscription_key and self.endpoint))
+
+    def resolve_document(self, text, target_language='en'):
+        """
+        Translate a document once per (content hash, target language) and share the result.
+        Translation is skipped when the detected source language already matches the target.
+        Results where some text could not be translated are returned but not cached, so the
+        next request retries them.
+
+        Returns:
+        tuple: (text in the target language, detected source language or None)
+        """
+        return self.resolve_document_with_status(text, target_language)[:2]
+
+    def resolve_document_with_status(self, text, target_language='en'):
+        """
+        resolve_document, also reporting whether the text really is in target_language.
+
+        Returns:
+        tuple: (text, detected source language or None, complete), where complete is False if
+        the document needed translation and some or all of it was left untranslated because
+        the translator failed or is not configured
+        """
+        if not text:
+            return text, None, True
+        key = (Document.for_text(text).content_hash, target_language)
+        with self._document_lock:
+            cached = self._document_cache.get(key)
+            if cached is not None:
+                self._document_cache.move_to_end(key)
+                CACHE_REQUESTS.inc(cache="translated_documents", result="hit")
+                return cached
+        CACHE_REQUESTS.inc(cache="translated_documents", result="miss")
+        source_language = self.detect_language(text)
+        if source_language and same_language(source_language, target_language):
+            translated, complete = text, True
+        elif not self.is_translation_configured():
+            # Cached: the outcome cannot change until the translator is configured and restarted.
+            translated, complete = text, not source_language
+        else:
+            translated, complete = self._translate(text, target_language, source_language)
+            if not complete:
+                return translated, source_language, False
+        with self._document_lock:
+            self._document_cache[key] = (translated, source_language, complete)
+            self._document_cache.move_to_end(key)
+            if translated is not text:
+                # Analyzers handed the translated text must not translate it again.
+                out_key = (Document.for_text(translated).content_hash, target_language)
+                self._document_cache[out_key] = (translated, target_language, True)
+            while len(self._document_cache) > self.document_cache_size:
+                self._document_cache.popitem(last=False)
+        return translated, source_language, complete
+
+    def prepare_document(self, text, target_language='en'):
+        """
+        Return the document in target_language, translating at most once per document.
+        Without a translator the text is returned as-is, without detecting its language.
+        """
+        if not self.is_translation_configured():
+            return text
+        return self.resolve_document(text, target_language)[0]
 
     def translate(self, text, target_language='en', source_language=None):
         """
         Translate the given text to the target language using Azure Translator Text API if configured.
         """
+        return self._translate(text, target_language, source_language)[0]
+
+    def _translate(self, text, target_language, source_language=None):
+        """
+        Returns:
+        tuple: (translated text, True if every part was translated; parts that failed are
+        left in the original language)
+        """
         if self.azure_translate_client:
             # If a client is provided, use it (custom implementation)
-            return self.azure_translate_client.translate(text, target_language)
+            return self.azure_translate_client.translate(text, target_language), True
         elif self.subscription_key and self.endpoint:
-            # Use Azure Translator REST API
-            path = '/translate?api-version=3.0'
-            params = f'&to={target_language}'
-            if source_language:
-                params += f'&from={source_language}'
-            constructed_url = self.endpoint + path + params
-            headers = {
-                'Ocp-Apim-Subscription-Key': self.subscription_key,
-                'Ocp-Apim-Subscription-Region': self.region or 'global',
-                'Content-type': 'application/json'
-            }
-            translated_chunks = []
-            for chunk in chunk_text(text):
-                body = [{'text': chunk}]
-                response = azure_post_with_retry(constructed_url, headers, body)
-                if response and response.status_code == 200:
-                    result = response.json()
-                    if result and 'translations' in result[0]:
-                        translated_chunks.append(result[0]['translations'][0]['text'])
-                    elif result and isinstance(result[0], dict) and result[0].get('translations'):
-                        translated_chunks.append(result[0]['translations'][0]['text'])
-                    else:
-                        translated_chunks.append(chunk)
-                else:
-                    translated_chunks.append(chunk)
-            return "".join(translated_chunks)
+            # Use Azure Translator REST API: sentence-aligned elements, many per request
+            if self.translation_memory:
+                return self._translate_with_memory(text, target_language, source_language)
+            elements = group_sentences(split_sentences(text))
+            translated = self._translate_elements(elements, target_language, source_language, keep_failed=False)
+            complete = all(out is not None for out in translated)
+            return "".join(element if out is None else out for element, out in zip(elements, translated)), complete
         # Fallback: return text as-is
-        return text
+        return text, True
+
+    def _translate_with_memory(self, text, target_language, source_language=None):
+        """
+        Translate sentence by sentence through the translation memory: only sentences not
+        already in memory are sent to the translator, and the results are stitched back in order.
+
+        Returns:
+        tuple: (translated text, True if every sentence was translated)
+        """
+        pieces = split_sentences(text)
+        sentences = [normalize_sentence(piece) for piece in pieces]
+        known = self.translation_memory.get_many(set(s for s in sentences if s), source_language, target_language)
+        missing = list(dict.fromkeys(s for s in sentences if s and s not in known))
+        CACHE_REQUESTS.inc(len(known), cache="translation_memory", result="hit")
+        CACHE_REQUESTS.inc(len(missing), cache="translation_memory", result="miss")
+        if missing:
+            translated = self._translate_elements(missing, target_language, source_language, keep_failed=False)
+            learned = [(src, out) for src, out in zip(missing, translated) if out is not None]
+            self.translation_memory.put_many(learned, source_language, target_language)
+            known.update(learned)
+        output, complete = [], True
+        for piece, sentence in zip(pieces, sentences):
+            if sentence not in known:
+                complete = complete and not sentence
+                output.append(piece)
+                continue
+            lead = piece[:len(piece) - len(piece.lstrip())]
+            trail = piece[len(piece.rstrip()):]
+            output.append(lead + known[sentence] + trail)
+        return "".join(output), complete
+
+    def _translate_elements(self, elements, target_language, source_language=None, keep_failed=True):
+        """
+        Translate a list of text elements, packing them into as few Translator requests as the
+        service limits allow and sending the batches concurrently over the pooled session.
+        Leading/trailing whitespace is preserved; elements that fail to translate are returned
+        as-is, or as None when keep_failed is False.
+        """
+        path = '/translate?api-version=3.0'
+        params = f'&to={target_language}'
+        if source_language:
+            params += f'&from={source_language}'
+        constructed_url = self.endpoint + path + params
+        headers = self._translator_headers()
+        cores = []
+        for element in elements:
+            core = element.strip()
+            lead = element[:len(element) - len(element.lstrip())]
+            trail = element[len(element.rstrip()):] if core else ""
+            cores.append((lead, core, trail))
+        translated = list(elements) if keep_failed else [None] * len(elements)
+        pending = [i for i, (_, core, _) in enumerate(cores) if core]
+
+        def send(batch):
+            body = [{'text': cores[i][1]} for i in batch]
+            response = azure_post_with_retry(constructed_url, headers, body, session=self.session)
+            if response is None or response.status_code != 200:
+                return
+            result = response.json()
+            for i, item in zip(batch, result or []):
+                if isinstance(item, dict) and item.get('translations'):
+                    lead, _, trail = cores[i]
+                    translated[i] = lead + item['translations'][0]['text'] + trail
+
+        batches = [[pending[j] for j in batch] for batch in pack_translation_batches([cores[i][1] for i in pending])]
+        if len(batches) <= 1:
+            for batch in batches:
+                send(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                list(executor.map(run_in_context(send), batches))
+        return translated
 
     def detect_language(self, text):
         """
-        Detect the language of the given text using Azure Translator Text API if configured.
+        Detect the language of the given text with the bundled offline identifier, falling back
+        to the Azure Translator Text API (if configured) only when the local result is uncertain.
         """
+        language, confidence = detect_language_offline(text)
+        if language and confidence >= self.local_detection_threshold:
+            return language
         if self.subscription_key and self.endpoint:
             path = '/detect?api-version=3.0'
             constructed_url = self.endpoint + path
-            headers = {
-                'Ocp-Apim-Subscription-Key': self.subscription_key,
-                'Ocp-Apim-Subscription-Region': self.region or 'global',
-                'Content-type': 'application/json'
-            }
+            headers = self._translator_headers()
             for chunk in chunk_text(text, 1000):
                 body = [{'text': chunk}]
-                response = azure_post_with_retry(constructed_url, headers, body)
+                response = azure_post_with_retry(constructed_url, headers, body, session=self.session)
                 if response and response.status_code == 200:
                     result = response.json()
                     if result and 'language' in result[0]:
                         return result[0]['language']
                     elif result and isinstance(result[0], dict) and result[0].get('language'):
                         return result[0]['language']
-            return None
-        return None
+        return language
 
     def summarize_text(self, text, language='en'):
         """
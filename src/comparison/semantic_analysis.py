@@ -1,3 +1,5 @@
+from models import Document
+
 class SemanticAnalyzer:
     def __init__(self, nlp_service=None, multilingual_service=None, azure_ai_service=None):
         self.nlp_service = nlp_service
@@ -10,9 +12,10 @@ class SemanticAnalyzer:
     def translate_document(self, document, target_language='en'):
         """
         Translate the document to the target language using multilingual service if available.
+        Translations are resolved once per document and shared with the other analyzers.
         """
         if self.multilingual_service:
-            return self.multilingual_service.translate(document, target_language)
+            return self.multilingual_service.prepare_document(document, target_language)
         return document
 
     def analyze_semantics(self, document1, document2, lang1='en', lang2='en'):
@@ -148,7 +151,7 @@ class SemanticAnalyzer:
                 analysis = self.nlp_service.analyze_text(doc)
                 phrases = set(analysis.get("key_phrases", []))
             else:
-                phrases = set(doc.lower().split())
+                phrases = set(Document.for_text(doc).vocabulary)
             phrase_sets.append(phrases)
         common = set.intersection(*phrase_sets)
         unique = [list(phrases - common) for phrases in phrase_sets]
@@ -189,7 +192,7 @@ class SemanticAnalyzer:
         else:
             # Fallback: most common words as topics
             from collections import Counter
-            words = [w for w in document.lower().split() if len(w) > 3]
+            words = [w for w in Document.for_text(document).lower_words if len(w) > 3]
             return [w for w, _ in Counter(words).most_common(5)]
 
     def get_semantic_overlap_report(self, documents):
@@ -218,7 +221,7 @@ class SemanticAnalyzer:
                 analysis = self.nlp_service.analyze_text(doc)
                 keywords = set(analysis.get("key_phrases", []))
             else:
-                keywords = set(doc.lower().split())
+                keywords = set(Document.for_text(doc).vocabulary)
             all_keywords.append(keywords)
         unique_keywords = []
         for i, kws in enumerate(all_keywords):
@@ -268,21 +271,48 @@ class SemanticAnalyzer:
                     no_overlap.append((i, j))
         return no_overlap
 
-    def get_semantic_keyword_frequency(self, documents):
+    def _key_terms(self, doc):
+        if self.nlp_service:
+            return self.nlp_service.analyze_text(doc).get("key_phrases", [])
+        return None
+
+    def get_semantic_keyword_frequency(self, documents, top_k=None):
         """
         Returns a frequency count of all key phrases (Azure) or tokens across all documents.
+        With top_k, only the top_k most frequent terms are returned, counted with a
+        fixed-size sketch so memory does not grow with the corpus vocabulary; counts may
+        then be overestimated by at most CorpusStatistics' reported bound.
         """
+        if top_k:
+            statistics = self._corpus_statistics(documents, top_k)
+            return dict(statistics.keywords.top())
         from collections import Counter
         freq = Counter()
         for doc in documents:
-            if self.nlp_service:
-                analysis = self.nlp_service.analyze_text(doc)
-                phrases = analysis.get("key_phrases", [])
-            else:
-                phrases = doc.lower().split()
+            phrases = self._key_terms(doc)
+            if phrases is None:
+                phrases = Document.for_text(doc).lower_words
             freq.update(phrases)
         return dict(freq)
 
+    def _corpus_statistics(self, documents, top_k):
+        from utils.sketches import CorpusStatistics
+        statistics = CorpusStatistics(top_k=top_k)
+        for doc in documents:
+            phrases = self._key_terms(doc)
+            if phrases is None:
+                statistics.add_text(doc.content if isinstance(doc, Document) else doc)
+            else:
+                statistics.add_terms(phrases)
+        return statistics
+
+    def get_corpus_statistics(self, documents, top_k=20):
+        """
+        Returns approximate corpus statistics (token count, distinct-term estimate and top
+        keywords with their error bounds) computed in bounded memory.
+        """
+        return self._corpus_statistics(documents, top_k).summary(top_k)
+
     def get_semantic_gap_report(self, doc1, doc2):
         """
         Returns a report of the main semantic gaps between two documents.
@@ -9,7 +9,7 @@ class SentimentRiskClassifier:
 
     def translate_document(self, document, target_language='en'):
         if self.multilingual_service:
-            return self.multilingual_service.translate(document, target_language)
+            return self.multilingual_service.prepare_document(document, target_language)
         return document
 
     def classify_sentiment(self, document_content, lang='en'):
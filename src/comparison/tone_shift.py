@@ -1,3 +1,12 @@
+from models import Document
+from utils.keyword_matcher import KeywordMatcher
+
+COMPLIANCE_KEYWORDS = (
+    "confidential", "policy", "regulation", "compliance", "violation",
+    "breach", "audit", "legal", "mandatory", "prohibited", "restricted"
+)
+STRONG_WORDS = ("must", "immediately", "critical", "urgent", "important", "required", "ensure", "not allowed")
+
 class ToneShiftAnalyzer:
     def __init__(self, nlp_service=None, multilingual_service=None, azure_ai_service=None):
         self.nlp_service = nlp_service
@@ -9,7 +18,7 @@ class ToneShiftAnalyzer:
 
     def translate_document(self, document, target_language='en'):
         if self.multilingual_service:
-            return self.multilingual_service.translate(document, target_language)
+            return self.multilingual_service.prepare_document(document, target_language)
         return document
 
     def detect_tone(self, document, lang='en'):
@@ -53,14 +62,10 @@ class ToneShiftAnalyzer:
         return len(strong) > 1
 
     def get_compliance_flags(self, document):
-        compliance_keywords = [
-            "confidential", "policy", "regulation", "compliance", "violation",
-            "breach", "audit", "legal", "mandatory", "prohibited", "restricted"
-        ]
         flags = []
-        text = document.lower()
-        for word in compliance_keywords:
-            if word in text:
+        found = KeywordMatcher.for_keywords(COMPLIANCE_KEYWORDS).found(document)
+        for word in COMPLIANCE_KEYWORDS:
+            if word in found:
                 flags.append(f"Compliance keyword detected: '{word}'")
         tone = self.detect_tone(document)
         if tone == "Negative":
@@ -68,13 +73,20 @@ class ToneShiftAnalyzer:
         return flags
 
     def highlight_important_tone_points(self, document):
+        """
+        Sentences containing a strong word (whole words, one pass over the document) or "!".
+        """
         import re
-        sentences = re.split(r'(?<=[.!?])\s+', document)
+        from bisect import bisect_right
+        text = Document.for_text(document).content
+        boundaries = [m.end() for m in re.finditer(r'(?<=[.!?])\s+', text)]
+        sentences = re.split(r'(?<=[.!?])\s+', text)
+        marked = set()
+        for _, start, _ in KeywordMatcher.for_keywords(STRONG_WORDS).finditer(text):
+            marked.add(bisect_right(boundaries, start))
         important = []
-        strong_words = ["must", "immediately", "critical", "urgent", "important", "required", "ensure", "not allowed"]
-        for sent in sentences:
-            sent_lower = sent.lower()
-            if any(word in sent_lower for word in strong_words) or "!" in sent:
+        for index, sent in enumerate(sentences):
+            if index in marked or "!" in sent:
                 important.append(sent.strip())
         return important
 
@@ -115,7 +127,7 @@ class ToneShiftAnalyzer:
                     return analysis["confidence_scores"]
             except Exception:
                 pass
-        text = document.lower()
+        text = Document.for_text(document).lower
         return {
             "positive": sum(word in text for word in ["happy", "joy", "delighted"]),
             "negative": sum(word in text for word in ["angry", "upset", "frustrated"]),
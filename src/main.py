@@ -1,39 +1,56 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, send_file, g, Response, abort
 import os
 from dotenv import load_dotenv
-from wordcloud import WordCloud
+from wordcloud import WordCloud, STOPWORDS
 from services.azure_auth import AzureAuth
 from services.azure_services import LocalNLPService, AzureAIService, AzureBlobStorageService, AzureTableAuditService
+from services.http_client import set_request_deadline, clear_request_deadline, client_states
+from services.blob_writer import BlobWriter, LocalBlobStorageService, content_hash, json_safe
+from services.result_store import ResultStore
+from services.audit_writer import AuditWriter
+from services.local_audit import LocalTableAuditService
 from comparison.semantic_analysis import SemanticAnalyzer
 from comparison.sentiment_risk import SentimentRiskClassifier
 from comparison.tone_shift import ToneShiftAnalyzer
 from comparison.diff_view import DiffView
-from comparison.insights import InsightsGenerator
+from comparison.insights import InsightsGenerator, PIPELINE_VERSION
 from comparison.multilingual import MultilingualService
 from utils.metrics import get_all_metrics
+from utils.tokenizer import StaleVocabularyError, Vocabulary, word_frequencies
 from utils.helpers import log_error, is_supported_filetype
+from utils.instrumentation import histogram, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.profiling import ProfileStore, profiled, is_profile_admin
 from models import Document, AnalysisResult
 import io
 import base64
+import time
 
 load_dotenv()
-UPLOAD_FOLDER = 'uploads'
+HTTP_REQUEST_SECONDS = histogram("http_request_seconds", "Latency of HTTP requests served by the app.",
+                                 ["endpoint", "method", "status"])
+FILE_READ_SECONDS = histogram("file_read_seconds", "Time to extract text from an uploaded file.", ["format"])
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your_default_secret_key')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+profile_store = ProfileStore(os.getenv('PROFILE_DIR', 'profiles'))
 
 # Initialize Azure services and analyzers
 azure_auth = AzureAuth(
     os.getenv('AZURE_CLIENT_ID'),
     os.getenv('AZURE_CLIENT_SECRET'),
-    os.getenv('AZURE_TENANT_ID')
+    os.getenv('AZURE_TENANT_ID'),
+    scope=os.getenv('AZURE_AUTH_SCOPE', 'https://cognitiveservices.azure.com/.default')
 )
 azure_ai_service = AzureAIService(
     os.getenv('AZURE_AI_ENDPOINT'),
     os.getenv('AZURE_AI_API_KEY'),
     region=os.getenv('AZURE_AI_REGION'),
-    deployment_name=os.getenv('AZURE_AI_DEPLOYMENT', 'gpt-4')
+    deployment_name=os.getenv('AZURE_AI_DEPLOYMENT', 'gpt-4'),
+    # Service-principal credentials stand in for the API key when it is not set.
+    token_provider=azure_auth.get_access_token
+    if azure_auth.client_id and azure_auth.client_secret and azure_auth.tenant_id else None
 )
 multilingual_service = MultilingualService(
     subscription_key=os.getenv('AZURE_TRANSLATOR_KEY'),
@@ -51,13 +68,37 @@ AZURE_BLOB_CONNECTION_STRING = os.getenv('AZURE_BLOB_CONNECTION_STRING')
 AZURE_BLOB_CONTAINER = os.getenv('AZURE_BLOB_CONTAINER', 'documents')
 AZURE_TABLE_CONNECTION_STRING = os.getenv('AZURE_TABLE_CONNECTION_STRING')
 AZURE_TABLE_NAME = os.getenv('AZURE_TABLE_NAME', 'AuditLog')
-blob_service = AzureBlobStorageService(AZURE_BLOB_CONNECTION_STRING, AZURE_BLOB_CONTAINER)
-audit_service = AzureTableAuditService(AZURE_TABLE_CONNECTION_STRING, AZURE_TABLE_NAME)
+# Local stand-ins replace Blob and Table storage only when USE_LOCAL_STANDINS is set
+# (OpenAI and Translator are pointed at stand-ins via their endpoint variables). Without
+# it a missing connection string fails at startup rather than writing to local disk.
+USE_LOCAL_STANDINS = os.getenv('USE_LOCAL_STANDINS', '').lower() in ('1', 'true', 'yes')
+if USE_LOCAL_STANDINS:
+    blob_service = LocalBlobStorageService(os.getenv('LOCAL_BLOB_ROOT', 'blob_store'))
+else:
+    blob_service = AzureBlobStorageService(AZURE_BLOB_CONNECTION_STRING, AZURE_BLOB_CONTAINER)
+blob_writer = BlobWriter(blob_service)
+result_store = ResultStore(blob_service, blob_writer, os.getenv('PIPELINE_VERSION', PIPELINE_VERSION))
+if USE_LOCAL_STANDINS:
+    audit_service = LocalTableAuditService(os.getenv('LOCAL_TABLE_PATH', 'audit_log.db'))
+else:
+    audit_service = AzureTableAuditService(AZURE_TABLE_CONNECTION_STRING, AZURE_TABLE_NAME)
+audit_writer = AuditWriter(audit_service)
 
 def generate_wordcloud(text):
     if not text.strip():
         return ""
-    wc = WordCloud(width=800, height=400, background_color='white').generate(text)
+    # Frequencies come from the document's cached term IDs instead of WordCloud re-tokenizing the text.
+    document = Document.for_text(text)
+    try:
+        ids, generation = document.encoded_term_ids()
+        frequencies = word_frequencies(ids, STOPWORDS, generation=generation)
+    except StaleVocabularyError:
+        # The shared vocabulary was reset meanwhile; count with a private one instead.
+        private = Vocabulary(max_terms=2 ** 62)
+        frequencies = word_frequencies(private.encode(document.lower_words)[0], STOPWORDS, vocabulary=private)
+    if not frequencies:
+        return ""
+    wc = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(frequencies)
     img_io = io.BytesIO()
     wc.to_image().save(img_io, format='PNG')
     img_io.seek(0)
@@ -68,6 +109,10 @@ def allowed_file(filename):
 
 def read_file_content(filepath):
     ext = filepath.rsplit('.', 1)[-1].lower()
+    with FILE_READ_SECONDS.time(format=ext if is_supported_filetype(filepath) else "other"):
+        return _read_file_content(filepath, ext)
+
+def _read_file_content(filepath, ext):
     if ext in ['txt', 'md']:
         with open(filepath, encoding='utf-8', errors='ignore') as f:
             return f.read()
@@ -93,15 +138,64 @@ def read_file_content(filepath):
         return df.to_string(index=False)
     return ""
 
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '120'))
+
+@app.before_request
+def start_request_deadline():
+    # Azure calls made while serving this request (retries included) must finish within the deadline.
+    seconds = REQUEST_DEADLINE_SECONDS
+    try:
+        requested = float(request.headers.get('X-Request-Timeout', ''))
+        if requested > 0:
+            seconds = min(seconds, requested) if seconds else requested
+    except ValueError:
+        pass
+    g.deadline_token = set_request_deadline(seconds)
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def start_request_documents():
+    # Analyzers share one Document (and its cached views) per text until the request ends.
+    g.documents_token = Document.begin_request()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or "unmatched",
+                                     method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def end_request_deadline(exc=None):
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        clear_request_deadline(token)
+
+@app.teardown_request
+def end_request_documents(exc=None):
+    token = g.pop('documents_token', None)
+    if token is not None:
+        Document.end_request(token)
+
 @app.route('/health')
 def health():
     return {
         "nlp_service": "LocalNLPService",
         "semantic_analyzer": semantic_analyzer.health_check(),
         "sentiment_classifier": sentiment_classifier.health_check(),
-        "tone_shift_analyzer": tone_shift_analyzer.health_check()
+        "tone_shift_analyzer": tone_shift_analyzer.health_check(),
+        "azure_circuits": client_states(),
+        "blob_writer": blob_writer.stats(),
+        "audit_writer": audit_writer.stats(),
+        "results": result_store.stats(),
+        "llm_cache": azure_ai_service.response_cache.stats()
     }
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
@@ -135,6 +229,7 @@ def index():
     return render_template('index.html', health_status=health_status)
 
 @app.route('/compare')
+@profiled(profile_store)
 def compare():
     doc1_name = request.args.get('doc1_name')
     doc2_name = request.args.get('doc2_name')
@@ -143,6 +238,29 @@ def compare():
     try:
         doc1_content = read_file_content(doc1_path)
         doc2_content = read_file_content(doc2_path)
+    except Exception as e:
+        log_error(f"Error reading files {doc1_name} or {doc2_name}", exc=e)
+        flash("Error reading uploaded files.", "danger")
+        return redirect(url_for('index'))
+    # Identical content (even under other file names) reuses the stored result.
+    stored = result_store.get(content_hash(doc1_content), content_hash(doc2_content))
+    sections = stored.load("summary", "insights", "diff", "charts") if stored else None
+    if sections:
+        charts = dict(sections["charts"])
+        wordcloud1, wordcloud2 = charts.pop("wordcloud1", ""), charts.pop("wordcloud2", "")
+        insights = dict(sections["insights"], **sections["diff"], **charts)
+        audit_writer.log_audit(
+            user_id=None,
+            action="compare",
+            doc1_name=doc1_name,
+            doc2_name=doc2_name,
+            result_summary="Reused stored result",
+            status="Success"
+        )
+        return render_template('compare.html', doc1_name=doc1_name, doc2_name=doc2_name,
+                               insights=insights, metrics=sections["summary"].get("metrics", {}),
+                               wordcloud1=wordcloud1, wordcloud2=wordcloud2)
+    try:
         wordcloud1 = generate_wordcloud(doc1_content)
         wordcloud2 = generate_wordcloud(doc2_content)
         doc1 = Document(title=doc1_name, content=doc1_content)
@@ -152,8 +270,9 @@ def compare():
         flash("Error reading uploaded files.", "danger")
         return redirect(url_for('index'))
     try:
-        insights = insights_generator.get_document_insights(doc1.content, doc2.content)
-        metrics = get_all_metrics(doc1.content, doc2.content)
+        # JSON-safe types, so this render matches one served from the result store.
+        insights = json_safe(insights_generator.get_document_insights(doc1.content, doc2.content))
+        metrics = json_safe(get_all_metrics(doc1.content, doc2.content))
         analysis_result = AnalysisResult(
             document=doc1,
             semantic_analysis=insights.get("semantic_report", {}),
@@ -170,17 +289,30 @@ def compare():
         flash("Error processing documents.", "danger")
         return redirect(url_for('index'))
     try:
-        store_document_and_result(doc1_name, doc2_name, doc1.content, doc2.content, analysis_result.to_dict())
+        store_analysis_result(doc1_name, doc2_name, doc1.content, doc2.content, analysis_result,
+                              charts={"wordcloud1": wordcloud1, "wordcloud2": wordcloud2})
     except Exception as e:
         log_error("Error storing documents/results", exc=e)
         flash("Error storing results in database.", "warning")
     return render_template('compare.html', doc1_name=doc1_name, doc2_name=doc2_name, insights=insights, metrics=metrics, wordcloud1=wordcloud1, wordcloud2=wordcloud2)
 
+@app.route('/profiles/<profile_id>')
+@app.route('/profiles/<profile_id>/<name>')
+def profile_report(profile_id, name='summary.json'):
+    # Reports include document-derived stack and allocation data: admins only.
+    if not is_profile_admin(request):
+        abort(404)
+    path = profile_store.path(profile_id, name)
+    if not path:
+        abort(404)
+    return send_file(path, mimetype='application/json' if name.endswith('.json') else 'text/plain')
+
 @app.route('/download/<filename>')
 def download(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
 
 @app.route('/advanced', methods=['GET', 'POST'])
+@profiled(profile_store)
 def advanced():
     doc1 = doc2 = ""
     doc1_name = doc2_name = ""
@@ -242,9 +374,34 @@ def advanced():
 
 @app.route('/audit')
 def audit():
-    user_id = request.args.get('user_id', None)
-    logs = audit_service.get_audit_logs(user_id)
-    return render_template('audit.html', logs=logs)
+    import datetime
+    user_id = request.args.get('user_id') or None
+    filters = {}
+    for name in ('start', 'end'):
+        value = request.args.get(name) or None
+        try:
+            filters[name] = datetime.datetime.strptime(value, '%Y-%m-%d') if value else None
+        except ValueError:
+            flash(f"Invalid {name} date, expected YYYY-MM-DD.", "warning")
+            filters[name] = None
+    if filters['end']:
+        # The end date is inclusive.
+        filters['end'] += datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+    page_size = min(max(request.args.get('page_size', 50, type=int), 1), 500)
+    logs, next_page = audit_service.query_audit_logs(
+        user_id=user_id,
+        start=filters['start'],
+        end=filters['end'],
+        page_size=page_size,
+        continuation=request.args.get('page')
+    )
+    query = {k: request.args.get(k) for k in ('user_id', 'start', 'end', 'page_size') if request.args.get(k)}
+    return render_template('audit.html', logs=logs, next_page=next_page, query=query, is_first_page=not request.args.get('page'))
+
+@app.cli.command('migrate-audit-keys')
+def migrate_audit_keys():
+    """Rewrite audit rows with legacy UUID RowKeys to time-ordered keys."""
+    print(f"Rewrote {audit_service.migrate_legacy_row_keys()} audit rows.")
 
 @app.route('/save_to_db', methods=['POST'])
 def save_to_db():
@@ -262,12 +419,22 @@ def save_to_db():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 def store_document_and_result(doc1_name, doc2_name, doc1_content, doc2_content, result_summary, user_id=None):
-    blob_service.upload_text(f"{doc1_name}", doc1_content)
-    blob_service.upload_text(f"{doc2_name}", doc2_content)
-    result_blob_name = f"result_{doc1_name}_vs_{doc2_name}.json"
-    import json
-    blob_service.upload_text(result_blob_name, json.dumps(result_summary, indent=2))
-    audit_service.log_audit(
+    # Uploads are queued on the background writer; documents are content-addressed so
+    # re-uploading the same file is skipped and the result only references them by hash.
+    doc1_hash, doc1_blob = blob_writer.store_document(doc1_content)
+    doc2_hash, doc2_blob = blob_writer.store_document(doc2_content)
+    if isinstance(result_summary, dict) and isinstance(result_summary.get("document"), dict):
+        document = {k: v for k, v in result_summary["document"].items() if k != "content"}
+        document.update({"content_hash": doc1_hash, "blob": doc1_blob})
+        result_summary = dict(result_summary, document=document)
+    payload = {
+        "doc1": {"name": doc1_name, "content_hash": doc1_hash, "blob": doc1_blob},
+        "doc2": {"name": doc2_name, "content_hash": doc2_hash, "blob": doc2_blob},
+        "result": result_summary
+    }
+    # Client-submitted results are archived but never reused.
+    blob_writer.store_json(f"results/submitted/{doc1_hash}_{doc2_hash}.json.gz", json_safe(payload))
+    audit_writer.log_audit(
         user_id=user_id,
         action="compare",
         doc1_name=doc1_name,
@@ -276,5 +443,29 @@ def store_document_and_result(doc1_name, doc2_name, doc1_content, doc2_content,
         status="Success"
     )
 
+def store_analysis_result(doc1_name, doc2_name, doc1_content, doc2_content, analysis_result, charts=None, user_id=None):
+    # Stored as a manifest plus separate section blobs (summary, insights, diff, charts)
+    # that reference the documents by hash, so /compare can reuse it for identical inputs.
+    doc1_hash, doc1_blob = blob_writer.store_document(doc1_content)
+    doc2_hash, doc2_blob = blob_writer.store_document(doc2_content)
+    sections = analysis_result.to_sections(content_hash=doc1_hash)
+    sections["charts"].update(charts or {})
+    # Results with AI or translation fallbacks are not stored, so the next request retries them.
+    result_store.put(
+        doc1_hash, doc2_hash, sections,
+        fallbacks=analysis_result.ai_insights.get("fallbacks"),
+        schema=AnalysisResult.SCHEMA_VERSION,
+        doc1={"name": doc1_name, "content_hash": doc1_hash, "blob": doc1_blob},
+        doc2={"name": doc2_name, "content_hash": doc2_hash, "blob": doc2_blob}
+    )
+    audit_writer.log_audit(
+        user_id=user_id,
+        action="compare",
+        doc1_name=doc1_name,
+        doc2_name=doc2_name,
+        result_summary=str(analysis_result.summary())[:500],
+        status="Success"
+    )
+
 if __name__ == "__main__":
-    app.run(debug=True, port=8080)
\ No newline at end of file
+    app.run(debug=os.getenv('FLASK_DEBUG', '1') == '1', port=int(os.getenv('PORT', '8080')))
\ No newline at end of file
@@ -1,15 +1,222 @@
+import contextvars
+import hashlib
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+# Documents shared within the current request; see Document.begin_request.
+_request_documents = contextvars.ContextVar("request_documents", default=None)
+
 class Document:
+    """
+    A document's text plus lazily computed, cached views of it.
+
+    Tokens and their interned ID arrays, lines, line offsets, the lowercase text and the
+    content hash are each computed once on first use and shared by every analyzer that asks,
+    instead of each one re-running split()/splitlines()/lower() over the full text. Cached
+    views are tuples/frozensets/arrays that callers must not mutate; assigning `content`
+    drops them.
+    """
+
+    __slots__ = (
+        "title", "_content", "language", "metadata",
+        "_words", "_lower", "_lower_words", "_vocabulary", "_word_ids", "_term_ids",
+        "_lines", "_line_offsets", "_line_word_starts", "_content_hash", "__weakref__"
+    )
+
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    _cache_chars = 0
+    _cache_size = int(os.getenv('DOCUMENT_CACHE_SIZE', '8'))
+    # Cached views take several times the text's size, so the process-wide cache is bounded
+    # by total characters as well; larger texts are only shared within a request.
+    _cache_max_chars = int(os.getenv('DOCUMENT_CACHE_CHARS', '1000000'))
+
     def __init__(self, title: str, content: str, language: str = "en", metadata: dict = None):
         self.title = title
-        self.content = content
         self.language = language
         self.metadata = metadata or {}
+        self.content = content
+
+    @property
+    def content(self):
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value or ""
+        self._words = self._lower = self._lower_words = self._vocabulary = None
+        self._word_ids = self._term_ids = None
+        self._lines = self._line_offsets = self._line_word_starts = self._content_hash = None
+
+    @classmethod
+    def for_text(cls, text):
+        """
+        Return the shared Document for a text (or the Document itself), so analyzers called
+        on the same string within a request reuse one set of cached views.
+
+        Inside begin_request/end_request every text is shared until the request ends.
+        Elsewhere a small process-wide LRU is used, bounded by DOCUMENT_CACHE_SIZE entries
+        and DOCUMENT_CACHE_CHARS characters; texts over the character limit are not kept.
+        """
+        if isinstance(text, Document):
+            return text
+        text = text or ""
+        scope = _request_documents.get()
+        if scope is not None:
+            doc = scope.get(text)
+            if doc is None:
+                doc = scope.setdefault(text, cls(title="", content=text))
+            return doc
+        with cls._cache_lock:
+            doc = cls._cache.get(text)
+            if doc is not None:
+                cls._cache.move_to_end(text)
+                return doc
+        doc = cls(title="", content=text)
+        if len(text) > cls._cache_max_chars:
+            return doc
+        with cls._cache_lock:
+            if text not in cls._cache:
+                cls._cache[text] = doc
+                cls._cache_chars += len(text)
+            while len(cls._cache) > cls._cache_size or cls._cache_chars > cls._cache_max_chars:
+                evicted, _ = cls._cache.popitem(last=False)
+                cls._cache_chars -= len(evicted)
+        return doc
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._cache_lock:
+            cls._cache.clear()
+            cls._cache_chars = 0
+
+    @staticmethod
+    def begin_request():
+        """
+        Share Documents by text for the rest of the current context (worker threads started
+        with http_client.run_in_context included). Returns a token for end_request, which
+        releases them.
+        """
+        return _request_documents.set({})
+
+    @staticmethod
+    def end_request(token):
+        try:
+            _request_documents.reset(token)
+        except ValueError:
+            # Token created in another context; nothing to undo here.
+            pass
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = tuple(self._content.split())
+        return self._words
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self._content.lower()
+        return self._lower
+
+    @property
+    def lower_words(self):
+        if self._lower_words is None:
+            self._lower_words = tuple(self.lower.split())
+        return self._lower_words
+
+    @property
+    def vocabulary(self):
+        """
+        Frozen set of lowercase whitespace-separated words.
+        """
+        if self._vocabulary is None:
+            self._vocabulary = frozenset(self.lower_words)
+        return self._vocabulary
+
+    def _encoded(self, cached, tokens):
+        from utils.tokenizer import VOCABULARY
+        if cached is not None and cached[1] == VOCABULARY.generation:
+            return cached
+        ids, generation = VOCABULARY.encode(tokens)
+        ids.setflags(write=False)
+        return ids, generation
+
+    @property
+    def word_ids(self):
+        """
+        int32 array of interned IDs of `words` (case preserved), from utils.tokenizer.
+        """
+        self._word_ids = self._encoded(self._word_ids, self.words)
+        return self._word_ids[0]
+
+    @property
+    def term_ids(self):
+        """
+        int32 array of interned IDs of `lower_words`.
+        """
+        return self.encoded_term_ids()[0]
+
+    def encoded_term_ids(self):
+        """
+        (term_ids, vocabulary generation they belong to), read together so they can be
+        decoded safely with Vocabulary.terms.
+        """
+        self._term_ids = encoded = self._encoded(self._term_ids, self.lower_words)
+        return encoded
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = tuple(self._content.splitlines())
+        return self._lines
+
+    @property
+    def line_offsets(self):
+        """
+        array of the character offset at which each line starts.
+        """
+        if self._line_offsets is None:
+            offsets, position = array("Q"), 0
+            for line in self._content.splitlines(keepends=True):
+                offsets.append(position)
+                position += len(line)
+            self._line_offsets = offsets
+        return self._line_offsets
+
+    @property
+    def content_hash(self):
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self._content.encode("utf-8")).hexdigest()
+        return self._content_hash
+
+    @property
+    def line_word_starts(self):
+        """
+        Index into `words` at which each line starts, plus a final entry of len(words);
+        words of line i are words[starts[i]:starts[i + 1]].
+        """
+        if self._line_word_starts is None:
+            import numpy as np
+            starts = np.zeros(len(self.lines) + 1, dtype=np.int64)
+            np.cumsum([len(line.split()) for line in self.lines], out=starts[1:])
+            self._line_word_starts = starts
+        return self._line_word_starts
+
+    def line_number(self, offset):
+        """
+        0-based index of the line containing a character offset.
+        """
+        return max(bisect_right(self.line_offsets, offset) - 1, 0)
 
     def __repr__(self):
         return f"<Document(title={self.title!r}, language={self.language!r})>"
 
     def get_word_count(self):
-        return len(self.content.split())
+        return len(self.words)
 
     def get_summary(self, summarizer=None):
         """
@@ -29,13 +236,15 @@ class Document:
     def set_metadata(self, key, value):
         self.metadata[key] = value
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_content=True):
+        data = {
             "title": self.title,
-            "content": self.content,
             "language": self.language,
             "metadata": self.metadata
         }
+        if include_content:
+            data["content"] = self.content
+        return data
 
     @staticmethod
     def from_dict(data):
@@ -47,15 +256,21 @@ class Document:
         )
 
     def contains_keyword(self, keyword):
-        return keyword.lower() in self.content.lower()
+        return keyword.lower() in self.lower
 
     def get_line_count(self):
-        return len(self.content.splitlines())
+        return len(self.lines)
 
     def get_char_count(self):
         return len(self.content)
 
 class AnalysisResult:
+    # ai_insights keys holding base64 PNGs and bulky diff structures; to_sections stores
+    # them apart from the summary so readers only fetch what they need.
+    CHART_KEYS = ("charts", "sentiment_heatmap", "metrics_comparison")
+    DIFF_KEYS = ("diff_blocks", "diff_as_dict", "diff_word_stats", "ai_diff_changes", "ai_highlighted_changes")
+    SCHEMA_VERSION = 2
+
     def __init__(
         self,
         document: Document,
@@ -119,6 +334,46 @@ class AnalysisResult:
             "metrics": self.metrics
         }
 
+    def to_sections(self, content_hash=None):
+        """
+        Split the result into independently stored sections. The document is referenced by
+        its content hash instead of embedding the full text.
+
+        Returns:
+        dict: {"summary": ..., "insights": ..., "diff": ..., "charts": ...}
+        """
+        document = self.document.to_dict(include_content=False)
+        document["content_hash"] = content_hash
+        chart_keys, diff_keys = set(self.CHART_KEYS), set(self.DIFF_KEYS)
+        return {
+            "summary": {
+                "schema": self.SCHEMA_VERSION,
+                "document": document,
+                "semantic_analysis": self.semantic_analysis,
+                "sentiment": self.sentiment,
+                "tone_shifts": self.tone_shifts,
+                "diff": self.diff,
+                "compliance_flags": self.compliance_flags,
+                "pii_entities": self.pii_entities,
+                "metrics": self.metrics
+            },
+            "insights": {k: v for k, v in self.ai_insights.items() if k not in chart_keys and k not in diff_keys},
+            "diff": {k: v for k, v in self.ai_insights.items() if k in diff_keys},
+            "charts": {k: v for k, v in self.ai_insights.items() if k in chart_keys}
+        }
+
+    @staticmethod
+    def from_sections(sections, content=""):
+        """
+        Rebuild a result from to_sections output; missing sections are left empty.
+        """
+        summary = sections.get("summary") or {}
+        ai_insights = {}
+        for name in ("insights", "diff", "charts"):
+            ai_insights.update(sections.get(name) or {})
+        document = dict(summary.get("document") or {}, content=content)
+        return AnalysisResult.from_dict(dict(summary, document=document, ai_insights=ai_insights))
+
     @staticmethod
     def from_dict(data):
         return AnalysisResult(
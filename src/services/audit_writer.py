@@ -0,0 +1,147 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from utils.helpers import log_error, log_info
+
+
+class AuditWriter:
+    """
+    Queues audit entries and writes them to Table storage in batches.
+
+    A background thread flushes when `batch_size` entries are waiting or `flush_interval`
+    seconds have passed, using one Table transaction per partition (see
+    AzureTableAuditService.write_entities). Batches that cannot be written are appended to
+    a local JSONL spool file and replayed on the next successful flush. While writes keep
+    failing, flushes back off exponentially (up to `max_backoff` seconds) and the outage is
+    logged once. Pending entries are flushed at interpreter shutdown.
+    """
+
+    def __init__(self, audit_service, batch_size=None, flush_interval=None, max_queue=10000, spool_path=None,
+                 max_backoff=None):
+        self.audit_service = audit_service
+        self.batch_size = int(batch_size or os.getenv('AUDIT_BATCH_SIZE', '100'))
+        self.flush_interval = float(flush_interval or os.getenv('AUDIT_FLUSH_SECONDS', '2'))
+        self.spool_path = spool_path or os.getenv('AUDIT_SPOOL_PATH', 'audit_spool.jsonl')
+        self.max_backoff = float(max_backoff or os.getenv('AUDIT_MAX_BACKOFF_SECONDS', '300'))
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.spooled = 0
+        self.failures = 0
+        self._retry_at = 0.0
+        self._spool_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def log_audit(self, user_id, action, doc1_name, doc2_name, result_summary, status="Success"):
+        """
+        Same arguments as AzureTableAuditService.log_audit; only enqueues the entry.
+        """
+        entity = self.audit_service.build_entity(user_id, action, doc1_name, doc2_name, result_summary, status)
+        try:
+            self.queue.put_nowait(entity)
+        except queue.Full:
+            self._spool([entity])
+
+    def _drain(self, limit):
+        entities = []
+        while len(entities) < limit:
+            try:
+                entities.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return entities
+
+    def _run(self):
+        while not self._stopped.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            while self.queue.qsize() < self.batch_size and not self._stopped.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._stopped.wait(min(remaining, 0.1))
+            self.flush()
+
+    def flush(self, force=False):
+        """
+        Write everything queued (and any spooled entries) now. While backing off after failed
+        writes this does nothing unless force is set; once a write fails, the rest of the
+        queue is spooled without further attempts.
+        """
+        with self._flush_lock:
+            if not force and time.monotonic() < self._retry_at:
+                return
+            ok = self._replay_spool()
+            while True:
+                entities = self._drain(self.batch_size * 10)
+                if not entities:
+                    return
+                if ok:
+                    ok = self._write(entities)
+                else:
+                    self._spool(entities)
+
+    def _write(self, entities, spooled=False):
+        """
+        Write entities, spooling them on failure. spooled marks entries replayed from the
+        spool, which are not counted again when they go back to it.
+        """
+        try:
+            self.audit_service.write_entities(entities)
+        except Exception as e:
+            if not self.failures:
+                log_error(f"Audit writes failing; spooling to {self.spool_path} and retrying with backoff", exc=e)
+            self.failures += 1
+            self._retry_at = time.monotonic() + min(self.max_backoff, self.flush_interval * 2 ** self.failures)
+            self._spool(entities, new=not spooled)
+            return False
+        if self.failures:
+            log_info(f"Audit writes recovered after {self.failures} failed attempts")
+            self.failures = 0
+            self._retry_at = 0.0
+        self.written += len(entities)
+        return True
+
+    def _spool(self, entities, new=True):
+        with self._spool_lock:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                for entity in entities:
+                    f.write(json.dumps(entity, ensure_ascii=False) + "\n")
+            if new:
+                self.spooled += len(entities)
+
+    def _replay_spool(self):
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path) or os.path.getsize(self.spool_path) == 0:
+                return True
+            replay_path = f"{self.spool_path}.replay"
+            os.replace(self.spool_path, replay_path)
+        entities = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entities.append(json.loads(line))
+                except ValueError:
+                    continue
+        os.remove(replay_path)
+        # A failed replay goes straight back to the spool file.
+        return self._write(entities, spooled=True) if entities else True
+
+    def close(self, timeout=10.0):
+        self._stopped.set()
+        self._worker.join(timeout)
+        self.flush(force=True)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "spooled": self.spooled,
+            "failures": self.failures,
+        }
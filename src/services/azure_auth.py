@@ -1,19 +1,51 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
 class AzureAuth:
-    def __init__(self, client_id=None, client_secret=None, tenant_id=None):
+    """
+    Client-credentials token provider with an expiry-aware cache.
+
+    Tokens are refreshed in the background `refresh_margin` seconds before they expire,
+    so callers only wait on the token endpoint for the very first token (or after a
+    token has actually expired). At most one refresh is in flight at any time. For
+    short-lived tokens the margin is capped at half the token lifetime, and refreshes are
+    never scheduled less than `min_refresh_interval` seconds apart.
+    """
+
+    def __init__(self, client_id=None, client_secret=None, tenant_id=None, scope=None, refresh_margin=None,
+                 clock=time.monotonic):
+        """
+        clock is the monotonic time source (seconds) expiry and refresh times are measured on.
+        """
         self.client_id = client_id or os.getenv('AZURE_CLIENT_ID')
         self.client_secret = client_secret or os.getenv('AZURE_CLIENT_SECRET')
         self.tenant_id = tenant_id or os.getenv('AZURE_TENANT_ID')
+        self.scope = scope or os.getenv('AZURE_AUTH_SCOPE', "https://<your-resource>.azure.com/.default")
+        self.refresh_margin = float(refresh_margin if refresh_margin is not None
+                                    else os.getenv('AZURE_TOKEN_REFRESH_MARGIN', '300'))
+        self.retry_interval = 30.0
+        self.min_refresh_interval = 5.0
+        self.clock = clock
         self.token = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._timer = None
+        self._session = None
 
-    def authenticate(self):
-        import requests
+    def _get_session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
 
+    def _fetch_token(self):
         url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
         headers = {
             "Content-Type": "application/x-www-form-urlencoded"
@@ -22,33 +54,87 @@ class AzureAuth:
             "grant_type": "client_credentials",
             "client_id": self.client_id,
             "client_secret": self.client_secret,
-            "scope": "https://<your-resource>.azure.com/.default"
+            "scope": self.scope
         }
 
-        response = requests.post(url, headers=headers, data=data)
-        if response.status_code == 200:
-            self.token = response.json().get("access_token")
-        else:
+        response = self._get_session().post(url, headers=headers, data=data, timeout=30)
+        if response.status_code != 200:
             raise Exception("Authentication failed: " + response.text)
+        payload = response.json()
+        try:
+            expires_in = float(payload.get("expires_in", 3600))
+        except (TypeError, ValueError):
+            expires_in = 3600.0
+        return payload.get("access_token"), self.clock() + expires_in
+
+    def _store(self, token, expires_at):
+        now = self.clock()
+        lifetime = max(0.0, expires_at - now)
+        delay = max(self.min_refresh_interval, lifetime - min(self.refresh_margin, lifetime / 2))
+        self.token = token
+        self.expires_at = expires_at
+        self.refresh_at = now + delay
+        self._schedule(delay)
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        with self._lock:
+            fresh = self.token and self.clock() < self.refresh_at
+            if self._refreshing or fresh:
+                return
+            self._refreshing = True
+        try:
+            token, expires_at = self._fetch_token()
+            with self._lock:
+                self._store(token, expires_at)
+        except Exception:
+            # Keep serving the current token until it expires; try again shortly.
+            with self._lock:
+                self._schedule(self.retry_interval)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def authenticate(self):
+        """
+        Fetch a new token synchronously.
+        """
+        with self._lock:
+            token, expires_at = self._fetch_token()
+            self._store(token, expires_at)
 
     def get_access_token(self):
-        if not self.token:
-            self.authenticate()
-        return self.token
+        if self.is_token_valid():
+            timer_pending = self._timer is not None and self._timer.is_alive()
+            if self.clock() >= self.refresh_at and not (self._refreshing or timer_pending):
+                # Timer missed (e.g. process was suspended): refresh without blocking the caller.
+                threading.Thread(target=self._background_refresh, daemon=True).start()
+            return self.token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock.
+            if not (self.token and self.clock() < self.expires_at):
+                token, expires_at = self._fetch_token()
+                self._store(token, expires_at)
+            return self.token
 
     def is_token_valid(self):
         """
-        Checks if the current token is valid (not expired).
-        For simplicity, this just checks if token exists.
+        Checks if the current token is valid (present and not expired).
         """
-        return self.token is not None
+        return self.token is not None and self.clock() < self.expires_at
 
     def refresh_token(self):
         """
         Force refresh the access token.
         """
-        self.token = None
-        return self.get_access_token()
+        self.authenticate()
+        return self.token
 
     def get_authorization_header(self):
         """
@@ -65,4 +151,4 @@ class AzureAuth:
         token = self.get_access_token()
         if not token or not isinstance(token, str):
             raise Exception("Invalid Azure access token.")
-        return True
\ No newline at end of file
+        return True
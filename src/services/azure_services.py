@@ -1,5 +1,9 @@
 import os
 from dotenv import load_dotenv
+from services.http_client import RetryableError, get_client, parse_retry_after
+from services.llm_cache import LLMResponseCache
+from services.summarizer import ChunkedSummarizer
+from utils.instrumentation import histogram, timed
 
 load_dotenv()
 
@@ -62,6 +66,30 @@ def local_entities(text):
     import re
     return [{'text': m.group(), 'category': 'Unknown'} for m in re.finditer(r'\b[A-Z][a-z]+\b', text)]
 
+def parse_json_object(content):
+    """
+    Parse a JSON object from model output, tolerating code fences or surrounding prose.
+    Returns a dict, or None if no object can be recovered.
+    """
+    import json
+    if not content:
+        return None
+    try:
+        parsed = json.loads(content)
+        return parsed if isinstance(parsed, dict) else None
+    except Exception:
+        pass
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        parsed = json.loads(content[start:end + 1])
+        return parsed if isinstance(parsed, dict) else None
+    except Exception:
+        return None
+
+LOCAL_NLP_SECONDS = histogram("local_nlp_seconds", "Duration of LocalNLPService calls.", ["method"])
+
 class LocalNLPService:
     def __init__(self):
         self.healthy = True
@@ -69,6 +97,7 @@ class LocalNLPService:
     def health_check(self):
         return True
 
+    @timed(LOCAL_NLP_SECONDS, method="analyze_text")
     def analyze_text(self, text, language="en"):
         return {
             "key_phrases": local_key_phrases(text),
@@ -76,27 +105,32 @@ class LocalNLPService:
             **local_sentiment(text)
         }
 
+    @timed(LOCAL_NLP_SECONDS, method="get_sentiment")
     def get_sentiment(self, text, language="en"):
         return local_sentiment(text)
 
+    @timed(LOCAL_NLP_SECONDS, method="get_entities")
     def get_entities(self, text, language="en"):
         return {"entities": local_entities(text)}
 
+    @timed(LOCAL_NLP_SECONDS, method="get_key_phrases")
     def get_key_phrases(self, text, language="en"):
         return local_key_phrases(text)
 
+    @timed(LOCAL_NLP_SECONDS, method="detect_language")
     def detect_language(self, text):
-        # Simple heuristic
-        if not text or not TextBlob:
-            return "en"
-        blob = TextBlob(text)
-        try:
-            return blob.detect_language()
-        except Exception:
-            return "en"
+        # Offline character n-gram identifier; TextBlob's detect_language endpoint no longer exists.
+        from utils.langid import detect_language
+        language, _ = detect_language(text)
+        return language or "en"
+
+    @timed(LOCAL_NLP_SECONDS, method="detect_paragraph_languages")
+    def detect_paragraph_languages(self, text):
+        from utils.langid import detect_paragraph_languages
+        return detect_paragraph_languages(text)
 
 class AzureAIService:
-    def __init__(self, endpoint=None, api_key=None, region=None, deployment_name=None):
+    def __init__(self, endpoint=None, api_key=None, region=None, deployment_name=None, token_provider=None):
         self.endpoint =  os.getenv('AZURE_AI_ENDPOINT')
         # Ensure both OpenAI and Azure OpenAI env vars are set for SDK compatibility
         self.api_key =  os.getenv('AZURE_AI_API_KEY') 
@@ -104,20 +138,33 @@ class AzureAIService:
         self.deployment_name = deployment_name or os.getenv('AZURE_AI_DEPLOYMENT', 'gpt-4')
         # Try to import Azure OpenAI SDK if available and credentials are present
         self.azure_openai = None
-        if self.api_key:
+        if self.api_key or token_provider:
+            # Without an API key, authenticate with Azure AD tokens (e.g. AzureAuth.get_access_token).
+            credentials = {"api_key": self.api_key} if self.api_key else {"azure_ad_token_provider": token_provider}
             try:
                 from openai import AzureOpenAI
                 self.azure_openai = AzureOpenAI(
-                    api_key=self.api_key,
+                    **credentials,
                     azure_endpoint=self.endpoint,
                     api_version="2025-01-01-preview",
-                    azure_deployment=self.deployment_name
+                    azure_deployment=self.deployment_name,
+                    # Retries are handled by the shared client layer (services.http_client).
+                    max_retries=0
                 )
             except ImportError:
                 self.azure_openai = None
             except Exception as ex:
                 print("AzureOpenAI SDK initialization error:", ex)
                 self.azure_openai = None
+        self.http_client = get_client(self.endpoint, rate=float(os.getenv('AZURE_AI_RATE_LIMIT', '5')))
+        self.response_cache = LLMResponseCache(
+            max_entries=int(os.getenv('AZURE_AI_CACHE_SIZE', '1024')),
+            ttl=int(os.getenv('AZURE_AI_CACHE_TTL', '900'))
+        )
+        self.summarizer = ChunkedSummarizer(
+            self._summarize_chunk,
+            chunk_tokens=int(os.getenv('AZURE_AI_SUMMARY_CHUNK_TOKENS', '3000'))
+        )
 
     def _headers(self):
         return {
@@ -131,70 +178,140 @@ class AzureAIService:
         endpoint = self.endpoint.rstrip("/")
         return f"{endpoint}/openai/deployments/{self.deployment_name}/chat/completions?api-version=2024-02-15-preview"
 
-    def summarize_text(self, text, language="en"):
-        if self.azure_openai:
+    def _chat(self, messages, max_tokens=256, temperature=0.3, response_format=None):
+        """
+        Send a chat completion request and return the stripped message content, or None on failure.
+        Responses are cached by (deployment, temperature, normalized messages); identical
+        concurrent requests share a single call.
+        """
+        if not self.azure_openai:
+            return None
+        key = LLMResponseCache.make_key(
+            self.deployment_name, temperature, messages,
+            max_tokens=max_tokens, response_format=response_format
+        )
+        return self.response_cache.get_or_call(
+            key,
+            lambda: self._chat_uncached(messages, max_tokens, temperature, response_format),
+            temperature=temperature
+        )
+
+    def _chat_uncached(self, messages, max_tokens, temperature, response_format):
+        kwargs = {}
+        if response_format:
+            kwargs["response_format"] = response_format
+
+        def operation(timeout):
+            import openai
             try:
-                response = self.azure_openai.chat.completions.create(
+                return self.azure_openai.chat.completions.create(
                     model=self.deployment_name,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant."},
-                        {"role": "user", "content": f"Summarize the following text in {language}:\n\n{text}"}
-                    ],
-                    max_tokens=256,
-                    temperature=0.3
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=timeout,
+                    **kwargs
                 )
-                return response.choices[0].message.content.strip()
-            except Exception:
-                pass
+            except openai.RateLimitError as exc:
+                raise RetryableError(str(exc), status=429,
+                                     retry_after=parse_retry_after(exc.response.headers.get("retry-after"))) from exc
+            except openai.APIStatusError as exc:
+                if exc.status_code in (408, 500, 502, 503, 504):
+                    raise RetryableError(str(exc), status=exc.status_code) from exc
+                raise
+            except openai.APIConnectionError as exc:
+                raise RetryableError(str(exc)) from exc
 
+        try:
+            response = self.http_client.execute(operation)
+            return (response.choices[0].message.content or "").strip()
+        except Exception:
+            return None
+
+    def summarize_text(self, text, language="en"):
+        """
+        Summarize text of any length. Long inputs are chunked, summarized in parallel
+        and reduced hierarchically; chunk summaries are cached by content hash.
+        """
+        if not self.azure_openai:
+            return None
+        return self.summarizer.summarize(text, language=language)
+
+    def _summarize_chunk(self, text, language="en", combine=False):
+        if combine:
+            instruction = f"Combine the following partial summaries of one document into a single coherent summary in {language}"
+        else:
+            instruction = f"Summarize the following text in {language}"
+        return self._chat(
+            [
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": f"{instruction}:\n\n{text}"}
+            ],
+            max_tokens=256,
+            temperature=0.3
+        )
 
     def generate_text(self, prompt, language="en"):
-        if self.azure_openai:
-            try:
-                response = self.azure_openai.chat.completions.create(
-                    model=self.deployment_name,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=256,
-                    temperature=0.3
-                )
-                content = response.choices[0].message.content.strip()
-                if content:
-                    return {"generated_text": content}
-            except Exception:
-                pass
+        content = self._chat(
+            [
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=256,
+            temperature=0.3
+        )
+        if content:
+            return {"generated_text": content}
 
+    def generate_json(self, prompt, schema=None, schema_name="response", max_tokens=1024, temperature=0.0):
+        """
+        Ask the model for a single JSON object, constrained by a JSON schema when one is given.
+        Falls back to plain JSON mode for deployments without structured output support.
+        Returns the parsed dict, or None if no valid JSON object came back.
+        """
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant. Always answer with a single JSON object."},
+            {"role": "user", "content": prompt}
+        ]
+        formats = [{"type": "json_object"}]
+        if schema:
+            formats.insert(0, {
+                "type": "json_schema",
+                "json_schema": {"name": schema_name, "schema": schema, "strict": True}
+            })
+        for response_format in formats:
+            content = self._chat(messages, max_tokens=max_tokens, temperature=temperature, response_format=response_format)
+            if content is None:
+                continue
+            parsed = parse_json_object(content)
+            if parsed is not None:
+                return parsed
+        return None
 
     def detect_pii(self, text, language="en"):
-        if self.azure_openai:
-            try:
-                response = self.azure_openai.chat.completions.create(
-                    model=self.deployment_name,
-                    messages=[
-                        {"role": "system", "content": "You are a data privacy assistant."},
-                        {"role": "user", "content":
-                            "Extract all personally identifiable information (PII) such as names, addresses, phone numbers, emails, "
-                            "government IDs, and any sensitive data from the following text. "
-                            "Return the PII as a JSON list of strings. If none, return an empty list.\n\n"
-                            f"Text:\n{text}"
-                        }
-                    ],
-                    max_tokens=256,
-                    temperature=0.0
-                )
-                import json
-                content = response.choices[0].message.content.strip()
-                try:
-                    pii_entities = json.loads(content)
-                    if isinstance(pii_entities, list):
-                        return pii_entities
-                except Exception:
-                    return [content]
-            except Exception:
-                pass
-        
+        content = self._chat(
+            [
+                {"role": "system", "content": "You are a data privacy assistant."},
+                {"role": "user", "content":
+                    "Extract all personally identifiable information (PII) such as names, addresses, phone numbers, emails, "
+                    "government IDs, and any sensitive data from the following text. "
+                    "Return the PII as a JSON list of strings. If none, return an empty list.\n\n"
+                    f"Text:\n{text}"
+                }
+            ],
+            max_tokens=256,
+            temperature=0.0
+        )
+        if content is None:
+            return None
+        import json
+        try:
+            pii_entities = json.loads(content)
+            if isinstance(pii_entities, list):
+                return pii_entities
+        except Exception:
+            return [content]
+
 class AzureBlobStorageService:
     def __init__(self, connection_string=None, container_name=None):
         from azure.storage.blob import BlobServiceClient
@@ -210,9 +327,21 @@ class AzureBlobStorageService:
     def upload_text(self, blob_name, text):
         self.container_client.upload_blob(blob_name, text, overwrite=True)
 
-    def download_text(self, blob_name):
+    def upload_bytes(self, blob_name, data, content_type=None, content_encoding=None):
+        from azure.storage.blob import ContentSettings
+        settings = ContentSettings(content_type=content_type, content_encoding=content_encoding)
+        self.container_client.upload_blob(blob_name, data, overwrite=True, content_settings=settings)
+
+    def exists(self, blob_name):
+        return self.container_client.get_blob_client(blob_name).exists()
+
+    def download_bytes(self, blob_name):
         blob_client = self.container_client.get_blob_client(blob_name)
-        return blob_client.download_blob().readall().decode('utf-8')
+        return blob_client.download_blob().readall()
+
+    def download_text(self, blob_name):
+        from services.blob_writer import decompress_text
+        return decompress_text(self.download_bytes(blob_name), blob_name)
 
     def list_blobs(self):
         return [blob.name for blob in self.container_client.list_blobs()]
@@ -229,21 +358,167 @@ class AzureTableAuditService:
         except Exception:
             pass
 
-    def log_audit(self, user_id, action, doc1_name, doc2_name, result_summary, status="Success"):
+    # Azure Table transactions accept at most 100 operations, all in one partition.
+    MAX_BATCH_SIZE = 100
+
+    # Columns shown on the audit page; queries project to these instead of whole entities.
+    AUDIT_COLUMNS = ["PartitionKey", "RowKey", "Action", "Doc1Name", "Doc2Name", "ResultSummary", "Status", "Timestamp"]
+    _MAX_TICKS = 10 ** 19 - 1
+
+    @classmethod
+    def reverse_timestamp(cls, when):
+        """
+        Fixed-width key that sorts newest first: max ticks minus microseconds since the epoch.
+        """
+        import datetime
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=datetime.timezone.utc)
+        micros = int(when.timestamp() * 1_000_000)
+        return f"{cls._MAX_TICKS - micros:019d}"
+
+    @classmethod
+    def build_entity(cls, user_id, action, doc1_name, doc2_name, result_summary, status="Success"):
         from uuid import uuid4
         import datetime
-        entity = {
+        now = datetime.datetime.utcnow()
+        return {
             "PartitionKey": user_id or "anonymous",
-            "RowKey": str(uuid4()),
+            # Reverse-timestamp prefix keeps each partition ordered most recent first.
+            "RowKey": f"{cls.reverse_timestamp(now)}_{uuid4().hex[:12]}",
             "Action": action,
             "Doc1Name": doc1_name,
             "Doc2Name": doc2_name,
             "ResultSummary": result_summary,
             "Status": status,
-            "Timestamp": datetime.datetime.utcnow().isoformat()
+            "Timestamp": now.isoformat()
         }
+
+    def log_audit(self, user_id, action, doc1_name, doc2_name, result_summary, status="Success"):
+        entity = self.build_entity(user_id, action, doc1_name, doc2_name, result_summary, status)
         self.table_client.create_entity(entity=entity)
 
+    @staticmethod
+    def is_time_ordered_key(row_key):
+        return len(row_key) > 20 and row_key[:19].isdigit() and row_key[19] == "_"
+
+    @classmethod
+    def time_ordered_entity(cls, entity):
+        """
+        Copy of a legacy entity (plain UUID RowKey) under a reverse-timestamp RowKey derived
+        from its Timestamp and old key, so rewriting the same row twice gives the same key.
+        """
+        import datetime
+        when = entity.get("Timestamp") or (getattr(entity, "metadata", None) or {}).get("timestamp")
+        if isinstance(when, str):
+            when = datetime.datetime.fromisoformat(when)
+        if not when:
+            # Without a timestamp the row is treated as the oldest one.
+            when = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        migrated = dict(entity)
+        migrated["RowKey"] = f"{cls.reverse_timestamp(when)}_{entity['RowKey'].replace('-', '')[:12]}"
+        return migrated
+
+    def migrate_legacy_row_keys(self):
+        """
+        Rewrite rows written before RowKeys were time-ordered. Their UUID keys sort among the
+        new reverse-timestamp keys at random, so they show up as the newest entries and the
+        start/end filters of query_audit_logs skip them. Each row is upserted under its new
+        key and the old row deleted in the same per-partition transaction; an interrupted run
+        can simply be repeated.
+
+        Returns:
+        int: number of rows rewritten
+        """
+        by_partition = {}
+        for entity in self.table_client.list_entities():
+            if not self.is_time_ordered_key(entity["RowKey"]):
+                by_partition.setdefault(entity["PartitionKey"], []).append(entity)
+        migrated = 0
+        # Two operations per row, within the transaction limit.
+        batch_size = self.MAX_BATCH_SIZE // 2
+        for partition_entities in by_partition.values():
+            for i in range(0, len(partition_entities), batch_size):
+                operations = []
+                for entity in partition_entities[i:i + batch_size]:
+                    operations.append(("upsert", self.time_ordered_entity(entity)))
+                    operations.append(("delete", {"PartitionKey": entity["PartitionKey"], "RowKey": entity["RowKey"]}))
+                self.table_client.submit_transaction(operations)
+                migrated += len(operations) // 2
+        return migrated
+
+    def write_entities(self, entities):
+        """
+        Write entities with one transaction per partition and batch of MAX_BATCH_SIZE.
+        Upserts keep a replayed batch from failing on rows that were already written.
+        """
+        by_partition = {}
+        for entity in entities:
+            by_partition.setdefault(entity["PartitionKey"], []).append(entity)
+        for partition_entities in by_partition.values():
+            for i in range(0, len(partition_entities), self.MAX_BATCH_SIZE):
+                batch = partition_entities[i:i + self.MAX_BATCH_SIZE]
+                self.table_client.submit_transaction([("upsert", entity) for entity in batch])
+
+    @staticmethod
+    def encode_continuation(token):
+        import base64
+        import json
+        if not token:
+            return None
+        return base64.urlsafe_b64encode(json.dumps(token, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_continuation(value):
+        import base64
+        import json
+        if not value:
+            return None
+        try:
+            return json.loads(base64.urlsafe_b64decode(value.encode("ascii")).decode("utf-8"))
+        except (ValueError, UnicodeError):
+            return None
+
+    def query_audit_logs(self, user_id=None, start=None, end=None, page_size=50, continuation=None, select=None):
+        """
+        Fetch one page of audit entries, most recent first within a partition.
+
+        Filtering happens server-side: user_id selects the partition and the start/end
+        datetimes become a RowKey range over the reverse-timestamp keys. Only `select`
+        columns (AUDIT_COLUMNS by default) are returned.
+
+        Table storage returns entities ordered by PartitionKey, then RowKey. Without a
+        user_id the results are therefore grouped by user, each user's entries newest
+        first; they are not newest first across users. Rows with legacy UUID RowKeys are
+        neither ordered nor filtered correctly until migrate_legacy_row_keys has been run.
+
+        Returns:
+        tuple: (list of entities, opaque continuation string for the next page or None)
+        """
+        clauses, parameters = [], {}
+        if user_id:
+            clauses.append("PartitionKey eq @pk")
+            parameters["pk"] = user_id
+        if end:
+            clauses.append("RowKey ge @newest")
+            parameters["newest"] = self.reverse_timestamp(end)
+        if start:
+            # "~" sorts after the "_<uuid>" suffix, so entries at exactly `start` are included.
+            clauses.append("RowKey le @oldest")
+            parameters["oldest"] = self.reverse_timestamp(start) + "~"
+        select = select or self.AUDIT_COLUMNS
+        if clauses:
+            pager = self.table_client.query_entities(
+                " and ".join(clauses), parameters=parameters, select=select, results_per_page=page_size
+            )
+        else:
+            pager = self.table_client.list_entities(select=select, results_per_page=page_size)
+        pages = pager.by_page(continuation_token=self.decode_continuation(continuation))
+        try:
+            entities = list(next(pages))
+        except StopIteration:
+            return [], None
+        return entities, self.encode_continuation(pages.continuation_token)
+
     def get_audit_logs(self, user_id=None):
         if user_id:
             return list(self.table_client.query_entities(f"PartitionKey eq '{user_id}'"))
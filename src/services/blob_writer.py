@@ -0,0 +1,279 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+
+from models import Document
+from utils.helpers import log_error
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def content_hash(text):
+    """
+    SHA-256 hex digest of a document's text, used as its content address.
+    """
+    # Shared with the Document views, so a text is hashed once however many callers ask.
+    return Document.for_text(text).content_hash
+
+
+def document_blob_name(digest):
+    return f"documents/{digest}.txt.gz"
+
+
+def result_blob_name(doc1_hash, doc2_hash, version, section="manifest"):
+    return f"results/{version}/{doc1_hash}_{doc2_hash}/{section}.json.gz"
+
+
+def json_safe(value, path="$"):
+    """
+    Return value with every container converted to the type it has after a JSON round trip:
+    tuples and sets become lists (sets sorted when their items allow it), numpy values become
+    Python numbers and lists, and non-string dict keys become strings. Anything else that JSON
+    cannot represent raises TypeError naming where it was found, instead of being stored as
+    its str() and read back as a different type.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        safe = {}
+        for key, item in value.items():
+            if not isinstance(key, str):
+                if key is not None and not isinstance(key, (bool, int, float)):
+                    raise TypeError(f"{path}: dict key {key!r} of type {type(key).__name__} is not JSON-serializable")
+                key = json.dumps(key)
+            safe[key] = json_safe(item, f"{path}.{key}")
+        return safe
+    if isinstance(value, (set, frozenset)):
+        try:
+            value = sorted(value)
+        except TypeError:
+            value = list(value)
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item, f"{path}[{i}]") for i, item in enumerate(value)]
+    if type(value).__module__ == "numpy":
+        return json_safe(value.tolist(), path)
+    raise TypeError(f"{path}: value of type {type(value).__name__} is not JSON-serializable")
+
+
+def encode_json(payload):
+    """
+    Compact JSON bytes; uses orjson when it is installed. Payloads must already be
+    JSON-safe (see json_safe); other values raise TypeError.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def compress_text(text):
+    return gzip.compress((text or "").encode("utf-8"), compresslevel=6)
+
+
+def decompress_bytes(data, blob_name=""):
+    if blob_name.endswith(".gz") or data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return data
+
+
+def decompress_text(data, blob_name=""):
+    return decompress_bytes(data, blob_name).decode("utf-8")
+
+
+class LocalBlobStorageService:
+    """
+    Filesystem stand-in for AzureBlobStorageService, used for local runs and tests.
+    Blob names map to paths under `root`.
+    """
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or os.getenv('LOCAL_BLOB_ROOT', 'blob_store'))
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, blob_name):
+        path = os.path.abspath(os.path.join(self.root, blob_name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid blob name: {blob_name}")
+        return path
+
+    def upload_bytes(self, blob_name, data, content_type=None, content_encoding=None):
+        path = self._path(blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def upload_text(self, blob_name, text):
+        self.upload_bytes(blob_name, (text or "").encode("utf-8"))
+
+    def exists(self, blob_name):
+        return os.path.exists(self._path(blob_name))
+
+    def download_bytes(self, blob_name):
+        with open(self._path(blob_name), "rb") as f:
+            return f.read()
+
+    def download_text(self, blob_name):
+        return decompress_text(self.download_bytes(blob_name), blob_name)
+
+    def list_blobs(self):
+        names = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    names.append(os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/"))
+        return sorted(names)
+
+
+class BlobWriter:
+    """
+    Background uploader for documents and analysis results.
+
+    Uploads are queued on a bounded queue and written by daemon worker threads so that
+    requests never wait on Blob Storage. Documents are stored gzip-compressed under their
+    content hash and skipped when the blob already exists.
+    """
+
+    def __init__(self, blob_service, max_queue=None, workers=2, put_timeout=0.5):
+        self.blob_service = blob_service
+        self.queue = queue.Queue(maxsize=int(max_queue or os.getenv('BLOB_WRITER_QUEUE_SIZE', '200')))
+        self.put_timeout = put_timeout
+        self._known = set()
+        self._pending = set()
+        self._known_lock = threading.Lock()
+        self.dropped = 0
+        self.failed = 0
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._run, name=f"blob-writer-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        atexit.register(self.flush, 10.0)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            ok = False
+            try:
+                if item is None:
+                    return
+                blob_name, data, content_type, skip_if_exists, on_done = item
+                if skip_if_exists and self._exists(blob_name):
+                    ok = True
+                    continue
+                if callable(data):
+                    data = data()
+                self.blob_service.upload_bytes(blob_name, data, content_type=content_type, content_encoding="gzip")
+                ok = True
+                if skip_if_exists:
+                    with self._known_lock:
+                        self._known.add(blob_name)
+            except Exception as e:
+                self.failed += 1
+                log_error(f"Background upload of {item[0]} failed", exc=e)
+            finally:
+                if item is not None:
+                    with self._known_lock:
+                        self._pending.discard(item[0])
+                    # Before task_done, so uploads queued by the callback are covered by flush().
+                    self._notify(item[4], ok)
+                self.queue.task_done()
+
+    @staticmethod
+    def _notify(on_done, ok):
+        if on_done is None:
+            return
+        try:
+            on_done(ok)
+        except Exception as e:
+            log_error("Blob upload completion callback failed", exc=e)
+
+    def _exists(self, blob_name):
+        with self._known_lock:
+            if blob_name in self._known:
+                return True
+        try:
+            found = self.blob_service.exists(blob_name)
+        except Exception:
+            return False
+        if found:
+            with self._known_lock:
+                self._known.add(blob_name)
+        return found
+
+    def submit(self, blob_name, data, content_type="application/octet-stream", skip_if_exists=False, on_done=None):
+        """
+        Queue an upload of already-compressed bytes, or of a callable producing them on the
+        worker thread. Returns False if the queue stayed full. on_done(ok) is called once the
+        upload succeeded or failed, including when it was dropped here.
+        """
+        if skip_if_exists:
+            with self._known_lock:
+                if blob_name in self._known or blob_name in self._pending:
+                    self._notify(on_done, True)
+                    return True
+                self._pending.add(blob_name)
+        try:
+            self.queue.put((blob_name, data, content_type, skip_if_exists, on_done), timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._known_lock:
+                self._pending.discard(blob_name)
+            self.dropped += 1
+            log_error(f"Blob upload queue full, dropping {blob_name}")
+            self._notify(on_done, False)
+            return False
+
+    def store_document(self, text):
+        """
+        Queue a document for content-addressed storage. Compression happens on the worker and
+        only if the blob is not already stored or queued.
+
+        Returns:
+        tuple: (content hash, blob name)
+        """
+        digest = content_hash(text)
+        blob_name = document_blob_name(digest)
+        self.submit(blob_name, lambda: compress_text(text), content_type="text/plain; charset=utf-8",
+                    skip_if_exists=True)
+        return digest, blob_name
+
+    def store_json(self, blob_name, payload, on_done=None):
+        """
+        Queue a gzipped compact-JSON upload. Encoding happens on the worker, so the payload
+        must not be mutated after it is handed over.
+        """
+        self.submit(blob_name, lambda: gzip.compress(encode_json(payload), compresslevel=6),
+                    content_type="application/json", on_done=on_done)
+        return blob_name
+
+    def flush(self, timeout=None):
+        """
+        Wait until queued uploads are written (or timeout seconds pass). Returns True when drained.
+        """
+        done = threading.Event()
+
+        def wait():
+            self.queue.join()
+            done.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        return done.wait(timeout)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "known_documents": len(self._known),
+        }
@@ -0,0 +1,386 @@
+"""
+Shared client layer for outbound Azure calls.
+
+Every endpoint gets one process-wide AzureHttpClient combining a token-bucket rate limiter,
+a circuit breaker, jittered exponential backoff and the deadline of the incoming request,
+so that under throttling or an Azure outage callers fail fast instead of every worker
+thread sleeping and retrying on its own.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+from utils.instrumentation import counter, histogram
+
+AZURE_REQUEST_SECONDS = histogram("azure_request_seconds", "Latency of individual Azure call attempts.",
+                                  ["client", "outcome"])
+AZURE_RETRIES = counter("azure_retries_total", "Azure call attempts that were retried, by reason.", ["client", "reason"])
+AZURE_REJECTED = counter("azure_rejected_total", "Azure calls refused without being sent, by reason.",
+                         ["client", "reason"])
+
+_request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class ServiceUnavailableError(Exception):
+    """Raised when a call is refused without being sent (open circuit, rate limit wait, deadline)."""
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    pass
+
+
+class DeadlineExceededError(ServiceUnavailableError):
+    pass
+
+
+class RetryableError(Exception):
+    """Raised by an operation to signal a transient failure (429, 5xx, connection error)."""
+
+    def __init__(self, message="", status=None, retry_after=None):
+        super().__init__(message or f"Retryable failure (status {status})")
+        self.status = status
+        self.retry_after = retry_after
+
+
+@contextmanager
+def request_deadline(seconds):
+    """
+    Bound every Azure call made in this context (and in work submitted with
+    run_in_context) to finish within `seconds` from now.
+    """
+    token = _request_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def set_request_deadline(seconds):
+    """
+    Set the deadline for the current context; returns a token for clear_request_deadline.
+    """
+    return _request_deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def clear_request_deadline(token):
+    try:
+        _request_deadline.reset(token)
+    except ValueError:
+        # Token created in another context (e.g. teardown on a different thread); nothing to undo here.
+        pass
+
+
+def remaining_time():
+    """
+    Seconds left before the current request deadline, or None when there is no deadline.
+    """
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def run_in_context(fn):
+    """
+    Wrap fn so it runs in a copy of the caller's context (request deadline included)
+    when executed on a worker thread, e.g. executor.map(run_in_context(fn), items).
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursting up to `capacity`.
+    pause() stops all acquisitions until a point in time, which is how a Retry-After
+    from one thread throttles every thread sharing the bucket.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=None):
+        """
+        Take one token, waiting at most `timeout` seconds. Returns False if none became available.
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+            if give_up is not None:
+                if now + wait > give_up:
+                    return False
+            time.sleep(min(wait, 0.25))
+
+    def configure(self, rate, capacity=None):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            self.capacity = float(capacity or max(1.0, rate))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `recovery_time` seconds, then lets a single trial call through (half-open).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_time=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_time:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """
+        Finish a call that neither proves nor disproves health (e.g. throttled).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class AzureHttpClient:
+    """
+    Rate-limited, circuit-broken executor for calls to one Azure endpoint.
+    """
+
+    SETTINGS = ("rate", "burst", "max_retries", "failure_threshold", "recovery_time",
+                "base_backoff", "max_backoff", "max_queue_wait", "timeout", "pool_size")
+
+    def __init__(self, name, rate=10.0, burst=None, max_retries=4, failure_threshold=5, recovery_time=30.0,
+                 base_backoff=0.5, max_backoff=20.0, max_queue_wait=5.0, timeout=30.0, pool_size=20):
+        self.name = name
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, recovery_time)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_queue_wait = max_queue_wait
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._mount(pool_size)
+
+    def _mount(self, pool_size):
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def configure(self, **settings):
+        """
+        Change settings of a live client. Limiter tokens and breaker state are kept.
+        """
+        unknown = set(settings) - set(self.SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown client settings: {', '.join(sorted(unknown))}")
+        if "rate" in settings or "burst" in settings:
+            self.limiter.configure(settings.get("rate", self.limiter.rate), settings.get("burst", self.limiter.capacity))
+        with self.breaker._lock:
+            self.breaker.failure_threshold = settings.get("failure_threshold", self.breaker.failure_threshold)
+            self.breaker.recovery_time = settings.get("recovery_time", self.breaker.recovery_time)
+        for name in ("max_retries", "base_backoff", "max_backoff", "max_queue_wait", "timeout"):
+            if name in settings:
+                setattr(self, name, settings[name])
+        if "pool_size" in settings:
+            self._mount(settings["pool_size"])
+
+    def _backoff(self, attempt):
+        # Full jitter keeps retrying threads from synchronizing.
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    def execute(self, operation):
+        """
+        Run operation(timeout) under the rate limiter and circuit breaker, retrying
+        RetryableError with jittered backoff until it succeeds, retries run out or the
+        request deadline would be missed. Other exceptions propagate immediately.
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                AZURE_REJECTED.inc(client=self.name, reason="deadline")
+                raise DeadlineExceededError(f"{self.name}: request deadline exceeded")
+            if not self.breaker.allow():
+                AZURE_REJECTED.inc(client=self.name, reason="circuit_open")
+                raise CircuitOpenError(f"{self.name}: circuit open")
+            wait = self.max_queue_wait if remaining is None else min(self.max_queue_wait, remaining)
+            if not self.limiter.acquire(timeout=wait):
+                # The call was never sent: hand back a half-open trial slot we may be holding.
+                self.breaker.release()
+                AZURE_REJECTED.inc(client=self.name, reason="rate_limit")
+                raise ServiceUnavailableError(f"{self.name}: rate limit queue full")
+            remaining = remaining_time()
+            timeout = self.timeout if remaining is None else max(0.1, min(self.timeout, remaining))
+            started = time.perf_counter()
+            try:
+                result = operation(timeout)
+            except RetryableError as exc:
+                reason = "throttled" if exc.status == 429 else str(exc.status or "connection")
+                AZURE_REQUEST_SECONDS.observe(time.perf_counter() - started, client=self.name, outcome=reason)
+                last_error = exc
+                delay = self._backoff(attempt)
+                if exc.status == 429:
+                    # Throttling is not an outage: slow every caller down instead of opening the circuit.
+                    self.breaker.release()
+                    retry_after = exc.retry_after if exc.retry_after is not None else delay
+                    self.limiter.pause(retry_after)
+                    delay = max(delay, retry_after)
+                else:
+                    self.breaker.record_failure()
+                remaining = remaining_time()
+                if attempt == self.max_retries:
+                    break
+                if remaining is not None and delay >= remaining:
+                    AZURE_REJECTED.inc(client=self.name, reason="deadline")
+                    raise DeadlineExceededError(f"{self.name}: retry would miss the request deadline") from exc
+                AZURE_RETRIES.inc(client=self.name, reason=reason)
+                time.sleep(delay)
+                continue
+            except Exception:
+                AZURE_REQUEST_SECONDS.observe(time.perf_counter() - started, client=self.name, outcome="error")
+                # A rejected request (e.g. 400) says nothing about endpoint health.
+                self.breaker.release()
+                raise
+            AZURE_REQUEST_SECONDS.observe(time.perf_counter() - started, client=self.name, outcome="success")
+            self.breaker.record_success()
+            return result
+        raise last_error
+
+    def post(self, url, headers=None, json=None, session=None):
+        """
+        POST with retries on 429/5xx/connection errors. Returns the final response,
+        or None if the call could not be completed.
+        """
+        session = session or self.session
+
+        def operation(timeout):
+            try:
+                response = session.post(url, headers=headers, json=json, timeout=timeout)
+            except requests.RequestException as exc:
+                raise RetryableError(str(exc)) from exc
+            if response.status_code == 429:
+                raise RetryableError(status=429, retry_after=parse_retry_after(response.headers.get("Retry-After")))
+            if response.status_code in (500, 502, 503, 504):
+                raise RetryableError(status=response.status_code)
+            return response
+
+        try:
+            return self.execute(operation)
+        except (RetryableError, ServiceUnavailableError):
+            return None
+
+
+def parse_retry_after(value, default=None):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+_clients = {}
+# Settings callers passed explicitly to get_client, per client key.
+_client_settings = {}
+_clients_lock = threading.Lock()
+
+
+def client_states():
+    """
+    Circuit state of every Azure client created so far, for health reporting.
+    """
+    with _clients_lock:
+        return {name: client.breaker.state for name, client in _clients.items()}
+
+
+def get_client(endpoint, **settings):
+    """
+    Return the process-wide client for an endpoint (keyed by scheme and host), creating it
+    on first use. Defaults come from AZURE_HTTP_RATE_LIMIT, AZURE_HTTP_BURST,
+    AZURE_HTTP_MAX_RETRIES, AZURE_HTTP_FAILURE_THRESHOLD and AZURE_HTTP_RECOVERY_SECONDS.
+
+    Settings passed here are applied to the shared client even if it already exists, so the
+    caller that asks for e.g. a lower rate gets it regardless of who created the client.
+    Passing a different value for a setting another caller already set explicitly raises
+    ValueError rather than silently overriding it.
+    """
+    parsed = urlparse(endpoint or "")
+    key = f"{parsed.scheme}://{parsed.netloc}" if parsed.netloc else (endpoint or "default")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            config = {
+                "rate": float(os.getenv("AZURE_HTTP_RATE_LIMIT", "10")),
+                "burst": float(os.getenv("AZURE_HTTP_BURST", "20")),
+                "max_retries": int(os.getenv("AZURE_HTTP_MAX_RETRIES", "4")),
+                "failure_threshold": int(os.getenv("AZURE_HTTP_FAILURE_THRESHOLD", "5")),
+                "recovery_time": float(os.getenv("AZURE_HTTP_RECOVERY_SECONDS", "30")),
+            }
+            config.update(settings)
+            client = _clients[key] = AzureHttpClient(key, **config)
+            _client_settings[key] = dict(settings)
+        elif settings:
+            requested = _client_settings[key]
+            conflicts = sorted(name for name, value in settings.items()
+                               if name in requested and requested[name] != value)
+            if conflicts:
+                raise ValueError(f"{key}: conflicting settings for shared client: {', '.join(conflicts)}")
+            client.configure(**settings)
+            requested.update(settings)
+        return client
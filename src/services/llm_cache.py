@@ -0,0 +1,116 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from utils.instrumentation import CACHE_REQUESTS
+
+
+def normalize_messages(messages):
+    """
+    Normalize chat messages for cache keying: roles kept, content whitespace collapsed.
+    """
+    normalized = []
+    for message in messages or []:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            content = re.sub(r"\s+", " ", content).strip()
+        normalized.append({"role": message.get("role", "user"), "content": content})
+    return normalized
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class LLMResponseCache:
+    """
+    Thread-safe LRU cache for chat completion results.
+
+    Entries expire after `ttl` seconds; deterministic calls (temperature 0) use
+    `deterministic_ttl`, which defaults to never expiring so they are only evicted by size.
+    Concurrent lookups of the same key share one in-flight call instead of each calling
+    the model (single-flight). Failed calls (None results) are not cached.
+    """
+
+    def __init__(self, max_entries=1024, ttl=900, deterministic_ttl=None, name="llm_responses"):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.deterministic_ttl = deterministic_ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(deployment, temperature, messages, **params):
+        payload = {
+            "deployment": deployment,
+            "temperature": round(float(temperature or 0.0), 4),
+            "messages": normalize_messages(messages),
+            "params": {k: v for k, v in sorted(params.items()) if v is not None},
+        }
+        data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get_or_call(self, key, fn, temperature=None):
+        """
+        Return the cached value for key, or call fn() once (across threads) and cache its result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                    return value
+                del self._entries[key]
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._in_flight[key] = _Flight()
+                self.misses += 1
+                leader = True
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if leader else "coalesced")
+        if not leader:
+            flight.event.wait()
+            return flight.result
+        try:
+            flight.result = fn()
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if flight.result is not None:
+                    ttl = self.deterministic_ttl if not temperature else self.ttl
+                    expires_at = time.monotonic() + ttl if ttl else None
+                    self._entries[key] = (flight.result, expires_at)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            flight.event.set()
+        return flight.result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,87 @@
+import json
+import os
+import sqlite3
+import threading
+
+from services.azure_services import AzureTableAuditService
+
+
+class LocalTableAuditService(AzureTableAuditService):
+    """
+    SQLite stand-in for AzureTableAuditService, used for local runs and load tests.
+
+    Entities are stored as JSON keyed by (PartitionKey, RowKey) and returned in the same
+    order Table storage uses, so RowKey ranges, projections and continuation tokens behave
+    like the real service.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('LOCAL_TABLE_PATH', 'audit_log.db')
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS audit_log ("
+                " partition_key TEXT NOT NULL,"
+                " row_key TEXT NOT NULL,"
+                " entity TEXT NOT NULL,"
+                " PRIMARY KEY (partition_key, row_key))"
+            )
+            self._conn.commit()
+
+    def log_audit(self, user_id, action, doc1_name, doc2_name, result_summary, status="Success"):
+        self.write_entities([self.build_entity(user_id, action, doc1_name, doc2_name, result_summary, status)])
+
+    def write_entities(self, entities):
+        rows = [(e["PartitionKey"], e["RowKey"], json.dumps(e, ensure_ascii=False, default=str)) for e in entities]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO audit_log (partition_key, row_key, entity) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def migrate_legacy_row_keys(self):
+        # The stand-in has only ever written time-ordered keys.
+        return 0
+
+    def query_audit_logs(self, user_id=None, start=None, end=None, page_size=50, continuation=None, select=None):
+        clauses, parameters = [], []
+        if user_id:
+            clauses.append("partition_key = ?")
+            parameters.append(user_id)
+        if end:
+            clauses.append("row_key >= ?")
+            parameters.append(self.reverse_timestamp(end))
+        if start:
+            clauses.append("row_key <= ?")
+            parameters.append(self.reverse_timestamp(start) + "~")
+        token = self.decode_continuation(continuation)
+        if token:
+            clauses.append("(partition_key > ? OR (partition_key = ? AND row_key >= ?))")
+            parameters.extend([token["PartitionKey"], token["PartitionKey"], token["RowKey"]])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT entity FROM audit_log{where} ORDER BY partition_key, row_key LIMIT ?",
+                parameters + [page_size + 1]
+            ).fetchall()
+        entities = [json.loads(row[0]) for row in rows]
+        next_token = None
+        if len(entities) > page_size:
+            following = entities.pop()
+            # Like Table storage, the token names the first entity of the next page.
+            next_token = self.encode_continuation(
+                {"PartitionKey": following["PartitionKey"], "RowKey": following["RowKey"]}
+            )
+        columns = select or self.AUDIT_COLUMNS
+        return [{k: e.get(k) for k in columns} for e in entities], next_token
+
+    def get_audit_logs(self, user_id=None):
+        logs, token = self.query_audit_logs(user_id=user_id, page_size=1000)
+        while token:
+            page, token = self.query_audit_logs(user_id=user_id, page_size=1000, continuation=token)
+            logs.extend(page)
+        return logs
@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import OrderedDict
+
+from services.blob_writer import decode_json, decompress_bytes, json_safe, result_blob_name
+from utils.instrumentation import CACHE_REQUESTS
+
+
+class StoredResult:
+    """
+    A stored comparison result whose sections are fetched from blob storage on first access.
+
+    The manifest lists the sections and references both documents by content hash; section
+    payloads (summary, insights, diff, charts) live in separate blobs so a reader that only
+    needs the metrics never downloads the chart images.
+    """
+
+    def __init__(self, store, doc1_hash, doc2_hash, manifest, sections=None):
+        self.store = store
+        self.doc1_hash = doc1_hash
+        self.doc2_hash = doc2_hash
+        self.manifest = manifest
+        self._sections = dict(sections or {})
+        self._lock = threading.Lock()
+
+    @property
+    def section_names(self):
+        return list(self.manifest.get("sections", []))
+
+    def section(self, name):
+        """
+        Return one section, loading it on first access. None if it is unknown or unavailable.
+        """
+        with self._lock:
+            if name in self._sections:
+                return self._sections[name]
+        if name not in self.section_names:
+            return None
+        payload = self.store.load_section(self.doc1_hash, self.doc2_hash, name)
+        if payload is not None:
+            with self._lock:
+                self._sections[name] = payload
+        return payload
+
+    def load(self, *names):
+        """
+        Return {name: section} for the requested sections, or None if any is unavailable.
+        """
+        sections = {}
+        for name in names or self.section_names:
+            payload = self.section(name)
+            if payload is None:
+                return None
+            sections[name] = payload
+        return sections
+
+
+class ResultStore:
+    """
+    Comparison results keyed by (doc1 hash, doc2 hash, pipeline version).
+
+    Recent results are kept in an in-memory LRU; older ones are read back from the blobs
+    written by the BlobWriter, one manifest plus one blob per section. Bumping the pipeline
+    version changes every key, so results produced by an older analyzer are never served.
+    Results where an AI or translation stage fell back are never stored, so the next
+    request for the same documents recomputes them instead of reusing degraded output.
+    """
+
+    def __init__(self, blob_service, blob_writer, pipeline_version, max_entries=None):
+        self.blob_service = blob_service
+        self.blob_writer = blob_writer
+        self.pipeline_version = str(pipeline_version)
+        self.max_entries = int(max_entries or os.getenv('RESULT_CACHE_SIZE', '128'))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def blob_name(self, doc1_hash, doc2_hash, section="manifest"):
+        return result_blob_name(doc1_hash, doc2_hash, self.pipeline_version, section)
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _download(self, blob_name):
+        try:
+            if not self.blob_service.exists(blob_name):
+                return None
+            return decode_json(decompress_bytes(self.blob_service.download_bytes(blob_name), blob_name))
+        except Exception:
+            return None
+
+    def load_section(self, doc1_hash, doc2_hash, section):
+        return self._download(self.blob_name(doc1_hash, doc2_hash, section))
+
+    def get(self, doc1_hash, doc2_hash):
+        """
+        Return a StoredResult for the pair, or None if it was never computed with this version.
+        Only the manifest is read here; sections load on demand.
+        """
+        key = (doc1_hash, doc2_hash)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.inc(cache="results", result="hit")
+                return result
+        manifest = self._download(self.blob_name(doc1_hash, doc2_hash))
+        if (not isinstance(manifest, dict) or manifest.get("pipeline_version") != self.pipeline_version
+                or manifest.get("fallbacks")):
+            with self._lock:
+                self.misses += 1
+            CACHE_REQUESTS.inc(cache="results", result="miss")
+            return None
+        result = StoredResult(self, doc1_hash, doc2_hash, manifest)
+        self._remember(key, result)
+        with self._lock:
+            self.hits += 1
+        CACHE_REQUESTS.inc(cache="results", result="hit_blob")
+        return result
+
+    def put(self, doc1_hash, doc2_hash, sections, fallbacks=(), **manifest_fields):
+        """
+        Remember the sections and queue one upload per section. Values are converted with
+        json_safe first; anything JSON cannot represent raises TypeError. The manifest is
+        queued only after every section upload has succeeded, so a stored manifest never
+        points at a missing section; if any section fails, the result is not persisted.
+        fallbacks names the stages that fell back (see InsightsGenerator); if there are any,
+        nothing is stored and None is returned. Otherwise returns the manifest blob name.
+        """
+        if fallbacks:
+            return None
+        # Converted up front so results served from memory have the same types as ones read back from blobs.
+        sections = json_safe(sections)
+        manifest = json_safe(dict(manifest_fields, pipeline_version=self.pipeline_version,
+                                  sections=sorted(sections), fallbacks=[]))
+        self._remember((doc1_hash, doc2_hash), StoredResult(self, doc1_hash, doc2_hash, manifest, sections))
+        manifest_name = self.blob_name(doc1_hash, doc2_hash)
+        if not sections:
+            return self.blob_writer.store_json(manifest_name, manifest)
+        state = {"remaining": len(sections), "ok": True}
+        lock = threading.Lock()
+
+        def section_done(ok):
+            with lock:
+                state["ok"] = state["ok"] and ok
+                state["remaining"] -= 1
+                if state["remaining"]:
+                    return
+            if state["ok"]:
+                self.blob_writer.store_json(manifest_name, manifest)
+
+        for name, payload in sections.items():
+            self.blob_writer.store_json(self.blob_name(doc1_hash, doc2_hash, name), payload, on_done=section_done)
+        return manifest_name
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
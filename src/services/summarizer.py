@@ -0,0 +1,95 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from services.http_client import run_in_context
+from utils.helpers import estimate_tokens, log_error, split_by_token_budget
+from utils.instrumentation import CACHE_REQUESTS
+
+
+class ChunkedSummarizer:
+    """
+    Map-reduce summarizer for texts larger than a single prompt.
+
+    The text is split on structural boundaries into token-budgeted chunks, chunks are
+    summarized in parallel and the partial summaries are combined hierarchically until
+    one summary remains. Every summary is cached by the hash of its input, so summarizing
+    a lightly edited document only pays for the chunks that changed. If any chunk or group
+    cannot be summarized the whole summary fails (None) rather than silently leaving out
+    part of the document; the chunk summaries that did succeed stay cached for the retry.
+    """
+
+    def __init__(self, summarize_fn, chunk_tokens=3000, max_workers=4, cache_size=2048):
+        """
+        summarize_fn(text, language, combine) must return a summary string or None.
+        combine is True when text is a set of partial summaries rather than source text.
+        """
+        self.summarize_fn = summarize_fn
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def summarize(self, text, language="en"):
+        if not text or not text.strip():
+            return ""
+        if estimate_tokens(text) <= self.chunk_tokens:
+            return self._cached_summary(text, language, combine=False)
+        summaries = self._summarize_all(split_by_token_budget(text, self.chunk_tokens), language, combine=False)
+        for _ in range(8):
+            if summaries is None:
+                return None
+            if len(summaries) == 1:
+                return summaries[0]
+            combined = "\n\n".join(summaries)
+            if estimate_tokens(combined) <= self.chunk_tokens:
+                return self._cached_summary(combined, language, combine=True)
+            groups = split_by_token_budget(combined, self.chunk_tokens)
+            if len(groups) >= len(summaries):
+                # Partial summaries are as large as the budget; fold them pairwise.
+                groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+            summaries = self._summarize_all(groups, language, combine=True)
+        return "\n\n".join(summaries) if summaries is not None else None
+
+    def _summarize_all(self, chunks, language, combine):
+        """
+        Summaries of every chunk, in order, or None if any chunk could not be summarized.
+        """
+        if len(chunks) == 1:
+            results = [self._cached_summary(chunks[0], language, combine)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                results = list(executor.map(run_in_context(lambda c: self._cached_summary(c, language, combine)), chunks))
+        missing = sum(1 for r in results if not r)
+        if missing:
+            log_error(f"Summarizing {missing} of {len(chunks)} {'summary groups' if combine else 'chunks'} failed; "
+                      "returning no summary rather than a partial one")
+            return None
+        return results
+
+    def _cached_summary(self, text, language, combine):
+        key = hashlib.sha256(f"{language}\0{int(combine)}\0{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                CACHE_REQUESTS.inc(cache="summaries", result="hit")
+                return self._cache[key]
+        CACHE_REQUESTS.inc(cache="summaries", result="miss")
+        summary = self.summarize_fn(text, language, combine)
+        if summary:
+            with self._lock:
+                self._cache[key] = summary
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def cache_info(self):
+        with self._lock:
+            return {"entries": len(self._cache), "max_entries": self.cache_size}
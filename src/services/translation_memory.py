@@ -0,0 +1,90 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+
+def normalize_sentence(sentence):
+    """
+    Normalize a source sentence for translation memory lookups (whitespace collapsed, trimmed).
+    """
+    return re.sub(r"\s+", " ", sentence or "").strip()
+
+
+class TranslationMemory:
+    """
+    Persistent sentence-level translation memory backed by SQLite.
+
+    Entries are keyed by (normalized source sentence, source language, target language),
+    so sentences that repeat across document versions are translated only once.
+    """
+
+    def __init__(self, path="translation_memory.db"):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translation_memory ("
+                " source_hash TEXT NOT NULL,"
+                " source_language TEXT NOT NULL,"
+                " target_language TEXT NOT NULL,"
+                " source_text TEXT NOT NULL,"
+                " translated_text TEXT NOT NULL,"
+                " PRIMARY KEY (source_hash, source_language, target_language))"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _hash(sentence):
+        return hashlib.sha256(normalize_sentence(sentence).encode("utf-8")).hexdigest()
+
+    def get_many(self, sentences, source_language, target_language):
+        """
+        Look up sentences; returns {normalized sentence: translation} for the ones in memory.
+        """
+        by_hash = {self._hash(s): normalize_sentence(s) for s in sentences}
+        found = {}
+        hashes = list(by_hash)
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT source_hash, translated_text FROM translation_memory"
+                    f" WHERE source_language = ? AND target_language = ? AND source_hash IN ({','.join('?' * len(batch))})",
+                    [source_language or "auto", target_language, *batch]
+                ).fetchall()
+                for source_hash, translated in rows:
+                    found[by_hash[source_hash]] = translated
+        return found
+
+    def put_many(self, pairs, source_language, target_language):
+        """
+        Store (source sentence, translation) pairs.
+        """
+        rows = [
+            (self._hash(source), source_language or "auto", target_language, normalize_sentence(source), translated)
+            for source, translated in pairs
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translation_memory"
+                " (source_hash, source_language, target_language, source_text, translated_text)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -10,6 +10,54 @@ def chunk_text(text, max_chars=4000):
         return []
     return [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
 
+def estimate_tokens(text, chars_per_token=4):
+    """
+    Roughly estimate the number of model tokens in text (about four characters per token for English).
+    """
+    if not text:
+        return 0
+    return len(text) // chars_per_token + 1
+
+def split_by_token_budget(text, max_tokens=3000):
+    """
+    Split text into chunks of at most max_tokens (estimated), breaking on structural boundaries:
+    paragraphs and headings first, then sentences, and only as a last resort mid-sentence.
+
+    Where a chunk ends is decided by content, not by position: a chunk closes after a block whose
+    checksum marks it as a boundary (on average every 2/3 * max_tokens tokens), or when the next
+    block would not fit. Editing one paragraph therefore changes only the chunks up to the next
+    such boundary, instead of shifting every later chunk and missing per-chunk caches.
+    """
+    import re
+    import zlib
+    if not text or not text.strip():
+        return []
+    max_chars = max_tokens * 4
+    target_chars, min_chars = max_chars / 1.5, max_chars / 4
+    blocks = [b for b in re.split(r'\n\s*\n|\n(?=#{1,6}\s)', text) if b.strip()]
+    pieces = []
+    for block in blocks:
+        if len(block) <= max_chars:
+            pieces.append(block.strip())
+            continue
+        for sentence in re.split(r'(?<=[.!?])\s+', block):
+            pieces.extend(chunk_text(sentence, max_chars))
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+        # Longer blocks are proportionally more likely to end a chunk, so boundaries fall about
+        # every target_chars characters whatever the block sizes.
+        anchor = zlib.crc32(piece.encode("utf-8")) / 2 ** 32 < len(piece) / target_chars
+        if anchor and len(current) >= min_chars:
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return chunks
+
 def format_output(data, as_json=False, indent=2):
     """
     Format output for display. Supports JSON and pretty string.
@@ -0,0 +1,181 @@
+"""
+Multi-pattern keyword matching with an Aho-Corasick automaton over tokens.
+
+Keywords and documents are split the same way into tokens: words (runs of \\w characters)
+and single symbol characters. A keyword therefore only matches whole words ("audit" finds
+"Audit," but not "audited"), and symbols are part of the match: "c++" finds "C++" but not
+"C", "node.js" does not find "node js". Tokens written together in a keyword must be
+adjacent in the text; where the keyword has whitespace the text must have some, of any
+kind (including line breaks). The automaton's alphabet is tokens rather than characters,
+which keeps the pure-Python scan to one dictionary step per token however many keywords
+are compiled.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+from models import Document
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# line is the 0-based line index of the match start, as returned by Document.line_number.
+KeywordMatch = namedtuple("KeywordMatch", ["keyword", "start", "end", "line"])
+
+
+class KeywordMatcher:
+    """
+    A keyword list compiled once into an automaton that finds every occurrence of every
+    keyword in a single pass over a document.
+
+    Use KeywordMatcher.for_keywords to share compiled automata between calls; compliance
+    keyword lists can run to thousands of terms and should not be rebuilt per request.
+    """
+
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    _cache_size = int(os.getenv('KEYWORD_MATCHER_CACHE_SIZE', '32'))
+
+    def __init__(self, keywords, case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        self.keywords = list(dict.fromkeys(keywords))
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        # Per pattern: the keywords it stands for, its token count and, for each pair of
+        # neighbouring tokens, whether they are adjacent.
+        self._patterns = []
+        patterns = {}
+        for keyword in self.keywords:
+            tokens, joins = self._split(keyword)
+            if not tokens:
+                continue
+            key = (tuple(tokens), joins)
+            if key not in patterns:
+                patterns[key] = len(self._patterns)
+                self._patterns.append(([], len(tokens), joins))
+                self._insert(tokens, patterns[key])
+            self._patterns[patterns[key]][0].append(keyword)
+        self.max_tokens = max((length for _, length, _ in self._patterns), default=0)
+        self._link()
+
+    @classmethod
+    def for_keywords(cls, keywords, case_sensitive=False):
+        """
+        Return the cached matcher for a keyword list, compiling it on first use.
+        """
+        key = (tuple(keywords), case_sensitive)
+        with cls._cache_lock:
+            matcher = cls._cache.get(key)
+            if matcher is not None:
+                cls._cache.move_to_end(key)
+                return matcher
+        matcher = cls(key[0], case_sensitive)
+        with cls._cache_lock:
+            cls._cache[key] = matcher
+            while len(cls._cache) > cls._cache_size:
+                cls._cache.popitem(last=False)
+        return matcher
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def _fold(self, token):
+        return token if self.case_sensitive else token.casefold()
+
+    def _split(self, keyword):
+        spans = [m.span() for m in TOKEN_PATTERN.finditer(keyword or "")]
+        tokens = [self._fold(keyword[start:end]) for start, end in spans]
+        joins = tuple(spans[i][1] == spans[i + 1][0] for i in range(len(spans) - 1))
+        return tokens, joins
+
+    def _insert(self, tokens, pattern):
+        state = 0
+        for token in tokens:
+            following = self._goto[state].get(token)
+            if following is None:
+                following = self._goto[state][token] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = following
+        self._output[state] += (pattern,)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(token, 0)
+                self._output[following] += self._output[self._fail[following]]
+
+    def finditer(self, text):
+        """
+        Yield (pattern index, start offset, end offset) for every match in text, in order of
+        the match end.
+        """
+        if not self._patterns:
+            return
+        goto, fail, output, patterns, fold = self._goto, self._fail, self._output, self._patterns, self._fold
+        spans = deque(maxlen=self.max_tokens)
+        state = 0
+        for match in TOKEN_PATTERN.finditer(text):
+            token = fold(match.group())
+            spans.append(match.span())
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for pattern in output[state]:
+                _, length, joins = patterns[pattern]
+                first = len(spans) - length
+                if joins and any((spans[first + i][1] == spans[first + i + 1][0]) != joined
+                                 for i, joined in enumerate(joins)):
+                    continue
+                yield pattern, spans[first][0], spans[-1][1]
+
+    def find_all(self, document):
+        """
+        All matches in a document (text or Document).
+
+        Returns:
+        list[KeywordMatch]: one entry per keyword per occurrence, ordered by position
+        """
+        document = Document.for_text(document)
+        matches = []
+        for pattern, start, end in self.finditer(document.content):
+            line = document.line_number(start)
+            matches.extend(KeywordMatch(keyword, start, end, line) for keyword in self._patterns[pattern][0])
+        matches.sort(key=lambda m: m.start)
+        return matches
+
+    def found(self, document):
+        """
+        Set of keywords occurring in a document; stops scanning once every keyword is found.
+        """
+        text = Document.for_text(document).content
+        seen = set()
+        for pattern, _, _ in self.finditer(text):
+            if pattern not in seen:
+                seen.add(pattern)
+                if len(seen) == len(self._patterns):
+                    break
+        return {keyword for pattern in seen for keyword in self._patterns[pattern][0]}
+
+    def lines(self, document):
+        """
+        {keyword: sorted 1-based line numbers containing a match} for every keyword, with an
+        empty list for keywords that do not occur.
+        """
+        lines = {keyword: set() for keyword in self.keywords}
+        for match in self.find_all(document):
+            lines[match.keyword].add(match.line + 1)
+        return {keyword: sorted(numbers) for keyword, numbers in lines.items()}
@@ -0,0 +1,222 @@
+"""
+Offline language identification.
+
+Scripts with a single dominant language (Greek, Hebrew, Thai, Hangul, kana, Han, ...) are
+identified from Unicode ranges; Latin and Cyrillic text is scored with a naive Bayes model
+over character 1-3 grams trained on the bundled samples in utils.langid_samples. Language
+codes follow Azure Translator so results can be passed straight to MultilingualService.
+"""
+import re
+import threading
+from collections import Counter
+
+from utils.langid_samples import CYRILLIC_SAMPLES, LATIN_SAMPLES
+
+NGRAM_SIZES = (1, 2, 3)
+SAMPLE_CHARS = 600
+MIN_LETTERS = 8
+
+# (first code point, last code point, script)
+_SCRIPT_RANGES = [
+    (0x0041, 0x024F, "Latin"),
+    (0x1E00, 0x1EFF, "Latin"),
+    (0x0370, 0x03FF, "Greek"),
+    (0x0400, 0x052F, "Cyrillic"),
+    (0x0590, 0x05FF, "Hebrew"),
+    (0x0600, 0x06FF, "Arabic"),
+    (0x0750, 0x077F, "Arabic"),
+    (0x0900, 0x097F, "Devanagari"),
+    (0x0E00, 0x0E7F, "Thai"),
+    (0x1100, 0x11FF, "Hangul"),
+    (0x3040, 0x30FF, "Kana"),
+    (0x3400, 0x4DBF, "Han"),
+    (0x4E00, 0x9FFF, "Han"),
+    (0xAC00, 0xD7AF, "Hangul"),
+]
+
+_SCRIPT_LANGUAGE = {
+    "Greek": "el",
+    "Hebrew": "he",
+    "Arabic": "ar",
+    "Devanagari": "hi",
+    "Thai": "th",
+    "Hangul": "ko",
+    "Kana": "ja",
+    "Han": "zh-Hans",
+}
+
+_NON_LETTERS = re.compile(r"[\W\d_]+", re.UNICODE)
+
+
+def _script_of(ch):
+    code = ord(ch)
+    for first, last, script in _SCRIPT_RANGES:
+        if first <= code <= last:
+            return script
+    return None
+
+
+def dominant_script(text):
+    """
+    Return (script, letter count) for the most common script among the letters of text.
+    """
+    counts = Counter()
+    for ch in text:
+        if ch.isalpha():
+            script = _script_of(ch)
+            if script:
+                counts[script] += 1
+    if not counts:
+        return None, 0
+    # Japanese text mixes kana with Han; any meaningful amount of kana means Japanese.
+    kana, han = counts.get("Kana", 0), counts.get("Han", 0)
+    if kana and kana >= 0.1 * (kana + han) and kana + han >= max(counts.values()):
+        return "Kana", kana + han
+    return counts.most_common(1)[0]
+
+
+def _ngrams(text):
+    padded = " " + " ".join(_NON_LETTERS.sub(" ", text.lower()).split()) + " "
+    grams = Counter(padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1))
+    grams.pop(" ", None)
+    return grams
+
+
+class _NaiveBayesModel:
+    """
+    Multinomial naive Bayes over n-gram counts, stored as a (vocabulary + 1) x languages
+    log-probability matrix whose last row holds the smoothed probability of unseen n-grams.
+    """
+
+    def __init__(self, samples, alpha=0.5):
+        import numpy as np
+        self.languages = list(samples)
+        counts = [_ngrams(text) for text in samples.values()]
+        vocabulary = sorted(set().union(*counts))
+        self.index = {gram: i for i, gram in enumerate(vocabulary)}
+        matrix = np.zeros((len(vocabulary) + 1, len(self.languages)))
+        for col, grams in enumerate(counts):
+            total = sum(grams.values()) + alpha * (len(vocabulary) + 1)
+            matrix[:, col] = np.log(alpha / total)
+            for gram, count in grams.items():
+                matrix[self.index[gram], col] = np.log((count + alpha) / total)
+        self.log_probs = matrix
+
+    def scores(self, grams):
+        import numpy as np
+        unseen = len(self.index)
+        rows = np.fromiter((self.index.get(gram, unseen) for gram in grams), dtype=np.intp, count=len(grams))
+        weights = np.fromiter(grams.values(), dtype=np.float64, count=len(grams))
+        return dict(zip(self.languages, (weights @ self.log_probs[rows]).tolist()))
+
+
+class LanguageIdentifier:
+    """
+    Character n-gram language identifier that runs fully offline.
+    """
+
+    def __init__(self, sample_chars=SAMPLE_CHARS):
+        self.sample_chars = sample_chars
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, script):
+        model = self._models.get(script)
+        if model is None:
+            with self._lock:
+                model = self._models.get(script)
+                if model is None:
+                    samples = LATIN_SAMPLES if script == "Latin" else CYRILLIC_SAMPLES
+                    model = self._models[script] = _NaiveBayesModel(samples)
+        return model
+
+    def classify(self, text):
+        """
+        Identify the language of a short text (a paragraph or a sample of a document).
+
+        Returns:
+        tuple: (language code or None, confidence between 0.0 and 1.0)
+        """
+        if not text:
+            return None, 0.0
+        sample = text[:self.sample_chars]
+        script, letters = dominant_script(sample)
+        if script is None or letters < MIN_LETTERS:
+            return None, 0.0
+        if script in _SCRIPT_LANGUAGE:
+            return _SCRIPT_LANGUAGE[script], 1.0
+        grams = _ngrams(sample)
+        if not grams:
+            return None, 0.0
+        scores = self._model(script).scores(grams)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_lang, best = ranked[0]
+        if len(ranked) == 1:
+            return best_lang, 1.0
+        # Confidence from the per-n-gram log-likelihood margin over the runner-up.
+        margin = (best - ranked[1][1]) / sum(grams.values())
+        return best_lang, round(min(1.0, margin / 0.15), 3)
+
+    def detect_paragraphs(self, text):
+        """
+        Detect the language of each paragraph, merging adjacent paragraphs in the same language.
+
+        Returns:
+        list of dict: [{'start': int, 'end': int, 'language': str or None, 'confidence': float}, ...]
+        """
+        spans = []
+        for match in re.finditer(r"\S(?:.*?\S)?(?=\n\s*\n|\s*\Z)", text or "", re.S):
+            language, confidence = self.classify(match.group())
+            if spans and spans[-1]["language"] == language:
+                spans[-1]["end"] = match.end()
+                spans[-1]["confidence"] = max(spans[-1]["confidence"], confidence)
+                continue
+            spans.append({"start": match.start(), "end": match.end(), "language": language, "confidence": confidence})
+        return spans
+
+    def detect(self, text, max_paragraphs=20):
+        """
+        Detect the main language of a document. Large documents are sampled at up to
+        max_paragraphs evenly spaced paragraphs and the result is weighted by length.
+
+        Returns:
+        tuple: (language code or None, confidence between 0.0 and 1.0)
+        """
+        if not text or not text.strip():
+            return None, 0.0
+        if len(text) <= self.sample_chars:
+            return self.classify(text)
+        paragraphs = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+        if len(paragraphs) > max_paragraphs:
+            step = len(paragraphs) / max_paragraphs
+            paragraphs = [paragraphs[int(i * step)] for i in range(max_paragraphs)]
+        weights = Counter()
+        confidence = Counter()
+        for paragraph in paragraphs:
+            language, conf = self.classify(paragraph)
+            if language:
+                weight = min(len(paragraph), self.sample_chars)
+                weights[language] += weight
+                confidence[language] += conf * weight
+        if not weights:
+            return None, 0.0
+        language, weight = weights.most_common(1)[0]
+        share = weight / sum(weights.values())
+        return language, round(share * confidence[language] / weight, 3)
+
+
+_default_identifier = LanguageIdentifier()
+
+
+def detect_language(text):
+    """
+    Return (language code or None, confidence) for text using the shared offline identifier.
+    """
+    return _default_identifier.detect(text)
+
+
+def detect_paragraph_languages(text):
+    """
+    Per-paragraph language spans for mixed-language documents (see LanguageIdentifier.detect_paragraphs).
+    """
+    return _default_identifier.detect_paragraphs(text)
@@ -0,0 +1,188 @@
+# Training text for the bundled character n-gram language identifier (utils.langid).
+# Each sample combines the opening articles of the Universal Declaration of Human Rights
+# with contract and everyday sentences, which keeps the profiles close to the business
+# documents this app compares. Keys are Azure Translator language codes.
+
+LATIN_SAMPLES = {
+    "en": (
+        "All human beings are born free and equal in dignity and rights. They are endowed with reason and "
+        "conscience and should act towards one another in a spirit of brotherhood. Everyone is entitled to all "
+        "the rights and freedoms set forth in this Declaration, without distinction of any kind, such as race, "
+        "colour, sex, language, religion, political or other opinion, national or social origin, property, birth "
+        "or other status. The parties agree that this agreement shall be governed by the laws of the state and "
+        "that any notice must be given in writing within thirty days. We would like to thank you for your order "
+        "and we hope to see you again soon. The weather was nice yesterday, so we went for a walk in the park "
+        "with the children. Please find attached the updated policy, which replaces the previous version and "
+        "applies to all employees with immediate effect."
+    ),
+    "fr": (
+        "Tous les êtres humains naissent libres et égaux en dignité et en droits. Ils sont doués de raison et de "
+        "conscience et doivent agir les uns envers les autres dans un esprit de fraternité. Chacun peut se "
+        "prévaloir de tous les droits et de toutes les libertés proclamés dans la présente Déclaration, sans "
+        "distinction aucune, notamment de race, de couleur, de sexe, de langue, de religion, d'opinion politique "
+        "ou de toute autre opinion, d'origine nationale ou sociale, de fortune, de naissance ou de toute autre "
+        "situation. Les parties conviennent que le présent contrat est régi par la loi et que tout avis doit être "
+        "donné par écrit dans un délai de trente jours. Nous vous remercions de votre commande et nous espérons "
+        "vous revoir bientôt. Il faisait beau hier, alors nous sommes allés nous promener dans le parc avec les "
+        "enfants. Veuillez trouver ci-joint la politique mise à jour, qui remplace la version précédente."
+    ),
+    "de": (
+        "Alle Menschen sind frei und gleich an Würde und Rechten geboren. Sie sind mit Vernunft und Gewissen "
+        "begabt und sollen einander im Geist der Brüderlichkeit begegnen. Jeder hat Anspruch auf alle in dieser "
+        "Erklärung verkündeten Rechte und Freiheiten ohne irgendeinen Unterschied, etwa nach Rasse, Hautfarbe, "
+        "Geschlecht, Sprache, Religion, politischer oder sonstiger Anschauung, nationaler oder sozialer Herkunft, "
+        "Vermögen, Geburt oder sonstigem Stand. Die Parteien vereinbaren, dass dieser Vertrag dem Recht des "
+        "Landes unterliegt und dass jede Mitteilung innerhalb von dreißig Tagen schriftlich erfolgen muss. Wir "
+        "danken Ihnen für Ihre Bestellung und hoffen, Sie bald wieder bei uns begrüßen zu dürfen. Gestern war "
+        "das Wetter schön, also sind wir mit den Kindern im Park spazieren gegangen. Anbei finden Sie die "
+        "aktualisierte Richtlinie, die die vorherige Fassung ersetzt und ab sofort für alle Mitarbeiter gilt."
+    ),
+    "es": (
+        "Todos los seres humanos nacen libres e iguales en dignidad y derechos y, dotados como están de razón y "
+        "conciencia, deben comportarse fraternalmente los unos con los otros. Toda persona tiene todos los "
+        "derechos y libertades proclamados en esta Declaración, sin distinción alguna de raza, color, sexo, "
+        "idioma, religión, opinión política o de cualquier otra índole, origen nacional o social, posición "
+        "económica, nacimiento o cualquier otra condición. Las partes acuerdan que este contrato se regirá por "
+        "las leyes del país y que cualquier notificación deberá hacerse por escrito en un plazo de treinta días. "
+        "Le agradecemos su pedido y esperamos volver a verle pronto. Ayer hizo buen tiempo, así que fuimos a "
+        "pasear por el parque con los niños. Adjuntamos la política actualizada, que sustituye a la versión "
+        "anterior y se aplica a todos los empleados con efecto inmediato."
+    ),
+    "it": (
+        "Tutti gli esseri umani nascono liberi ed eguali in dignità e diritti. Essi sono dotati di ragione e di "
+        "coscienza e devono agire gli uni verso gli altri in spirito di fratellanza. Ad ogni individuo spettano "
+        "tutti i diritti e tutte le libertà enunciate nella presente Dichiarazione, senza distinzione alcuna, per "
+        "ragioni di razza, di colore, di sesso, di lingua, di religione, di opinione politica o di altro genere, "
+        "di origine nazionale o sociale, di ricchezza, di nascita o di altra condizione. Le parti convengono che "
+        "il presente contratto è regolato dalla legge del paese e che ogni comunicazione deve essere fatta per "
+        "iscritto entro trenta giorni. La ringraziamo per il suo ordine e speriamo di rivederla presto. Ieri il "
+        "tempo era bello, quindi siamo andati a fare una passeggiata nel parco con i bambini. In allegato trova "
+        "la politica aggiornata, che sostituisce la versione precedente."
+    ),
+    "pt": (
+        "Todos os seres humanos nascem livres e iguais em dignidade e em direitos. Dotados de razão e de "
+        "consciência, devem agir uns para com os outros em espírito de fraternidade. Todos os seres humanos "
+        "podem invocar os direitos e as liberdades proclamados na presente Declaração, sem distinção alguma, "
+        "nomeadamente de raça, de cor, de sexo, de língua, de religião, de opinião política ou outra, de origem "
+        "nacional ou social, de fortuna, de nascimento ou de qualquer outra situação. As partes concordam que "
+        "este contrato será regido pelas leis do país e que qualquer notificação deverá ser feita por escrito no "
+        "prazo de trinta dias. Agradecemos a sua encomenda e esperamos vê-lo novamente em breve. Ontem o tempo "
+        "estava bom, então fomos passear no parque com as crianças. Em anexo segue a política atualizada, que "
+        "substitui a versão anterior e se aplica a todos os funcionários."
+    ),
+    "nl": (
+        "Alle mensen worden vrij en gelijk in waardigheid en rechten geboren. Zij zijn begiftigd met verstand en "
+        "geweten, en behoren zich jegens elkander in een geest van broederschap te gedragen. Een ieder heeft "
+        "aanspraak op alle rechten en vrijheden, in deze Verklaring opgesomd, zonder enig onderscheid van welke "
+        "aard ook, zoals ras, kleur, geslacht, taal, godsdienst, politieke of andere overtuiging, nationale of "
+        "maatschappelijke afkomst, eigendom, geboorte of andere status. De partijen komen overeen dat deze "
+        "overeenkomst wordt beheerst door het recht van het land en dat elke kennisgeving binnen dertig dagen "
+        "schriftelijk moet worden gedaan. Wij danken u voor uw bestelling en hopen u snel weer te zien. Gisteren "
+        "was het mooi weer, dus zijn we met de kinderen in het park gaan wandelen. Bijgevoegd vindt u het "
+        "bijgewerkte beleid, dat de vorige versie vervangt."
+    ),
+    "sv": (
+        "Alla människor är födda fria och lika i värde och rättigheter. De har utrustats med förnuft och samvete "
+        "och bör handla gentemot varandra i en anda av broderskap. Var och en är berättigad till alla de fri- och "
+        "rättigheter som uttalas i denna förklaring utan åtskillnad av något slag, såsom ras, hudfärg, kön, "
+        "språk, religion, politisk eller annan uppfattning, nationellt eller socialt ursprung, egendom, börd "
+        "eller ställning i övrigt. Parterna är överens om att detta avtal ska regleras av landets lag och att "
+        "varje meddelande ska lämnas skriftligen inom trettio dagar. Vi tackar för din beställning och hoppas "
+        "att få se dig snart igen. Igår var vädret fint, så vi tog en promenad i parken med barnen. Bifogat "
+        "finner du den uppdaterade policyn, som ersätter den tidigare versionen."
+    ),
+    "da": (
+        "Alle mennesker er født frie og lige i værdighed og rettigheder. De er udstyret med fornuft og "
+        "samvittighed, og de bør handle mod hverandre i en broderskabets ånd. Enhver har krav på alle de "
+        "rettigheder og friheder, som nævnes i denne erklæring, uden forskel af nogen art, for eksempel race, "
+        "farve, køn, sprog, religion, politisk eller anden anskuelse, national eller social oprindelse, "
+        "formueforhold, fødsel eller anden samfundsmæssig stilling. Parterne er enige om, at denne aftale er "
+        "underlagt landets lovgivning, og at enhver meddelelse skal gives skriftligt inden for tredive dage. Vi "
+        "takker for din bestilling og håber at se dig igen snart. I går var vejret godt, så vi gik en tur i "
+        "parken med børnene. Vedhæftet finder du den opdaterede politik, som erstatter den tidligere version."
+    ),
+    "pl": (
+        "Wszyscy ludzie rodzą się wolni i równi pod względem swej godności i swych praw. Są oni obdarzeni "
+        "rozumem i sumieniem i powinni postępować wobec innych w duchu braterstwa. Każdy człowiek posiada "
+        "wszystkie prawa i wolności zawarte w niniejszej Deklaracji bez względu na jakiekolwiek różnice rasy, "
+        "koloru skóry, płci, języka, wyznania, poglądów politycznych i innych, narodowości, pochodzenia "
+        "społecznego, majątku, urodzenia lub jakiegokolwiek innego stanu. Strony zgadzają się, że niniejsza "
+        "umowa podlega prawu kraju, a wszelkie zawiadomienia muszą być składane na piśmie w ciągu trzydziestu "
+        "dni. Dziękujemy za zamówienie i mamy nadzieję, że wkrótce znów się zobaczymy. Wczoraj była ładna "
+        "pogoda, więc poszliśmy z dziećmi na spacer do parku. W załączeniu przesyłamy zaktualizowaną politykę, "
+        "która zastępuje poprzednią wersję."
+    ),
+    "cs": (
+        "Všichni lidé rodí se svobodní a sobě rovní co do důstojnosti a práv. Jsou nadáni rozumem a svědomím a "
+        "mají spolu jednat v duchu bratrství. Každý má všechna práva a všechny svobody, stanovené touto "
+        "Deklarací, bez jakéhokoli rozlišování podle rasy, barvy, pohlaví, jazyka, náboženství, politického nebo "
+        "jiného smýšlení, národnostního nebo sociálního původu, majetku, rodu nebo jiného postavení. Smluvní "
+        "strany se dohodly, že tato smlouva se řídí právem země a že veškerá oznámení musí být učiněna písemně "
+        "do třiceti dnů. Děkujeme za vaši objednávku a doufáme, že se brzy znovu uvidíme. Včera bylo hezké "
+        "počasí, takže jsme šli s dětmi na procházku do parku. V příloze naleznete aktualizovanou směrnici, "
+        "která nahrazuje předchozí verzi."
+    ),
+    "ro": (
+        "Toate ființele umane se nasc libere și egale în demnitate și în drepturi. Ele sunt înzestrate cu rațiune "
+        "și conștiință și trebuie să se comporte unele față de altele în spiritul fraternității. Fiecare om se "
+        "poate prevala de toate drepturile și libertățile proclamate în prezenta Declarație fără niciun fel de "
+        "deosebire ca, de pildă, deosebirea de rasă, culoare, sex, limbă, religie, opinie politică sau orice altă "
+        "opinie, de origine națională sau socială, avere, naștere sau orice alte împrejurări. Părțile sunt de "
+        "acord că acest contract este guvernat de legile țării și că orice notificare trebuie făcută în scris în "
+        "termen de treizeci de zile. Vă mulțumim pentru comandă și sperăm să vă revedem în curând. Ieri vremea a "
+        "fost frumoasă, așa că am mers la plimbare în parc cu copiii."
+    ),
+    "tr": (
+        "Bütün insanlar hür, haysiyet ve haklar bakımından eşit doğarlar. Akıl ve vicdana sahiptirler ve "
+        "birbirlerine karşı kardeşlik zihniyeti ile hareket etmelidirler. Herkes, ırk, renk, cinsiyet, dil, din, "
+        "siyasi veya diğer herhangi bir akide, milli veya içtimai menşe, servet, doğuş veya herhangi diğer bir "
+        "fark gözetilmeksizin işbu Beyannamede ilan olunan tüm haklardan ve bütün hürriyetlerden istifade "
+        "edebilir. Taraflar, bu sözleşmenin ülke yasalarına tabi olduğunu ve her türlü bildirimin otuz gün "
+        "içinde yazılı olarak yapılması gerektiğini kabul eder. Siparişiniz için teşekkür ederiz ve sizi yakında "
+        "tekrar görmeyi umuyoruz. Dün hava güzeldi, bu yüzden çocuklarla parkta yürüyüşe çıktık. Ekte, önceki "
+        "sürümün yerini alan güncellenmiş politikayı bulabilirsiniz."
+    ),
+    "fi": (
+        "Kaikki ihmiset syntyvät vapaina ja tasavertaisina arvoltaan ja oikeuksiltaan. Heille on annettu järki "
+        "ja omatunto, ja heidän on toimittava toisiaan kohtaan veljeyden hengessä. Jokainen on oikeutettu "
+        "kaikkiin tässä julistuksessa esitettyihin oikeuksiin ja vapauksiin ilman minkäänlaista rotuun, väriin, "
+        "sukupuoleen, kieleen, uskontoon, poliittiseen tai muuhun mielipiteeseen, kansalliseen tai "
+        "yhteiskunnalliseen alkuperään, omaisuuteen, syntyperään tai muuhun tekijään perustuvaa erotusta. "
+        "Osapuolet sopivat, että tähän sopimukseen sovelletaan maan lakia ja että kaikki ilmoitukset on "
+        "tehtävä kirjallisesti kolmenkymmenen päivän kuluessa. Kiitämme tilauksestasi ja toivomme näkevämme "
+        "sinut pian uudelleen. Eilen oli kaunis sää, joten menimme lasten kanssa kävelylle puistoon."
+    ),
+    "id": (
+        "Semua orang dilahirkan merdeka dan mempunyai martabat dan hak-hak yang sama. Mereka dikaruniai akal "
+        "dan hati nurani dan hendaknya bergaul satu sama lain dalam semangat persaudaraan. Setiap orang berhak "
+        "atas semua hak dan kebebasan yang tercantum di dalam pernyataan ini tanpa perkecualian apapun, seperti "
+        "ras, warna kulit, jenis kelamin, bahasa, agama, politik atau pandangan lain, asal-usul kebangsaan atau "
+        "kemasyarakatan, hak milik, kelahiran ataupun kedudukan lain. Para pihak sepakat bahwa perjanjian ini "
+        "tunduk pada hukum negara dan bahwa setiap pemberitahuan harus disampaikan secara tertulis dalam waktu "
+        "tiga puluh hari. Terima kasih atas pesanan Anda dan kami berharap dapat bertemu Anda lagi segera. "
+        "Kemarin cuacanya cerah, jadi kami berjalan-jalan di taman bersama anak-anak."
+    ),
+}
+
+CYRILLIC_SAMPLES = {
+    "ru": (
+        "Все люди рождаются свободными и равными в своем достоинстве и правах. Они наделены разумом и совестью "
+        "и должны поступать в отношении друг друга в духе братства. Каждый человек должен обладать всеми "
+        "правами и всеми свободами, провозглашенными настоящей Декларацией, без какого бы то ни было различия, "
+        "как-то в отношении расы, цвета кожи, пола, языка, религии, политических или иных убеждений, "
+        "национального или социального происхождения, имущественного, сословного или иного положения. Стороны "
+        "соглашаются, что настоящий договор регулируется законодательством страны и что любое уведомление "
+        "должно быть направлено в письменной форме в течение тридцати дней. Благодарим вас за заказ и "
+        "надеемся скоро увидеть вас снова. Вчера была хорошая погода, поэтому мы гуляли в парке с детьми."
+    ),
+    "uk": (
+        "Всі люди народжуються вільними і рівними у своїй гідності та правах. Вони наділені розумом і совістю і "
+        "повинні діяти у відношенні один до одного в дусі братерства. Кожна людина повинна мати всі права і всі "
+        "свободи, проголошені цією Декларацією, незалежно від раси, кольору шкіри, статі, мови, релігії, "
+        "політичних або інших переконань, національного чи соціального походження, майнового, станового або "
+        "іншого становища. Сторони погоджуються, що цей договір регулюється законодавством країни і що "
+        "будь-яке повідомлення має бути надіслане в письмовій формі протягом тридцяти днів. Дякуємо вам за "
+        "замовлення і сподіваємося незабаром побачити вас знову. Вчора була гарна погода, тому ми гуляли в "
+        "парку з дітьми."
+    ),
+}
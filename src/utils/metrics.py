@@ -1,88 +1,295 @@
+import os
+
+import numpy as np
+
+from models import Document
+from utils.keyword_matcher import KeywordMatcher
+from utils.tokenizer import encode_documents, joint_counts
+
+def _difference(value1, value2, name):
+    diff = abs(value1 - value2)
+    percent = (diff / max(value1, value2)) * 100 if max(value1, value2) > 0 else 0
+    return {f"doc1_{name}": value1, f"doc2_{name}": value2, "difference": diff, "percent_difference": round(percent, 2)}
+
 def word_count_difference(doc1, doc2):
     """
     Returns the absolute and percentage difference in word count between two documents.
     """
-    wc1 = len(doc1.split())
-    wc2 = len(doc2.split())
-    diff = abs(wc1 - wc2)
-    percent = (diff / max(wc1, wc2)) * 100 if max(wc1, wc2) > 0 else 0
-    return {"doc1_word_count": wc1, "doc2_word_count": wc2, "difference": diff, "percent_difference": round(percent, 2)}
+    wc1 = len(Document.for_text(doc1).words)
+    wc2 = len(Document.for_text(doc2).words)
+    return _difference(wc1, wc2, "word_count")
 
 def line_count_difference(doc1, doc2):
     """
     Returns the absolute and percentage difference in line count between two documents.
     """
-    lc1 = len(doc1.splitlines())
-    lc2 = len(doc2.splitlines())
-    diff = abs(lc1 - lc2)
-    percent = (diff / max(lc1, lc2)) * 100 if max(lc1, lc2) > 0 else 0
-    return {"doc1_line_count": lc1, "doc2_line_count": lc2, "difference": diff, "percent_difference": round(percent, 2)}
+    lc1 = len(Document.for_text(doc1).lines)
+    lc2 = len(Document.for_text(doc2).lines)
+    return _difference(lc1, lc2, "line_count")
 
 def char_count_difference(doc1, doc2):
     """
     Returns the absolute and percentage difference in character count between two documents.
     """
-    cc1 = len(doc1)
-    cc2 = len(doc2)
-    diff = abs(cc1 - cc2)
-    percent = (diff / max(cc1, cc2)) * 100 if max(cc1, cc2) > 0 else 0
-    return {"doc1_char_count": cc1, "doc2_char_count": cc2, "difference": diff, "percent_difference": round(percent, 2)}
+    cc1 = len(Document.for_text(doc1).content)
+    cc2 = len(Document.for_text(doc2).content)
+    return _difference(cc1, cc2, "char_count")
 
-def unique_word_ratio(doc):
+def unique_word_ratio(doc, approximate=False):
     """
     Returns the ratio of unique words to total words in a document.
+    With approximate=True the distinct count comes from a HyperLogLog sketch (about 0.8%
+    relative error) computed in bounded memory; see utils.sketches.
     """
-    words = doc.split()
-    if not words:
+    if approximate:
+        from utils.sketches import DocumentSketch
+        sketch = DocumentSketch.from_text(Document.for_text(doc).content, ngram_sizes=())
+        return round(min(sketch.words.count() / sketch.tokens, 1.0), 3) if sketch.tokens else 0.0
+    ids = Document.for_text(doc).word_ids
+    if not ids.size:
         return 0.0
-    unique = set(words)
-    return round(len(unique) / len(words), 3)
+    return round(np.unique(ids).size / ids.size, 3)
 
 def jaccard_similarity(doc1, doc2):
     """
     Returns the Jaccard similarity between two documents (set of words).
     """
-    set1 = set(doc1.lower().split())
-    set2 = set(doc2.lower().split())
-    intersection = set1 & set2
-    union = set1 | set2
-    return round(len(intersection) / len(union), 3) if union else 1.0
+    ids1, ids2 = encode_documents([Document.for_text(doc1), Document.for_text(doc2)])
+    set1, set2 = np.unique(ids1), np.unique(ids2)
+    intersection = np.intersect1d(set1, set2, assume_unique=True).size
+    union = set1.size + set2.size - intersection
+    return round(intersection / union, 3) if union else 1.0
 
 def cosine_similarity(doc1, doc2):
     """
     Returns the cosine similarity between two documents (bag-of-words).
     """
-    from collections import Counter
-    import math
-    words1 = doc1.lower().split()
-    words2 = doc2.lower().split()
-    counter1 = Counter(words1)
-    counter2 = Counter(words2)
-    all_words = set(counter1) | set(counter2)
-    v1 = [counter1.get(w, 0) for w in all_words]
-    v2 = [counter2.get(w, 0) for w in all_words]
-    dot = sum(a * b for a, b in zip(v1, v2))
-    norm1 = math.sqrt(sum(a * a for a in v1))
-    norm2 = math.sqrt(sum(b * b for b in v2))
-    if norm1 == 0 or norm2 == 0:
+    ids1, ids2 = encode_documents([Document.for_text(doc1), Document.for_text(doc2)])
+    if not ids1.size or not ids2.size:
         return 0.0
-    return round(dot / (norm1 * norm2), 3)
+    v1, v2 = (counts.astype(np.float64) for counts in joint_counts(ids1, ids2))
+    return round(float(v1 @ v2 / (np.sqrt(v1 @ v1) * np.sqrt(v2 @ v2))), 3)
 
 def keyword_coverage(doc, keywords):
     """
-    Returns the percentage of keywords present in the document.
+    Returns the percentage of keywords present in the document, matched as whole words
+    (multi-word keywords included) in a single pass.
+    """
+    keywords = sorted(set(kw.lower() for kw in keywords))
+    if not keywords:
+        return 0.0
+    found = KeywordMatcher.for_keywords(keywords).found(doc)
+    return round(100 * len(found) / len(keywords), 2)
+
+def _ngram_ids(arrays, n):
+    """
+    Map the n-grams of each ID array to compact IDs shared across the arrays.
+    Built up one position at a time: pairs of (previous compact ID, next token ID) are
+    packed into int64 and re-compacted with np.unique, so any n fits in 64 bits.
     """
-    doc_words = set(doc.lower().split())
-    keywords = set(kw.lower() for kw in keywords)
-    found = doc_words & keywords
-    return round(100 * len(found) / len(keywords), 2) if keywords else 0.0
+    grams = [ids.astype(np.int64) for ids in arrays]
+    for k in range(1, n):
+        keys = [(g[:-1] << 32) | ids[k:k + len(g) - 1].astype(np.int64) if len(g) > 1 else g[:0]
+                for g, ids in zip(grams, arrays)]
+        sizes = [len(key) for key in keys]
+        if not sum(sizes):
+            return keys
+        _, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        grams = np.split(inverse.astype(np.int64), np.cumsum(sizes)[:-1])
+    return grams
+
+def _count_matrix(arrays):
+    """
+    Documents x joint-vocabulary term count matrix.
+    """
+    lengths = [len(ids) for ids in arrays]
+    joint, inverse = np.unique(np.concatenate(arrays) if arrays else np.empty(0, np.int64), return_inverse=True)
+    rows = np.repeat(np.arange(len(arrays)), lengths)
+    counts = np.bincount(rows * len(joint) + inverse, minlength=len(arrays) * len(joint))
+    return counts.reshape(len(arrays), len(joint))
+
+def _jaccard_matrix(presence):
+    presence = presence.astype(np.float64)
+    intersection = presence @ presence.T
+    sizes = presence.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(union > 0, intersection / union, 1.0)
+
+class MetricEngine:
+    """
+    Computes comparison metrics for any number of documents from one shared token pass.
+
+    Each document is tokenized once (cached on models.Document) into interned term IDs;
+    all documents are then laid out in one documents x vocabulary count matrix and every
+    similarity is a matrix operation on it, so adding metrics or documents does not add
+    passes over the text.
+
+    Metric sets:
+    counts      word/line/char counts per document
+    uniqueness  unique word (case-sensitive) and unique term (lowercase) ratios
+    similarity  Jaccard and cosine over lowercase terms
+    ngrams      Jaccard overlap of word n-grams (see ngram_sizes)
+    weighted    BM25-style weighted overlap: each term is weighted by a saturated,
+                length-normalized term frequency (k1, b) times an IDF derived from its
+                frequency across the compared documents, and the overlap is the weighted
+                Jaccard (sum of minima over sum of maxima)
+
+    With approximate=True every document is reduced to a utils.sketches.DocumentSketch in one
+    streaming pass of bounded memory instead: counts are exact, unique ratios use HyperLogLog,
+    Jaccard and n-gram overlap use MinHash, and cosine uses Count-Min inner products. The
+    error bounds are listed in utils.sketches. The weighted set is not available in this mode.
+    """
+
+    METRIC_SETS = ("counts", "uniqueness", "similarity", "ngrams", "weighted")
+    APPROXIMATE_METRIC_SETS = ("counts", "uniqueness", "similarity", "ngrams")
+
+    def __init__(self, metric_sets=None, ngram_sizes=(2, 3), k1=1.5, b=0.75, approximate=False):
+        supported = self.APPROXIMATE_METRIC_SETS if approximate else self.METRIC_SETS
+        metric_sets = list(metric_sets or supported)
+        unknown = set(metric_sets) - set(supported)
+        if unknown:
+            mode = "approximate " if approximate else ""
+            raise ValueError(f"Unknown {mode}metric sets: {', '.join(sorted(unknown))}")
+        self.approximate = approximate
+        self.metric_sets = metric_sets
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.k1 = k1
+        self.b = b
+
+    def compute(self, documents):
+        """
+        Compute the selected metrics for a list of texts or Documents.
+
+        Returns:
+        dict: {"documents": [per-document metrics], "pairwise": {metric: N x N nested list}}
+        """
+        if self.approximate:
+            return self._compute_sketched(documents)
+        docs = [Document.for_text(doc) for doc in documents]
+        per_document = [{} for _ in docs]
+        pairwise = {}
+        if "counts" in self.metric_sets:
+            for doc, result in zip(docs, per_document):
+                result.update(word_count=len(doc.words), line_count=len(doc.lines), char_count=len(doc.content))
+        if "uniqueness" in self.metric_sets:
+            for doc, result in zip(docs, per_document):
+                word_ids, term_ids = doc.word_ids, doc.term_ids
+                result["unique_word_ratio"] = round(np.unique(word_ids).size / word_ids.size, 3) if word_ids.size else 0.0
+                result["unique_term_ratio"] = round(np.unique(term_ids).size / term_ids.size, 3) if term_ids.size else 0.0
+        needs_terms = {"similarity", "ngrams", "weighted"} & set(self.metric_sets)
+        if needs_terms and docs:
+            arrays = encode_documents(docs)
+            counts = _count_matrix(arrays)
+            if "similarity" in self.metric_sets:
+                pairwise["jaccard_similarity"] = _jaccard_matrix(counts > 0)
+                pairwise["cosine_similarity"] = self._cosine_matrix(counts)
+            if "ngrams" in self.metric_sets:
+                for n in self.ngram_sizes:
+                    pairwise[f"ngram_overlap_{n}"] = _jaccard_matrix(_count_matrix(_ngram_ids(arrays, n)) > 0)
+            if "weighted" in self.metric_sets:
+                pairwise["bm25_overlap"] = self._bm25_overlap(counts)
+        return {
+            "documents": per_document,
+            "pairwise": {name: np.round(matrix, 3).tolist() for name, matrix in pairwise.items()}
+        }
+
+    def _compute_sketched(self, documents):
+        from utils.sketches import DocumentSketch
+        ngram_sizes = self.ngram_sizes if "ngrams" in self.metric_sets else ()
+        sketches = [DocumentSketch.from_text(Document.for_text(doc).content, ngram_sizes=ngram_sizes)
+                    for doc in documents]
+        per_document = [{} for _ in sketches]
+        for sketch, result in zip(sketches, per_document):
+            if "counts" in self.metric_sets:
+                result.update(word_count=sketch.tokens, line_count=sketch.lines, char_count=sketch.chars)
+            if "uniqueness" in self.metric_sets:
+                for key, hll in (("unique_word_ratio", sketch.words), ("unique_term_ratio", sketch.terms)):
+                    result[key] = round(min(hll.count() / sketch.tokens, 1.0), 3) if sketch.tokens else 0.0
+
+        def matrix(similarity):
+            size = len(sketches)
+            values = np.ones((size, size))
+            for i in range(size):
+                for j in range(i + 1, size):
+                    values[i, j] = values[j, i] = similarity(sketches[i], sketches[j])
+            return values
+
+        pairwise = {}
+        if "similarity" in self.metric_sets:
+            pairwise["jaccard_similarity"] = matrix(lambda a, b: a.term_minhash.jaccard(b.term_minhash))
+            pairwise["cosine_similarity"] = matrix(lambda a, b: a.cosine(b))
+        for n in ngram_sizes:
+            pairwise[f"ngram_overlap_{n}"] = matrix(lambda a, b: a.ngram_minhash[n].jaccard(b.ngram_minhash[n]))
+        return {
+            "documents": per_document,
+            "pairwise": {name: np.round(values, 3).tolist() for name, values in pairwise.items()}
+        }
+
+    def compare(self, doc1, doc2, keywords=None):
+        """
+        Flat metric dict for a pair of documents, as stored with comparison results.
+        """
+        result = self.compute([doc1, doc2])
+        first, second = result["documents"]
+        metrics = {name: matrix[0][1] for name, matrix in result["pairwise"].items()}
+        if "counts" in self.metric_sets:
+            metrics["word_count_difference"] = _difference(first["word_count"], second["word_count"], "word_count")
+            metrics["line_count_difference"] = _difference(first["line_count"], second["line_count"], "line_count")
+            metrics["char_count_difference"] = _difference(first["char_count"], second["char_count"], "char_count")
+        if "uniqueness" in self.metric_sets:
+            for key in ("unique_word_ratio", "unique_term_ratio"):
+                metrics[f"{key}_doc1"], metrics[f"{key}_doc2"] = first[key], second[key]
+        if keywords:
+            metrics["keyword_coverage_doc1"] = keyword_coverage(doc1, keywords)
+            metrics["keyword_coverage_doc2"] = keyword_coverage(doc2, keywords)
+        if self.approximate:
+            metrics["approximate"] = True
+        return metrics
+
+    @staticmethod
+    def _cosine_matrix(counts):
+        vectors = counts.astype(np.float64)
+        dot = vectors @ vectors.T
+        norms = np.sqrt(np.diag(dot))
+        denominator = norms[:, None] * norms[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominator > 0, dot / denominator, 0.0)
+
+    def _bm25_overlap(self, counts):
+        tf = counts.astype(np.float64)
+        lengths = tf.sum(axis=1, keepdims=True)
+        average = lengths.mean() or 1.0
+        saturated = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths / average))
+        collection = tf.sum(axis=0)
+        total = collection.sum()
+        idf = np.log1p((total - collection + 0.5) / (collection + 0.5))
+        weights = saturated * idf
+        size = len(weights)
+        overlap = np.ones((size, size))
+        for i in range(size):
+            minima = np.minimum(weights[i], weights).sum(axis=1)
+            maxima = np.maximum(weights[i], weights).sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                overlap[i] = np.where(maxima > 0, minima / maxima, 1.0)
+        return overlap
+
+DEFAULT_ENGINE = MetricEngine()
+APPROXIMATE_ENGINE = MetricEngine(approximate=True)
+# Combined size (characters) above which get_all_metrics switches to sketches.
+SKETCH_THRESHOLD_CHARS = int(os.getenv('SKETCH_THRESHOLD_CHARS', '8000000'))
 
-def get_all_metrics(doc1, doc2, keywords=None):
+def get_all_metrics(doc1, doc2, keywords=None, metric_sets=None, approximate=None):
     """
     Returns a dictionary of all comparison metrics between two documents.
+    Pass metric_sets (see MetricEngine.METRIC_SETS) to compute only some of them. Inputs
+    larger than SKETCH_THRESHOLD_CHARS combined use the approximate (sketch) mode unless
+    approximate is given explicitly; the result then carries "approximate": True.
     """
-    metrics = {}
-    
-    metrics["jaccard_similarity"] = jaccard_similarity(doc1, doc2)
-    metrics["cosine_similarity"] = cosine_similarity(doc1, doc2)
-    return metrics
+    if approximate is None:
+        approximate = len(doc1 or "") + len(doc2 or "") > SKETCH_THRESHOLD_CHARS
+    if metric_sets:
+        engine = MetricEngine(metric_sets, approximate=approximate)
+    else:
+        engine = APPROXIMATE_ENGINE if approximate else DEFAULT_ENGINE
+    return engine.compare(doc1, doc2, keywords)
@@ -0,0 +1,238 @@
+"""
+On-demand request profiling.
+
+A request is profiled only when PROFILING_TOKEN is configured, the request carries a
+matching X-Profile-Token header, and profiling is asked for with `?profile=sample|cprofile`
+or an `X-Profile` header. Everything else pays for one header lookup.
+
+"sample" runs a stack sampler on a background thread and produces collapsed stacks (one
+"frame;frame;frame count" line per stack, the input format of flamegraph.pl and
+speedscope). "cprofile" runs the deterministic profiler and stores the pstats report.
+Both also record the top allocations seen by tracemalloc while the request ran. Reports
+are stored on disk under a random ID returned in the X-Profile-Id response header.
+"""
+import cProfile
+import functools
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+PROFILE_MODES = ("sample", "cprofile")
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread every `interval` seconds.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def top_functions(self, limit=25):
+        """
+        Leaf (self-time) sample counts per function, hottest first.
+        """
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [{"function": name, "samples": count} for name, count in leaves.most_common(limit)]
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+        return snapshot
+
+
+class RequestProfiler:
+    """
+    Context manager profiling the current thread in the given mode.
+
+    tracemalloc is process-wide, so allocations of concurrent requests can show up in
+    the allocation report.
+    """
+
+    def __init__(self, mode="sample", interval=0.005):
+        self.mode = mode
+        self.interval = interval
+        self.sampler = None
+        self.profiler = None
+        self.snapshot = None
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        _start_tracemalloc()
+        if self.mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Only one deterministic profiler can run at a time; sample instead.
+                self.profiler = None
+                self.mode = "sample"
+        if self.mode == "sample":
+            self.sampler = StackSampler(threading.get_ident(), self.interval)
+            self.sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._started
+        if self.profiler:
+            self.profiler.disable()
+        if self.sampler:
+            self.sampler.stop()
+        self.snapshot = _stop_tracemalloc()
+        return False
+
+    def allocation_report(self, limit=25):
+        if self.snapshot is None:
+            return ""
+        lines = [f"Top {limit} allocation sites (size, count):"]
+        for stat in self.snapshot.statistics("lineno")[:limit]:
+            lines.append(str(stat))
+        return "\n".join(lines) + "\n"
+
+    def reports(self):
+        """
+        Returns:
+        tuple: ({report file name: text}, summary dict)
+        """
+        summary = {"mode": self.mode, "elapsed_s": round(self.elapsed, 4)}
+        reports = {"allocations.txt": self.allocation_report()}
+        if self.sampler:
+            summary.update(samples=self.sampler.samples, interval_s=self.interval,
+                           top_functions=self.sampler.top_functions())
+            reports["collapsed.txt"] = self.sampler.collapsed()
+        if self.profiler:
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            reports["pstats.txt"] = out.getvalue()
+        return reports, summary
+
+
+class ProfileStore:
+    """
+    Stores profile reports in `root/<id>/`.
+    """
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or os.getenv('PROFILE_DIR', 'profiles'))
+
+    def save(self, reports, summary):
+        profile_id = uuid.uuid4().hex
+        directory = os.path.join(self.root, profile_id)
+        os.makedirs(directory, exist_ok=True)
+        for name, text in reports.items():
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+                f.write(text)
+        with open(os.path.join(directory, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(summary, id=profile_id, reports=sorted(reports)), f, indent=2)
+        return profile_id
+
+    def path(self, profile_id, name="summary.json"):
+        """
+        Path of a stored report, or None if the ID or report name is unknown.
+        """
+        if not _PROFILE_ID.match(profile_id or "") or os.sep in name or name.startswith("."):
+            return None
+        path = os.path.join(self.root, profile_id, name)
+        return path if os.path.isfile(path) else None
+
+
+def requested_profile_mode(request):
+    """
+    Return the profiling mode asked for by an authorized request, or None.
+    """
+    token = os.getenv('PROFILING_TOKEN')
+    if not token:
+        return None
+    mode = request.args.get('profile') or request.headers.get('X-Profile')
+    if not mode:
+        return None
+    if not hmac.compare_digest(request.headers.get('X-Profile-Token', ''), token):
+        return None
+    mode = mode.lower()
+    return mode if mode in PROFILE_MODES else "sample"
+
+
+def is_profile_admin(request):
+    token = os.getenv('PROFILING_TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get('X-Profile-Token', ''), token)
+
+
+def profiled(store):
+    """
+    Flask view decorator: profile the view when requested_profile_mode allows it and
+    return the report ID in the X-Profile-Id header.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import make_response, request
+            mode = requested_profile_mode(request)
+            if not mode:
+                return view(*args, **kwargs)
+            with RequestProfiler(mode) as profiler:
+                response = make_response(view(*args, **kwargs))
+            reports, summary = profiler.reports()
+            summary.update(endpoint=request.endpoint, path=request.full_path, status=response.status_code)
+            response.headers['X-Profile-Id'] = store.save(reports, summary)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,425 @@
+"""
+Bounded-memory statistics for very large documents and corpora.
+
+Text is processed in chunks of CHUNK_CHARS characters cut at whitespace. Each chunk is
+tokenized and hashed with NumPy over its UTF-8 bytes, so no per-token Python objects are
+created. Memory is the chunk plus the fixed-size sketches, however large the input is.
+
+Tokens are runs of non-whitespace bytes, where whitespace is the ASCII set str.split() uses
+(space, \\t \\n \\v \\f \\r and \\x1c-\\x1f). Unicode-only spaces such as NBSP do not split tokens.
+
+Sketches and their error:
+HyperLogLog(precision p)   distinct counts; relative standard error 1.04 / sqrt(2**p)
+                           (0.81% at the default p=14, 16 KB of registers)
+CountMinSketch(w, d)       frequencies; never underestimates, overestimates by at most
+                           e/w * total count with probability 1 - exp(-d)
+HeavyHitters(k)            top-k terms tracked over a Count-Min sketch, same error
+MinHash(num_perm)          Jaccard similarity; standard error sqrt(J(1-J) / num_perm),
+                           at most 0.031 at the default 256 permutations
+"""
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+CHUNK_CHARS = int(os.getenv('SKETCH_CHUNK_CHARS', str(1 << 20)))
+
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+_SEPARATOR = np.zeros(256, dtype=bool)
+_SEPARATOR[0] = True
+_LINE_BOUNDARIES = ("\n", "\r", "\v", "\f", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+_SPLIT_POINT = re.compile(r"[ \t\n\v\f\r\x1c-\x1f]")
+_MULTIPLIER = np.uint64(0x100000001B3)
+_NGRAM_MIX = np.uint64(0x9E3779B97F4A7C15)
+_powers = np.ones(1, dtype=np.uint64)
+_powers_lock = threading.Lock()
+
+
+def splitmix64(values):
+    """
+    Finalize/mix uint64 values (the SplitMix64 output function), vectorized.
+    """
+    z = values + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _power_table(length):
+    global _powers
+    with _powers_lock:
+        if len(_powers) < length:
+            size = max(length, 2 * len(_powers))
+            table = np.full(size, _MULTIPLIER, dtype=np.uint64)
+            table[0] = 1
+            _powers = np.cumprod(table, dtype=np.uint64)
+        return _powers
+
+
+def _hash_spans(data, separator):
+    """
+    Hash every run of non-separator bytes in a uint8 array.
+
+    Returns:
+    tuple: (hashes, starts, ends) as arrays, one entry per token
+    """
+    empty = np.empty(0, dtype=np.uint64)
+    if not data.size:
+        return empty, empty.astype(np.intp), empty.astype(np.intp)
+    inside = ~separator[data]
+    edges = np.diff(np.concatenate(([False], inside, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not starts.size:
+        return empty, starts, ends
+    lengths = ends - starts
+    token_bytes = data[inside].astype(np.uint64) + np.uint64(1)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    positions = np.arange(token_bytes.size) - np.repeat(offsets, lengths)
+    weighted = token_bytes * _power_table(int(lengths.max()))[positions]
+    sums = np.add.reduceat(weighted, offsets)
+    return splitmix64(sums ^ lengths.astype(np.uint64)), starts, ends
+
+
+def iter_chunks(text, chunk_chars=None):
+    """
+    Yield pieces of text of about chunk_chars characters, cut at whitespace.
+    """
+    chunk_chars = chunk_chars or CHUNK_CHARS
+    start, size = 0, len(text)
+    while start < size:
+        end = start + chunk_chars
+        if end < size:
+            match = _SPLIT_POINT.search(text, end)
+            end = match.start() if match else size
+        yield text[start:end]
+        start = end
+
+
+def count_lines(text):
+    """
+    len(text.splitlines()) without building the list: every boundary splitlines() breaks
+    on (\\r\\n counted once), plus a final line without a trailing boundary.
+    """
+    if not text:
+        return 0
+    boundaries = sum(text.count(c) for c in _LINE_BOUNDARIES) - text.count("\r\n")
+    return boundaries + (0 if text.endswith(_LINE_BOUNDARIES) else 1)
+
+
+def token_hashes(chunk):
+    """
+    Hashes, start and end byte offsets of the whitespace-separated tokens in one chunk,
+    plus the chunk's UTF-8 bytes (to decode tokens when needed).
+    """
+    data = np.frombuffer(chunk.encode("utf-8"), dtype=np.uint8)
+    hashes, starts, ends = _hash_spans(data, _WHITESPACE)
+    return hashes, starts, ends, data
+
+
+def hash_terms(terms):
+    """
+    Hashes of whole terms (which may contain spaces). A single-word term hashes to the same
+    value as that word found by token_hashes.
+    """
+    terms = [t for t in terms]
+    if not terms:
+        return np.empty(0, dtype=np.uint64)
+    data = np.frombuffer("\x00".join(terms).encode("utf-8"), dtype=np.uint8)
+    hashes, starts, _ = _hash_spans(data, _SEPARATOR)
+    if len(hashes) == len(terms):
+        return hashes
+    # Empty terms produce no span; give them the hash of the empty byte string.
+    full = np.full(len(terms), splitmix64(np.zeros(1, dtype=np.uint64))[0], dtype=np.uint64)
+    nonempty = np.flatnonzero([bool(t) for t in terms])
+    full[nonempty] = hashes
+    return full
+
+
+def ngram_hashes(hashes, n):
+    """
+    Hashes of consecutive n-token windows.
+    """
+    grams = hashes
+    for k in range(1, n):
+        if grams.size < 2:
+            return grams[:0]
+        grams = splitmix64(grams[:-1] * _NGRAM_MIX ^ hashes[k:k + grams.size - 1])
+    return grams
+
+
+class HyperLogLog:
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, hashes):
+        if not len(hashes):
+            return
+        tail_bits = 64 - self.precision
+        index = (hashes >> np.uint64(tail_bits)).astype(np.intp)
+        tail = (hashes & np.uint64((1 << tail_bits) - 1)).astype(np.float64)
+        # frexp gives the exact bit length for integers below 2**53.
+        bit_length = np.where(tail > 0, np.frexp(tail)[1], 0)
+        rank = (tail_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    def __init__(self, width=1 << 14, depth=4, seed=0x5EED):
+        self.width = width
+        self.depth = depth
+        self.seeds = splitmix64(np.arange(depth, dtype=np.uint64) + np.uint64(seed))
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def epsilon(self):
+        """
+        Overestimate bound as a fraction of the total count.
+        """
+        return math.e / self.width
+
+    @property
+    def confidence(self):
+        return 1 - math.exp(-self.depth)
+
+    def _indexes(self, hashes, row):
+        return (splitmix64(hashes ^ self.seeds[row]) % np.uint64(self.width)).astype(np.intp)
+
+    def update(self, hashes, counts=None):
+        if not len(hashes):
+            return
+        counts = np.ones(len(hashes), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(self._indexes(hashes, row), weights=counts,
+                                           minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+
+    def estimate(self, hashes):
+        if not len(hashes):
+            return np.empty(0, dtype=np.int64)
+        return np.min([self.table[row][self._indexes(hashes, row)] for row in range(self.depth)], axis=0)
+
+    def inner_product(self, other):
+        """
+        Estimated dot product of the two frequency vectors (an upper bound, like estimate).
+        """
+        return int(np.min(np.einsum("ij,ij->i", self.table, other.table)))
+
+    def merge(self, other):
+        self.table += other.table
+        self.total += other.total
+        return self
+
+
+class HeavyHitters:
+    """
+    Approximate top-k terms: a Count-Min sketch holds all frequencies, and only the k terms
+    with the highest estimates are kept by name.
+    """
+
+    def __init__(self, k=50, width=1 << 14, depth=4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.terms = {}
+
+    def update(self, hashes, counts, term_for):
+        """
+        Add counts for distinct hashes; term_for(i) returns the term of hashes[i] and is
+        only called for terms entering the top-k.
+        """
+        if not len(hashes):
+            return
+        self.sketch.update(hashes, counts)
+        estimates = self.sketch.estimate(hashes)
+        if len(self.terms) >= self.k:
+            floor = min(self.sketch.estimate(np.fromiter(self.terms, dtype=np.uint64, count=len(self.terms))))
+            candidates = np.flatnonzero(estimates > floor)
+        else:
+            candidates = np.arange(len(hashes))
+        if candidates.size > self.k:
+            candidates = candidates[np.argpartition(-estimates[candidates], self.k - 1)[:self.k]]
+        for i in candidates.tolist():
+            key = int(hashes[i])
+            if key not in self.terms:
+                self.terms[key] = term_for(i)
+        if len(self.terms) > self.k:
+            keys = np.fromiter(self.terms, dtype=np.uint64, count=len(self.terms))
+            keep = set(keys[np.argsort(-self.sketch.estimate(keys), kind="stable")[:self.k]].tolist())
+            self.terms = {key: term for key, term in self.terms.items() if key in keep}
+
+    def top(self, limit=None):
+        """
+        [(term, estimated count)] sorted by count, highest first.
+        """
+        if not self.terms:
+            return []
+        keys = np.fromiter(self.terms, dtype=np.uint64, count=len(self.terms))
+        estimates = self.sketch.estimate(keys).tolist()
+        ranked = sorted(zip((self.terms[int(key)] for key in keys), estimates), key=lambda item: -item[1])
+        return ranked[:limit] if limit else ranked
+
+
+class MinHash:
+    def __init__(self, num_perm=256, seed=0x5EED):
+        self.seeds = splitmix64(np.arange(num_perm, dtype=np.uint64) * np.uint64(0x9E37) + np.uint64(seed))
+        self.signature = np.full(num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+    @property
+    def standard_error(self):
+        """
+        Upper bound on the standard error of jaccard().
+        """
+        return 0.5 / math.sqrt(len(self.signature))
+
+    def update(self, hashes, max_cells=1 << 18):
+        """
+        Fold token hashes into the signature. The hash x permutation matrix is evaluated in
+        tiles of at most max_cells entries, so temporaries stay a few MB however many distinct
+        tokens a chunk has.
+        """
+        values = np.unique(hashes)
+        if not values.size:
+            return
+        block = max(1, min(len(self.seeds), max_cells // values.size))
+        rows = max(1, max_cells // block)
+        for start in range(0, len(self.seeds), block):
+            seeds = self.seeds[None, start:start + block]
+            signature = self.signature[start:start + block]
+            for row in range(0, values.size, rows):
+                mins = splitmix64(values[row:row + rows, None] ^ seeds).min(axis=0)
+                np.minimum(signature, mins, out=signature)
+
+    def merge(self, other):
+        np.minimum(self.signature, other.signature, out=self.signature)
+        return self
+
+    def jaccard(self, other):
+        return float(np.mean(self.signature == other.signature))
+
+
+class DocumentSketch:
+    """
+    One streaming pass over a document's text collecting everything MetricEngine's
+    approximate mode needs.
+    """
+
+    def __init__(self, ngram_sizes=(2, 3), num_perm=256, precision=14):
+        self.tokens = 0
+        self.lines = 0
+        self.chars = 0
+        self.words = HyperLogLog(precision)
+        self.terms = HyperLogLog(precision)
+        self.term_minhash = MinHash(num_perm)
+        self.ngram_minhash = {n: MinHash(num_perm) for n in ngram_sizes}
+        self.term_counts = CountMinSketch()
+
+    @classmethod
+    def from_text(cls, text, **kwargs):
+        sketch = cls(**kwargs)
+        sketch.add_text(text or "")
+        return sketch
+
+    def add_text(self, text):
+        self.chars += len(text)
+        self.lines += count_lines(text)
+        for chunk in iter_chunks(text):
+            word_hashes = token_hashes(chunk)[0]
+            self.words.update(word_hashes)
+            hashes = token_hashes(chunk.lower())[0]
+            self.tokens += len(hashes)
+            self.terms.update(hashes)
+            self.term_minhash.update(hashes)
+            self.term_counts.update(hashes)
+            # n-grams spanning a chunk boundary are skipped (a few per megabyte).
+            for n, minhash in self.ngram_minhash.items():
+                minhash.update(ngram_hashes(hashes, n))
+
+    def cosine(self, other):
+        dot = self.term_counts.inner_product(other.term_counts)
+        norm = math.sqrt(self.term_counts.inner_product(self.term_counts) *
+                         other.term_counts.inner_product(other.term_counts))
+        return min(dot / norm, 1.0) if norm else 0.0
+
+
+class CorpusStatistics:
+    """
+    Corpus-wide vocabulary and keyword statistics in constant memory: distinct terms via
+    HyperLogLog and the top keywords via HeavyHitters over lowercase tokens.
+    """
+
+    def __init__(self, top_k=50, stopwords=(), precision=14, width=1 << 14, depth=4):
+        self.documents = 0
+        self.tokens = 0
+        self.vocabulary = HyperLogLog(precision)
+        self.keywords = HeavyHitters(top_k, width, depth)
+        self.stopword_hashes = np.unique(hash_terms([w.lower() for w in stopwords]))
+        self._lock = threading.Lock()
+
+    def add_text(self, text):
+        with self._lock:
+            self.documents += 1
+            for chunk in iter_chunks(text or ""):
+                hashes, starts, ends, data = token_hashes(chunk.lower())
+                self.tokens += len(hashes)
+                self.vocabulary.update(hashes)
+                distinct, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+                if self.stopword_hashes.size:
+                    keep = ~np.isin(distinct, self.stopword_hashes)
+                    distinct, first, counts = distinct[keep], first[keep], counts[keep]
+                self.keywords.update(
+                    distinct, counts,
+                    lambda i: data[starts[first[i]]:ends[first[i]]].tobytes().decode("utf-8", "replace")
+                )
+
+    def add_terms(self, terms):
+        """
+        Count pre-extracted terms or phrases (e.g. key phrases from the NLP service).
+        """
+        terms = [t.lower() for t in terms]
+        with self._lock:
+            self.documents += 1
+            self.tokens += len(terms)
+            if not terms:
+                return
+            hashes = hash_terms(terms)
+            self.vocabulary.update(hashes)
+            distinct, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+            if self.stopword_hashes.size:
+                keep = ~np.isin(distinct, self.stopword_hashes)
+                distinct, first, counts = distinct[keep], first[keep], counts[keep]
+            self.keywords.update(distinct, counts, lambda i: terms[first[i]])
+
+    def summary(self, top=20):
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "tokens": self.tokens,
+                "distinct_terms_estimate": self.vocabulary.count(),
+                "distinct_terms_relative_error": round(self.vocabulary.relative_error, 4),
+                "top_keywords": self.keywords.top(top),
+                "keyword_count_overestimate_bound": int(self.keywords.sketch.epsilon * self.keywords.sketch.total),
+            }
@@ -0,0 +1,143 @@
+"""
+Shared tokenizer: documents become NumPy arrays of interned term IDs.
+
+Tokens are whitespace-separated words, exactly as str.split() produces them, so metrics
+computed on IDs match the string-based versions. The vocabulary is process-wide so IDs from
+different documents are comparable; when it grows past VOCABULARY_MAX_TERMS it starts over
+and bumps its generation, and arrays from an older generation are re-encoded on next use.
+"""
+import os
+import string
+import threading
+
+import numpy as np
+
+
+class StaleVocabularyError(ValueError):
+    """Raised when IDs from an older vocabulary generation are decoded after a reset."""
+
+
+class Vocabulary:
+    def __init__(self, max_terms=None):
+        self.max_terms = int(max_terms or os.getenv('VOCABULARY_MAX_TERMS', '1000000'))
+        self.generation = 0
+        self._ids = {}
+        self._terms = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _snapshot(self):
+        # encode() replaces both tables on a reset rather than clearing them, so references
+        # taken together under the lock stay consistent afterwards.
+        with self._lock:
+            return self._ids, self._terms, self.generation
+
+    def encode(self, tokens):
+        """
+        Map tokens to IDs, adding unseen ones.
+
+        Returns:
+        tuple: (int32 array of IDs, vocabulary generation the IDs belong to)
+        """
+        with self._lock:
+            if len(self._terms) >= self.max_terms:
+                self._ids = {}
+                self._terms = []
+                self.generation += 1
+            get = self._ids.get
+            ids = np.fromiter((get(t, -1) for t in tokens), dtype=np.int32, count=len(tokens))
+            missing = np.flatnonzero(ids < 0)
+            if missing.size:
+                table, terms = self._ids, self._terms
+                for index in missing.tolist():
+                    token = tokens[index]
+                    term_id = table.get(token)
+                    if term_id is None:
+                        term_id = table[token] = len(terms)
+                        terms.append(token)
+                    ids[index] = term_id
+            return ids, self.generation
+
+    def lookup(self, tokens):
+        """
+        IDs of known tokens, -1 for unknown ones; never grows the vocabulary.
+
+        Returns:
+        tuple: (int32 array of IDs, vocabulary generation the IDs belong to)
+        """
+        table, _, generation = self._snapshot()
+        get = table.get
+        return np.fromiter((get(t, -1) for t in tokens), dtype=np.int32, count=len(tokens)), generation
+
+    def terms(self, ids, generation=None):
+        """
+        Terms for an ID array. Pass the generation returned with the IDs: if the vocabulary
+        has been reset since, StaleVocabularyError is raised instead of returning wrong terms.
+        """
+        _, terms, current = self._snapshot()
+        if generation is not None and generation != current:
+            raise StaleVocabularyError(f"IDs are from vocabulary generation {generation}, now {current}")
+        try:
+            return [terms[i] for i in np.asarray(ids).tolist()]
+        except IndexError:
+            raise StaleVocabularyError("IDs are not from the current vocabulary generation") from None
+
+
+VOCABULARY = Vocabulary()
+
+
+def encode_documents(documents, attr="term_ids"):
+    """
+    Return the `attr` ID arrays of several Documents from one vocabulary generation, so they
+    can be compared with each other. Falls back to a private vocabulary if the shared one keeps
+    being reset underneath (only when documents are larger than VOCABULARY_MAX_TERMS).
+    """
+    for _ in range(3):
+        generation = VOCABULARY.generation
+        arrays = [getattr(doc, attr) for doc in documents]
+        if VOCABULARY.generation == generation:
+            return arrays
+    private = Vocabulary(max_terms=2 ** 62)
+    tokens_attr = "lower_words" if attr == "term_ids" else "words"
+    return [private.encode(getattr(doc, tokens_attr))[0] for doc in documents]
+
+
+def joint_counts(ids1, ids2):
+    """
+    Term counts of two ID arrays over their joint vocabulary.
+
+    Returns:
+    tuple: (counts1, counts2) aligned int64 arrays
+    """
+    joint, inverse = np.unique(np.concatenate([ids1, ids2]), return_inverse=True)
+    counts1 = np.bincount(inverse[:len(ids1)], minlength=len(joint))
+    counts2 = np.bincount(inverse[len(ids1):], minlength=len(joint))
+    return counts1, counts2
+
+
+def term_frequencies(ids, vocabulary=None, generation=None):
+    """
+    {term: count} for an ID array; generation is checked as in Vocabulary.terms.
+    """
+    vocabulary = VOCABULARY if vocabulary is None else vocabulary
+    unique, counts = np.unique(ids, return_counts=True)
+    return dict(zip(vocabulary.terms(unique, generation), counts.tolist()))
+
+
+def word_frequencies(ids, stopwords=(), vocabulary=None, generation=None):
+    """
+    Word-cloud frequencies for an ID array: terms with surrounding punctuation and a
+    trailing "'s" removed, dropping stopwords and single characters. Works per distinct
+    term, so the cost does not grow with repeated words.
+    """
+    frequencies = {}
+    for term, count in term_frequencies(ids, vocabulary, generation).items():
+        word = term.strip(string.punctuation + "\u201c\u201d\u2018\u2019")
+        if word.endswith("'s"):
+            word = word[:-2]
+        if len(word) < 2 or word in stopwords:
+            continue
+        frequencies[word] = frequencies.get(word, 0) + count
+    return frequencies
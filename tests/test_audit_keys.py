@@ -0,0 +1,64 @@
+import datetime
+import os
+import sys
+import unittest
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.azure_services import AzureTableAuditService
+
+
+class FakeTableClient:
+    def __init__(self, entities):
+        self.rows = {(e["PartitionKey"], e["RowKey"]): dict(e) for e in entities}
+        self.transactions = []
+
+    def list_entities(self, **kwargs):
+        return [dict(e) for e in self.rows.values()]
+
+    def submit_transaction(self, operations):
+        self.transactions.append(operations)
+        assert len(operations) <= AzureTableAuditService.MAX_BATCH_SIZE
+        assert len({entity["PartitionKey"] for _, entity in operations}) == 1
+        for kind, entity in operations:
+            key = (entity["PartitionKey"], entity["RowKey"])
+            if kind == "delete":
+                del self.rows[key]
+            else:
+                self.rows[key] = dict(entity)
+
+
+def service(entities):
+    audit = AzureTableAuditService.__new__(AzureTableAuditService)
+    audit.table_client = FakeTableClient(entities)
+    return audit
+
+
+class MigrateLegacyRowKeysTest(unittest.TestCase):
+    def legacy(self, user, when):
+        return {"PartitionKey": user, "RowKey": str(uuid.uuid4()), "Action": "compare", "Timestamp": when.isoformat()}
+
+    def test_legacy_rows_sort_with_new_rows(self):
+        old = datetime.datetime(2024, 1, 1, 12, 0)
+        legacy = [self.legacy("alice", old + datetime.timedelta(minutes=i)) for i in range(120)]
+        new = AzureTableAuditService.build_entity("alice", "compare", "a", "b", "")
+        audit = service(legacy + [new, self.legacy("bob", old)])
+        self.assertEqual(audit.migrate_legacy_row_keys(), 121)
+        alice = sorted(key for user, key in audit.table_client.rows if user == "alice")
+        self.assertEqual(len(alice), 121)
+        self.assertTrue(all(AzureTableAuditService.is_time_ordered_key(key) for key in alice))
+        self.assertEqual(alice[0], new["RowKey"])
+        times = [audit.table_client.rows[("alice", key)]["Timestamp"] for key in alice[1:]]
+        self.assertEqual(times, sorted(times, reverse=True))
+        self.assertEqual(audit.migrate_legacy_row_keys(), 0)
+
+    def test_new_keys_are_deterministic(self):
+        entity = self.legacy("alice", datetime.datetime(2024, 1, 1))
+        first = AzureTableAuditService.time_ordered_entity(entity)
+        self.assertEqual(first, AzureTableAuditService.time_ordered_entity(entity))
+        self.assertEqual(first["RowKey"][:19], AzureTableAuditService.reverse_timestamp(datetime.datetime(2024, 1, 1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services import audit_writer
+from services.audit_writer import AuditWriter
+
+
+class FakeAuditService:
+    def __init__(self):
+        self.down = False
+        self.attempts = 0
+        self.rows = []
+
+    def build_entity(self, user_id, action, doc1_name, doc2_name, result_summary, status):
+        return {"user": user_id, "action": action}
+
+    def write_entities(self, entities):
+        self.attempts += 1
+        if self.down:
+            raise IOError("table storage unavailable")
+        self.rows.extend(entities)
+
+
+class SpoolReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.service = FakeAuditService()
+        self.writer = AuditWriter(self.service, batch_size=1000, flush_interval=60,
+                                  spool_path=os.path.join(self.directory.name, "spool.jsonl"))
+        patches = [mock.patch.object(audit_writer, "log_error"), mock.patch.object(audit_writer, "log_info")]
+        self.log_error, self.log_info = [p.start() for p in patches]
+        for p in patches:
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.service.down = False
+        self.writer.close()
+        self.directory.cleanup()
+
+    def spooled_rows(self):
+        if not os.path.exists(self.writer.spool_path):
+            return []
+        with open(self.writer.spool_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def log(self, count):
+        for i in range(count):
+            self.writer.log_audit(f"user{i}", "compare", "a", "b", "")
+
+    def test_outage_backs_off_logs_once_and_recovers(self):
+        self.service.down = True
+        self.log(5)
+        self.writer.flush()
+        self.assertEqual(self.service.attempts, 1)
+        self.assertEqual(len(self.spooled_rows()), 5)
+
+        self.writer.flush()
+        self.assertEqual(self.service.attempts, 1, "flush during backoff must not retry")
+
+        self.writer._retry_at = 0.0
+        self.writer.flush()
+        self.assertEqual(self.service.attempts, 2)
+        self.assertEqual(len(self.spooled_rows()), 5)
+        self.assertEqual(self.writer.stats()["spooled"], 5, "re-spooled entries counted again")
+        self.assertEqual(self.log_error.call_count, 1)
+
+        self.service.down = False
+        self.log(2)
+        self.writer._retry_at = 0.0
+        self.writer.flush()
+        self.assertEqual(len(self.service.rows), 7)
+        self.assertEqual(self.spooled_rows(), [])
+        self.assertEqual(self.writer.failures, 0)
+        self.log_info.assert_called_once()
+
+    def test_backoff_grows_and_is_capped(self):
+        self.writer.max_backoff = 200
+        self.service.down = True
+        delays = []
+        for _ in range(4):
+            self.log(1)
+            self.writer._retry_at = 0.0
+            self.writer.flush()
+            delays.append(self.writer._retry_at - audit_writer.time.monotonic())
+        self.assertEqual([round(d) for d in delays], [120, 200, 200, 200])
+
+    def test_close_spools_queue_during_backoff(self):
+        self.service.down = True
+        self.log(1)
+        self.writer.flush()
+        self.log(3)
+        self.writer.close()
+        self.assertEqual(len(self.spooled_rows()), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
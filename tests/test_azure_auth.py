@@ -0,0 +1,109 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.azure_auth import AzureAuth
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class PendingTimer:
+    def is_alive(self):
+        return True
+
+
+class ScheduledAuth(AzureAuth):
+    """
+    Issues tokens of a fixed lifetime on a fake clock and records refresh delays instead of
+    starting Timer threads; tests fire refreshes by calling _background_refresh.
+    """
+
+    def __init__(self, lifetime, min_refresh_interval=5.0, **kwargs):
+        self.fake_clock = FakeClock()
+        super().__init__("client", "secret", "tenant", clock=self.fake_clock, **kwargs)
+        self.min_refresh_interval = min_refresh_interval
+        self.lifetime = lifetime
+        self.fetches = 0
+        self.delays = []
+
+    def _fetch_token(self):
+        self.fetches += 1
+        return f"token-{self.fetches}", self.clock() + self.lifetime
+
+    def _schedule(self, delay):
+        self.delays.append(delay)
+        self._timer = PendingTimer()
+
+    def advance(self, seconds):
+        self.fake_clock.now += seconds
+
+
+class RefreshSchedulingTest(unittest.TestCase):
+    def test_token_shorter_than_margin_does_not_refresh_in_a_loop(self):
+        auth = ScheduledAuth(lifetime=60, refresh_margin=300)
+        self.assertEqual(auth.get_access_token(), "token-1")
+        self.assertEqual(auth.delays, [30])
+        auth.advance(10)
+        auth._background_refresh()
+        self.assertEqual(auth.fetches, 1)
+        for _ in range(3):
+            auth.advance(auth.delays[-1])
+            auth._background_refresh()
+        self.assertEqual(auth.fetches, 4)
+        self.assertEqual(auth.delays, [30, 30, 30, 30])
+
+    def test_refresh_happens_margin_before_expiry(self):
+        auth = ScheduledAuth(lifetime=3600, refresh_margin=300)
+        auth.get_access_token()
+        self.assertEqual(auth.delays, [3300])
+        auth.advance(3299)
+        auth._background_refresh()
+        self.assertEqual(auth.get_access_token(), "token-1")
+        auth.advance(1)
+        auth._background_refresh()
+        self.assertEqual(auth.get_access_token(), "token-2")
+
+    def test_refresh_delay_has_a_floor(self):
+        auth = ScheduledAuth(lifetime=0, refresh_margin=300, min_refresh_interval=10)
+        auth.authenticate()
+        self.assertEqual(auth.delays, [10])
+        self.assertEqual(auth.refresh_at, auth.clock() + 10)
+
+    def test_failed_refresh_retries_later_and_keeps_the_token(self):
+        auth = ScheduledAuth(lifetime=600, refresh_margin=300)
+        auth.get_access_token()
+        auth.advance(300)
+        auth._fetch_token = lambda: (_ for _ in ()).throw(IOError("token endpoint down"))
+        auth._background_refresh()
+        self.assertEqual(auth.delays, [300, auth.retry_interval])
+        self.assertEqual(auth.get_access_token(), "token-1")
+
+    def test_expired_token_is_fetched_synchronously(self):
+        auth = ScheduledAuth(lifetime=600, refresh_margin=300)
+        auth.get_access_token()
+        auth.advance(601)
+        self.assertFalse(auth.is_token_valid())
+        self.assertEqual(auth.get_access_token(), "token-2")
+
+    def test_missed_timer_refreshes_without_blocking_the_caller(self):
+        auth = ScheduledAuth(lifetime=600, refresh_margin=300)
+        auth.get_access_token()
+        auth._timer = None
+        auth.advance(300)
+        with mock.patch("services.azure_auth.threading.Thread") as thread:
+            self.assertEqual(auth.get_access_token(), "token-1")
+        thread.assert_called_once_with(target=auth._background_refresh, daemon=True)
+        self.assertEqual(auth.fetches, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from comparison.diff_view import DiffView
+
+
+class FakeAIService:
+    def __init__(self, merge_fails=False):
+        self.merge_fails = merge_fails
+        self.prompts = []
+
+    def generate_json(self, prompt, schema=None, schema_name="response", max_tokens=1024):
+        self.prompts.append(prompt)
+        if prompt.startswith("Each JSON object below"):
+            return None if self.merge_fails else {f: "merged" for f in schema["properties"]}
+        hunk = prompt.count("Hunk (")
+        return {f: f"{f} for {hunk} hunks #{len(self.prompts)}" for f in schema["properties"]}
+
+
+def documents(changes=3, filler=40):
+    lines1, lines2 = [], []
+    for i in range(changes):
+        lines1 += [f"unchanged line {i}-{j}" for j in range(filler)] + [f"old clause {i}"]
+        lines2 += [f"unchanged line {i}-{j}" for j in range(filler)] + [f"new clause {i}"]
+    return "\n".join(lines1), "\n".join(lines2)
+
+
+class ChangeAnalysisTest(unittest.TestCase):
+    def test_legacy_methods_send_only_hunks_and_language(self):
+        ai = FakeAIService()
+        doc1, doc2 = documents()
+        answer = DiffView(azure_ai_service=ai).get_ai_risk_assessment_on_diff(doc1, doc2, lang1="de", lang2="de")
+        self.assertTrue(answer.startswith("risk_assessment"))
+        self.assertNotIn("unchanged line 0-0\n", ai.prompts[0])
+        self.assertIn("'de'", ai.prompts[0])
+
+    def test_failed_merge_keeps_every_partial_answer(self):
+        ai = FakeAIService(merge_fails=True)
+        doc1, doc2 = documents()
+        with mock.patch("utils.helpers.log_error") as log_error:
+            result = DiffView(azure_ai_service=ai).get_ai_change_analysis(
+                doc1, doc2, facets=["explanation"], token_budget=40, context=0
+            )
+        log_error.assert_called()
+        self.assertEqual(result["explanation"].count("explanation for 1 hunks"), 3)
+
+    def test_oversized_hunks_are_split_without_loss(self):
+        ai = FakeAIService()
+        doc1 = "\n".join(f"old clause {i} " + "x" * 30 for i in range(400)) + "\n" + "~" * 3000
+        doc2 = "\n".join(f"new clause {i} " + "x" * 30 for i in range(300))
+        DiffView(azure_ai_service=ai).get_ai_change_analysis(doc1, doc2, facets=["explanation"], token_budget=300)
+        hunk_prompts = "\n".join(p for p in ai.prompts if not p.startswith("Each JSON object below"))
+        for i in range(400):
+            self.assertIn(f"old clause {i} ", hunk_prompts)
+        for i in range(300):
+            self.assertIn(f"new clause {i} ", hunk_prompts)
+        self.assertEqual(hunk_prompts.count("~"), 3000)
+        self.assertNotIn("truncated", hunk_prompts)
+        self.assertNotIn("more lines", hunk_prompts)
+
+    def test_status_reports_fallbacks(self):
+        doc1, doc2 = documents()
+        facets = ["explanation"]
+        self.assertEqual(DiffView().get_ai_change_analysis_with_status(doc1, doc2, facets)[1], False)
+        self.assertEqual(DiffView(azure_ai_service=FakeAIService()).get_ai_change_analysis_with_status(
+            doc1, doc2, facets)[1], True)
+        failing = mock.Mock()
+        failing.generate_json.return_value = None
+        values, complete = DiffView(azure_ai_service=failing).get_ai_change_analysis_with_status(doc1, doc2, facets)
+        self.assertFalse(complete)
+        self.assertEqual(values["explanation"], "AI explanation not available.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.helpers import estimate_tokens, split_by_token_budget
+
+
+def paragraphs(count=600, seed=7):
+    rng = random.Random(seed)
+    words = ["contract", "party", "payment", "term", "notice", "clause", "service", "liability", "data", "fee"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(5, 60))) + "." for _ in range(count)]
+
+
+class SplitByTokenBudgetTest(unittest.TestCase):
+    def test_chunks_fit_budget_and_keep_all_text(self):
+        paras = paragraphs()
+        chunks = split_by_token_budget("\n\n".join(paras), max_tokens=1000)
+        self.assertTrue(all(estimate_tokens(c) <= 1000 for c in chunks))
+        self.assertEqual("\n\n".join(chunks), "\n\n".join(paras))
+
+    def test_early_edit_only_changes_nearby_chunks(self):
+        paras = paragraphs()
+        before = split_by_token_budget("\n\n".join(paras), max_tokens=1000)
+        self.assertGreater(len(before), 20)
+        for index in (0, 3, 10, 50):
+            edited = list(paras)
+            edited[index] += " An inserted sentence that changes the length of this paragraph."
+            after = split_by_token_budget("\n\n".join(edited), max_tokens=1000)
+            self.assertLessEqual(len(set(after) - set(before)), 2, index)
+
+
+if __name__ == "__main__":
+    unittest.main()
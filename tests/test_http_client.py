@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services import http_client
+from services.http_client import (AzureHttpClient, CircuitBreaker, CircuitOpenError, RetryableError,
+                                  ServiceUnavailableError, get_client)
+
+
+def fail(timeout):
+    raise RetryableError(status=500)
+
+
+def succeed(timeout):
+    return "ok"
+
+
+class BreakerLimiterTest(unittest.TestCase):
+    def make_client(self):
+        return AzureHttpClient("test", rate=1000, burst=1, max_retries=0, failure_threshold=1,
+                               recovery_time=0.05, max_queue_wait=0.01)
+
+    def test_breaker_recovers_after_limiter_refuses_half_open_trial(self):
+        client = self.make_client()
+        with self.assertRaises(RetryableError):
+            client.execute(fail)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        time.sleep(0.06)
+        client.limiter.pause(0.2)
+        with self.assertRaises(ServiceUnavailableError) as refused:
+            client.execute(succeed)
+        self.assertNotIsInstance(refused.exception, CircuitOpenError)
+        self.assertFalse(client.breaker._trial_in_flight)
+        time.sleep(0.25)
+        self.assertEqual(client.execute(succeed), "ok")
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_breaker_rejects_without_taking_a_token(self):
+        client = self.make_client()
+        with self.assertRaises(RetryableError):
+            client.execute(fail)
+        tokens = client.limiter.tokens
+        with self.assertRaises(CircuitOpenError):
+            client.execute(succeed)
+        self.assertLessEqual(tokens, client.limiter.tokens)
+
+
+class GetClientTest(unittest.TestCase):
+    def tearDown(self):
+        for key in [k for k in http_client._clients if k.startswith("https://test-")]:
+            del http_client._clients[key]
+            del http_client._client_settings[key]
+
+    def test_settings_apply_to_existing_client(self):
+        first = get_client("https://test-apply.example/path")
+        second = get_client("https://test-apply.example/other", rate=2.5, max_retries=1)
+        self.assertIs(first, second)
+        self.assertEqual(first.limiter.rate, 2.5)
+        self.assertEqual(first.max_retries, 1)
+
+    def test_conflicting_settings_are_rejected(self):
+        get_client("https://test-conflict.example", rate=5)
+        get_client("https://test-conflict.example", rate=5)
+        with self.assertRaises(ValueError):
+            get_client("https://test-conflict.example", rate=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
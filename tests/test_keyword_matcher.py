@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.keyword_matcher import KeywordMatcher
+
+
+def found(keywords, text, case_sensitive=False):
+    return KeywordMatcher(keywords, case_sensitive).found(text)
+
+
+class KeywordMatcherTest(unittest.TestCase):
+    def test_whole_words_only(self):
+        self.assertEqual(found(["audit"], "Audited by the self-audit team."), {"audit"})
+        self.assertEqual(found(["audit"], "Audited twice."), set())
+
+    def test_case_folding(self):
+        self.assertEqual(found(["Policy"], "POLICY"), {"Policy"})
+        self.assertEqual(found(["Policy"], "policy", case_sensitive=True), set())
+
+    def test_symbol_keywords_keep_their_symbols(self):
+        keywords = ["c++", "c#", "node.js"]
+        self.assertEqual(found(keywords, "Written in C++ and C#."), {"c++", "c#"})
+        self.assertEqual(found(keywords, "Written in C, not Java."), set())
+        self.assertEqual(found(keywords, "Deployed with node js"), set())
+        self.assertEqual(found(keywords, "Deployed with Node.js."), {"node.js"})
+        self.assertEqual(found(["c++"], "c + +"), set())
+
+    def test_multi_word_keywords_span_line_breaks(self):
+        matcher = KeywordMatcher(["data protection"])
+        text = "intro\nour data\n  protection policy"
+        [match] = matcher.find_all(text)
+        self.assertEqual(text[match.start:match.end], "data\n  protection")
+        self.assertEqual(matcher.lines(text), {"data protection": [2]})
+        self.assertEqual(found(["data protection"], "dataprotection, data, protection"), set())
+
+    def test_punctuation_between_words_must_match(self):
+        self.assertEqual(found(["opt-in"], "Users opt-in."), {"opt-in"})
+        self.assertEqual(found(["opt-in"], "Users opt in."), set())
+        self.assertEqual(found(["opt in"], "Users opt-in."), set())
+
+    def test_overlapping_and_duplicate_keywords(self):
+        matcher = KeywordMatcher(["data", "data breach", "breach", "data", "Data"])
+        self.assertEqual(matcher.keywords, ["data", "data breach", "breach", "Data"])
+        matches = [(m.keyword, m.start) for m in matcher.find_all("a data breach")]
+        self.assertEqual(sorted(matches), [("Data", 2), ("breach", 7), ("data", 2), ("data breach", 2)])
+
+    def test_empty_and_symbol_free_inputs(self):
+        self.assertEqual(found(["", "   "], "anything"), set())
+        self.assertEqual(found(["audit"], ""), set())
+        self.assertEqual(KeywordMatcher(["", "audit"]).lines("audit"), {"": [], "audit": [1]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services import llm_cache
+from services.llm_cache import LLMResponseCache
+
+
+class LLMResponseCacheTest(unittest.TestCase):
+    def test_concurrent_misses_share_one_call(self):
+        cache = LLMResponseCache()
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            release.wait(5)
+            return "answer"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_call("k", call)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for _ in range(5000):
+            if cache.stats()["coalesced"] == 7:
+                break
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["answer"] * 8)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_failures_are_not_cached(self):
+        cache = LLMResponseCache()
+        fn = mock.Mock(side_effect=[None, "answer"])
+        self.assertIsNone(cache.get_or_call("k", fn))
+        self.assertEqual(cache.get_or_call("k", fn), "answer")
+        self.assertEqual(cache.get_or_call("k", fn), "answer")
+        self.assertEqual(fn.call_count, 2)
+
+    def test_exception_releases_the_flight(self):
+        cache = LLMResponseCache()
+        with self.assertRaises(RuntimeError):
+            cache.get_or_call("k", mock.Mock(side_effect=RuntimeError))
+        self.assertEqual(cache.get_or_call("k", lambda: "answer"), "answer")
+
+    def test_ttl_applies_only_to_sampled_calls(self):
+        cache = LLMResponseCache(ttl=10)
+        with mock.patch.object(llm_cache.time, "monotonic", return_value=100.0):
+            cache.get_or_call("sampled", lambda: "first", temperature=0.3)
+            cache.get_or_call("deterministic", lambda: "first", temperature=0)
+        with mock.patch.object(llm_cache.time, "monotonic", return_value=105.0):
+            self.assertEqual(cache.get_or_call("sampled", lambda: "second", temperature=0.3), "first")
+        with mock.patch.object(llm_cache.time, "monotonic", return_value=111.0):
+            self.assertEqual(cache.get_or_call("sampled", lambda: "second", temperature=0.3), "second")
+            self.assertEqual(cache.get_or_call("deterministic", lambda: "second", temperature=0), "first")
+
+    def test_keys_ignore_whitespace_only(self):
+        key = LLMResponseCache.make_key("gpt", 0, [{"role": "user", "content": "Compare  these\n docs"}])
+        self.assertEqual(key, LLMResponseCache.make_key("gpt", 0, [{"role": "user", "content": "Compare these docs "}]))
+        self.assertNotEqual(key, LLMResponseCache.make_key("gpt", 0.3, [{"role": "user", "content": "Compare these docs"}]))
+        self.assertNotEqual(key, LLMResponseCache.make_key("gpt", 0, [{"role": "system", "content": "Compare these docs"}]))
+
+
+if __name__ == "__main__":
+    unittest.main()
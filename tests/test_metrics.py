@@ -0,0 +1,110 @@
+import math
+import os
+import sys
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.metrics import MetricEngine, cosine_similarity, jaccard_similarity
+
+DOCUMENTS = [
+    "The supplier shall deliver the goods within 30 days.\nPayment is due on delivery.",
+    "The Supplier must deliver the goods within 45 days. Payment is due 30 days after delivery.",
+    "Either party may terminate this agreement with written notice.",
+    "the the the supplier",
+    "",
+]
+
+
+def terms(text):
+    return text.lower().split()
+
+
+def jaccard(a, b):
+    union = a | b
+    return len(a & b) / len(union) if union else 1.0
+
+
+def cosine(a, b):
+    c1, c2 = Counter(a), Counter(b)
+    norm = math.sqrt(sum(v * v for v in c1.values())) * math.sqrt(sum(v * v for v in c2.values()))
+    return sum(c1[t] * c2[t] for t in c1) / norm if norm else 0.0
+
+
+def ngrams(tokens, n):
+    return {tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+
+
+def bm25_overlap(documents, k1=1.5, b=0.75):
+    counts = [Counter(terms(doc)) for doc in documents]
+    lengths = [sum(c.values()) for c in counts]
+    average = sum(lengths) / len(lengths) or 1.0
+    collection = Counter()
+    for c in counts:
+        collection.update(c)
+    total = sum(collection.values())
+    weights = []
+    for c, length in zip(counts, lengths):
+        weights.append({
+            t: tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+            * math.log1p((total - collection[t] + 0.5) / (collection[t] + 0.5))
+            for t, tf in c.items()
+        })
+    result = []
+    for w1 in weights:
+        row = []
+        for w2 in weights:
+            keys = set(w1) | set(w2)
+            maxima = sum(max(w1.get(t, 0), w2.get(t, 0)) for t in keys)
+            row.append(sum(min(w1.get(t, 0), w2.get(t, 0)) for t in keys) / maxima if maxima > 0 else 1.0)
+        result.append(row)
+    return result
+
+
+class MetricEngineTest(unittest.TestCase):
+    def assertMatrix(self, actual, expected):
+        for i, row in enumerate(expected):
+            for j, value in enumerate(row):
+                self.assertAlmostEqual(actual[i][j], value, delta=0.0011, msg=f"[{i}][{j}]")
+
+    def reference(self, similarity):
+        return [[similarity(a, b) for b in DOCUMENTS] for a in DOCUMENTS]
+
+    def test_matrices_match_plain_python(self):
+        result = MetricEngine(ngram_sizes=(2, 3)).compute(DOCUMENTS)
+        pairwise = result["pairwise"]
+        self.assertMatrix(pairwise["jaccard_similarity"],
+                          self.reference(lambda a, b: jaccard(set(terms(a)), set(terms(b)))))
+        self.assertMatrix(pairwise["cosine_similarity"], self.reference(lambda a, b: cosine(terms(a), terms(b))))
+        for n in (2, 3):
+            self.assertMatrix(pairwise[f"ngram_overlap_{n}"],
+                              self.reference(lambda a, b: jaccard(ngrams(terms(a), n), ngrams(terms(b), n))))
+        self.assertMatrix(pairwise["bm25_overlap"], bm25_overlap(DOCUMENTS))
+
+    def test_per_document_metrics_match_plain_python(self):
+        for doc, metrics in zip(DOCUMENTS, MetricEngine().compute(DOCUMENTS)["documents"]):
+            words = doc.split()
+            self.assertEqual(metrics["word_count"], len(words))
+            self.assertEqual(metrics["line_count"], len(doc.splitlines()))
+            self.assertEqual(metrics["char_count"], len(doc))
+            self.assertAlmostEqual(metrics["unique_word_ratio"], len(set(words)) / len(words) if words else 0.0,
+                                   delta=0.0006)
+            self.assertAlmostEqual(metrics["unique_term_ratio"],
+                                   len(set(terms(doc))) / len(words) if words else 0.0, delta=0.0006)
+
+    def test_pair_functions_agree_with_the_engine(self):
+        doc1, doc2 = DOCUMENTS[:2]
+        metrics = MetricEngine().compare(doc1, doc2)
+        self.assertEqual(jaccard_similarity(doc1, doc2), metrics["jaccard_similarity"])
+        self.assertEqual(cosine_similarity(doc1, doc2), metrics["cosine_similarity"])
+
+    def test_unknown_metric_sets_are_rejected(self):
+        with self.assertRaises(ValueError):
+            MetricEngine(["counts", "bogus"])
+        with self.assertRaises(ValueError):
+            MetricEngine(["weighted"], approximate=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from models import Document
+from services.http_client import run_in_context
+
+
+class DocumentCacheTest(unittest.TestCase):
+    def setUp(self):
+        Document.clear_cache()
+        self.addCleanup(Document.clear_cache)
+
+    def test_process_cache_is_bounded_by_characters(self):
+        with mock.patch.object(Document, "_cache_max_chars", 100):
+            self.assertIsNot(Document.for_text("x" * 101), Document.for_text("x" * 101))
+            small = Document.for_text("a" * 60)
+            self.assertIs(Document.for_text("a" * 60), small)
+            Document.for_text("b" * 60)
+            self.assertEqual(list(Document._cache), ["b" * 60])
+            self.assertEqual(Document._cache_chars, 60)
+
+    def test_request_scope_shares_documents_until_it_ends(self):
+        text = "x" * 2000000
+        token = Document.begin_request()
+        try:
+            doc = Document.for_text(text)
+            self.assertIs(Document.for_text(text), doc)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                shared = list(executor.map(run_in_context(Document.for_text), [text, text]))
+            self.assertTrue(all(d is doc for d in shared))
+        finally:
+            Document.end_request(token)
+        self.assertIsNot(Document.for_text(text), doc)
+        self.assertEqual(len(Document._cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from comparison import multilingual
+from comparison.multilingual import MultilingualService, split_sentences
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return [{"translations": [{"text": "[en] " + item["text"]}]} for item in self.body]
+
+
+def translator_up(url, headers, body, session=None):
+    return Response(body)
+
+
+def translator_down(url, headers, body, session=None):
+    return None
+
+
+class ResolveDocumentTest(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"TRANSLATION_MEMORY_PATH": ""}):
+            self.service = MultilingualService(subscription_key="key", endpoint="https://translator.test")
+        self.text = "Dies ist ein deutscher Satz über die Vereinbarung und die Zahlungsbedingungen."
+
+    def test_failed_translation_is_not_cached(self):
+        with mock.patch.object(multilingual, "azure_post_with_retry", translator_down):
+            self.assertEqual(self.service.resolve_document(self.text)[0], self.text)
+        with mock.patch.object(multilingual, "azure_post_with_retry", translator_up):
+            self.assertEqual(self.service.resolve_document(self.text)[0], "[en] " + self.text)
+
+    def test_status_reports_untranslated_documents(self):
+        with mock.patch.object(multilingual, "azure_post_with_retry", translator_down):
+            self.assertFalse(self.service.resolve_document_with_status(self.text)[2])
+        with mock.patch.dict(os.environ, {"TRANSLATION_MEMORY_PATH": ""}):
+            unconfigured = MultilingualService(subscription_key="", endpoint="")
+        with mock.patch.object(unconfigured, "detect_language", return_value="de"):
+            self.assertEqual(unconfigured.resolve_document_with_status(self.text), (self.text, "de", False))
+            self.assertFalse(unconfigured.resolve_document_with_status(self.text)[2])
+        with mock.patch.object(unconfigured, "detect_language", return_value="en"):
+            self.assertTrue(unconfigured.resolve_document_with_status("An English sentence.")[2])
+
+    def test_prepare_document_skips_detection_without_translator(self):
+        with mock.patch.dict(os.environ, {"TRANSLATION_MEMORY_PATH": ""}):
+            service = MultilingualService(subscription_key="", endpoint="")
+        with mock.patch.object(service, "detect_language") as detect:
+            self.assertEqual(service.prepare_document(self.text), self.text)
+            detect.assert_not_called()
+            service.resolve_document(self.text)
+            service.resolve_document(self.text)
+            self.assertEqual(detect.call_count, 1)
+
+
+class RecordingTranslator:
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.sent = []
+
+    def __call__(self, url, headers, body, session=None):
+        self.sent.extend(item["text"] for item in body)
+        response = Response(body)
+        results = response.json()
+        response.json = lambda: [{} if any(f in item["text"] for f in self.failing) else result
+                                 for item, result in zip(body, results)]
+        return response
+
+
+class TranslationMemoryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with mock.patch.dict(os.environ, {"TRANSLATION_MEMORY_PATH": os.path.join(directory.name, "tm.db")}):
+            self.service = MultilingualService(subscription_key="key", endpoint="https://translator.test")
+        self.addCleanup(self.service.translation_memory.close)
+
+    def translate(self, text, translator):
+        with mock.patch.object(multilingual, "azure_post_with_retry", translator):
+            return self.service._translate(text, "en", "de")
+
+    def test_only_new_sentences_are_sent(self):
+        first = RecordingTranslator()
+        self.translate("Erster Satz. Zweiter Satz.", first)
+        self.assertEqual(first.sent, ["Erster Satz.", "Zweiter Satz."])
+        second = RecordingTranslator()
+        text, complete = self.translate("Erster  Satz. Dritter Satz. Zweiter Satz.", second)
+        self.assertEqual(second.sent, ["Dritter Satz."])
+        self.assertEqual(text, "[en] Erster Satz. [en] Dritter Satz. [en] Zweiter Satz.")
+        self.assertTrue(complete)
+        self.assertEqual(self.service.translation_memory.size(), 3)
+
+    def test_whitespace_between_sentences_is_preserved(self):
+        text = "  Titel\n\nErster Satz.   Zweiter Satz!\n\t Dritter Satz?  \n"
+        self.assertEqual("".join(split_sentences(text)), text)
+        translated, complete = self.translate(text, RecordingTranslator())
+        self.assertTrue(complete)
+        self.assertEqual(translated, "  [en] Titel\n\n[en] Erster Satz.   [en] Zweiter Satz!\n\t [en] Dritter Satz?  \n")
+
+    def test_failed_sentences_are_flagged_and_not_remembered(self):
+        text, complete = self.translate("Erster Satz. Kaputter Satz.", RecordingTranslator(failing=("Kaputt",)))
+        self.assertFalse(complete)
+        self.assertEqual(text, "[en] Erster Satz. Kaputter Satz.")
+        self.assertEqual(self.service.translation_memory.size(), 1)
+        retry = RecordingTranslator()
+        self.assertEqual(self.translate("Erster Satz. Kaputter Satz.", retry), ("[en] Erster Satz. [en] Kaputter Satz.", True))
+        self.assertEqual(retry.sent, ["Kaputter Satz."])
+
+    def test_memory_is_keyed_by_language_pair(self):
+        memory = self.service.translation_memory
+        memory.put_many([("Guten  Tag.", "Good day.")], "de", "en")
+        self.assertEqual(memory.get_many(["Guten Tag. "], "de", "en"), {"Guten Tag.": "Good day."})
+        self.assertEqual(memory.get_many(["Guten Tag."], "de", "fr"), {})
+        self.assertEqual(memory.get_many(["Guten Tag."], None, "en"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services import blob_writer
+import numpy as np
+
+from services.blob_writer import BlobWriter, LocalBlobStorageService, json_safe
+from services.result_store import ResultStore
+
+
+class RecordingBlobService(LocalBlobStorageService):
+    def __init__(self, root, fail=()):
+        super().__init__(root)
+        self.fail = fail
+        self.order = []
+
+    def upload_bytes(self, blob_name, data, content_type=None, content_encoding=None):
+        if not blob_name.endswith("manifest.json.gz"):
+            # Sections are slow, so a manifest racing them on another worker would land first.
+            time.sleep(0.05)
+        if any(blob_name.endswith(f"/{name}.json.gz") for name in self.fail):
+            raise IOError("upload failed")
+        super().upload_bytes(blob_name, data, content_type, content_encoding)
+        self.order.append(blob_name.rsplit("/", 1)[-1])
+
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        patcher = mock.patch.object(blob_writer, "log_error")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def store(self, **kwargs):
+        service = RecordingBlobService(self.directory.name, **kwargs)
+        writer = BlobWriter(service, workers=2)
+        return service, writer, ResultStore(service, writer, pipeline_version="test")
+
+    def sections(self):
+        return {"summary": {"metrics": {"a": 1}}, "insights": {"b": 2}, "diff": {}, "charts": {}}
+
+    def test_manifest_is_uploaded_after_every_section(self):
+        service, writer, store = self.store()
+        store.put("h1", "h2", self.sections())
+        self.assertTrue(writer.flush(5))
+        self.assertEqual(service.order[-1], "manifest.json.gz")
+        self.assertEqual(len(service.order), 5)
+        fresh = ResultStore(service, writer, pipeline_version="test")
+        self.assertEqual(fresh.get("h1", "h2").load()["summary"], {"metrics": {"a": 1}})
+
+    def test_manifest_is_not_written_when_a_section_fails(self):
+        service, writer, store = self.store(fail=("charts",))
+        store.put("h1", "h2", self.sections())
+        self.assertTrue(writer.flush(5))
+        self.assertNotIn("manifest.json.gz", service.order)
+        self.assertIsNone(ResultStore(service, writer, pipeline_version="test").get("h1", "h2"))
+
+    def test_memory_and_blob_hits_return_the_same_types(self):
+        service, writer, store = self.store()
+        store.put("h1", "h2", {"insights": {"terms": {"b", "a"}, "span": (1, 2), "score": np.float64(0.5)}})
+        self.assertTrue(writer.flush(5))
+        from_memory = store.get("h1", "h2").load()
+        from_blob = ResultStore(service, writer, pipeline_version="test").get("h1", "h2").load()
+        self.assertEqual(from_memory, {"insights": {"terms": ["a", "b"], "span": [1, 2], "score": 0.5}})
+        self.assertEqual(from_memory, from_blob)
+
+    def test_results_with_fallbacks_are_not_stored(self):
+        service, writer, store = self.store()
+        self.assertIsNone(store.put("h1", "h2", self.sections(), fallbacks=["ai_diff"]))
+        self.assertTrue(writer.flush(5))
+        self.assertEqual(service.order, [])
+        self.assertIsNone(store.get("h1", "h2"))
+
+    def test_degraded_manifest_is_ignored(self):
+        service, writer, store = self.store()
+        writer.store_json(store.blob_name("h1", "h2"), {"pipeline_version": "test", "sections": [],
+                                                        "fallbacks": ["translation"]})
+        self.assertTrue(writer.flush(5))
+        self.assertIsNone(store.get("h1", "h2"))
+
+    def test_unserializable_values_fail_loudly(self):
+        _, _, store = self.store()
+        with self.assertRaises(TypeError):
+            store.put("h1", "h2", {"insights": {"when": object()}})
+
+
+class StoreDocumentTest(unittest.TestCase):
+    def test_documents_are_compressed_on_the_worker_once(self):
+        with tempfile.TemporaryDirectory() as root:
+            service = LocalBlobStorageService(root)
+            writer = BlobWriter(service, workers=1)
+            with mock.patch.object(blob_writer, "compress_text", wraps=blob_writer.compress_text) as compress:
+                first = writer.store_document("contract text")
+                self.assertTrue(writer.flush(5))
+                for _ in range(3):
+                    self.assertEqual(writer.store_document("contract text"), first)
+                self.assertTrue(writer.flush(5))
+            self.assertEqual(compress.call_count, 1)
+            self.assertEqual(blob_writer.decompress_bytes(service.download_bytes(first[1]), first[1]),
+                             b"contract text")
+
+
+class JsonSafeTest(unittest.TestCase):
+    def test_conversions(self):
+        value = {1: frozenset({3, 1}), "nested": [(np.int64(2),), np.array([1.5])], None: True}
+        self.assertEqual(json_safe(value), {"1": [1, 3], "nested": [[2], [1.5]], "null": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import tracemalloc
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils import sketches
+from utils.metrics import MetricEngine
+from utils.sketches import CorpusStatistics, MinHash, count_lines, splitmix64
+
+
+def reference_signature(minhash, hashes):
+    values = np.unique(hashes)
+    return splitmix64(values[:, None] ^ minhash.seeds[None, :]).min(axis=0)
+
+
+class MinHashTest(unittest.TestCase):
+    def test_tiled_update_matches_full_matrix(self):
+        hashes = splitmix64(np.arange(5000, dtype=np.uint64))
+        for max_cells in (64, 1000, 1 << 18):
+            minhash = MinHash(num_perm=64)
+            minhash.update(hashes, max_cells=max_cells)
+            np.testing.assert_array_equal(minhash.signature, reference_signature(minhash, hashes))
+
+    def test_update_temporaries_do_not_grow_with_distinct_tokens(self):
+        hashes = splitmix64(np.arange(200000, dtype=np.uint64))
+        minhash = MinHash()
+        tracemalloc.start()
+        try:
+            minhash.update(hashes)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        # unique() copies the input (1.6 MB); one tile and its mixing temporaries add ~8 MB.
+        self.assertLess(peak, 16 << 20)
+
+
+class CorpusStatisticsTest(unittest.TestCase):
+    def test_terms_are_counted_case_insensitively(self):
+        stats = CorpusStatistics(top_k=5)
+        stats.add_text("Contract contract CONTRACT clause Clause")
+        self.assertEqual(dict(stats.keywords.top())["contract"], 3)
+        self.assertEqual(dict(stats.keywords.top())["clause"], 2)
+
+    def test_text_is_not_copied_whole(self):
+        text = "Alpha beta Gamma delta " * (1 << 18)
+        stats = CorpusStatistics()
+        with mock.patch.object(sketches, "CHUNK_CHARS", 1 << 14):
+            tracemalloc.start()
+            try:
+                stats.add_text(text)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertEqual(stats.tokens, 4 << 18)
+        self.assertLess(peak, len(text) // 2)
+
+
+class LineCountTest(unittest.TestCase):
+    SAMPLES = [
+        "", "one", "one\n", "page one\x0cpage two\rline\n", "a\r\nb\r\n", "a\r\rb", "\n\n",
+        "a\x1cb\x1dc\x1ed\x85e\u2028f\u2029g\vh", "trailing\r", "x\r\n\ny",
+    ]
+
+    def test_matches_splitlines(self):
+        for text in self.SAMPLES:
+            self.assertEqual(count_lines(text), len(text.splitlines()), repr(text))
+
+    def test_approximate_line_counts_are_exact(self):
+        exact = MetricEngine(["counts"]).compute(self.SAMPLES)["documents"]
+        approximate = MetricEngine(["counts"], approximate=True).compute(self.SAMPLES)["documents"]
+        self.assertEqual([d["line_count"] for d in approximate], [d["line_count"] for d in exact])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services import summarizer
+from services.summarizer import ChunkedSummarizer
+
+
+class FlakySummarizer:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, text, language, combine):
+        self.calls.append((text, combine))
+        if combine:
+            return "combined: " + " | ".join(line for line in text.split("\n\n"))
+        section = text.split()[1]
+        return None if section in self.failing else f"summary of section {section}"
+
+
+def document(sections=6):
+    return "\n\n".join(f"Section {i} " + " ".join(["clause"] * 60) for i in range(sections))
+
+
+class ChunkedSummarizerTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(summarizer, "log_error")
+        self.log_error = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_chunk_fails_the_summary(self):
+        fn = FlakySummarizer(failing={"3"})
+        chunked = ChunkedSummarizer(fn, chunk_tokens=100, max_workers=2)
+        self.assertIsNone(chunked.summarize(document()))
+        self.log_error.assert_called_once()
+        self.assertFalse(any(combine for _, combine in fn.calls))
+
+    def test_retry_summarizes_only_the_failed_chunk(self):
+        fn = FlakySummarizer(failing={"3"})
+        chunked = ChunkedSummarizer(fn, chunk_tokens=100, max_workers=2)
+        chunked.summarize(document())
+        fn.failing.clear()
+        fn.calls.clear()
+        summary = chunked.summarize(document())
+        for i in range(6):
+            self.assertIn(f"summary of section {i}", summary)
+        self.assertEqual([text.split()[1] for text, combine in fn.calls if not combine], ["3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from models import Document
+from utils import tokenizer
+from utils.tokenizer import StaleVocabularyError, Vocabulary, encode_documents, term_frequencies
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+class VocabularyTest(unittest.TestCase):
+    def setUp(self):
+        self.vocabulary = Vocabulary(max_terms=10)
+        patcher = mock.patch.object(tokenizer, "VOCABULARY", self.vocabulary)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_encode_documents_re_encodes_across_a_reset(self):
+        doc1 = Document("a", "alpha beta gamma beta")
+        doc2 = Document("b", "beta delta")
+        stale = doc1.term_ids
+        self.vocabulary.encode(words("filler", 12).split())
+        self.vocabulary.encode(["trigger"])
+        self.assertEqual(self.vocabulary.generation, 1)
+        ids1, ids2 = encode_documents([doc1, doc2])
+        self.assertIsNot(ids1, stale)
+        self.assertEqual(self.vocabulary.terms(ids1, self.vocabulary.generation), list(doc1.lower_words))
+        self.assertEqual(self.vocabulary.terms(ids2, self.vocabulary.generation), list(doc2.lower_words))
+        self.assertEqual(ids1[1], ids2[0])
+
+    def test_documents_larger_than_the_vocabulary_use_a_private_one(self):
+        doc1 = Document("a", words("term", 12) + " shared")
+        doc2 = Document("b", "shared " + words("other", 12))
+        ids1, ids2 = encode_documents([doc1, doc2])
+        self.assertGreaterEqual(self.vocabulary.generation, 3)
+        self.assertEqual(ids1[-1], ids2[0])
+        self.assertEqual(len(np.intersect1d(ids1, ids2)), 1)
+
+    def test_stale_ids_are_rejected(self):
+        ids, generation = self.vocabulary.encode(["alpha", "beta"])
+        self.assertEqual(term_frequencies(ids, generation=generation), {"alpha": 1, "beta": 1})
+        self.vocabulary.encode(words("filler", 10).split())
+        self.vocabulary.encode(["gamma"])
+        with self.assertRaises(StaleVocabularyError):
+            self.vocabulary.terms(ids, generation)
+        with self.assertRaises(StaleVocabularyError):
+            self.vocabulary.terms(np.array([5]))
+
+    def test_lookup_does_not_grow_the_vocabulary(self):
+        self.vocabulary.encode(["alpha"])
+        ids, generation = self.vocabulary.lookup(["alpha", "unknown"])
+        self.assertEqual(ids.tolist(), [0, -1])
+        self.assertEqual(generation, 0)
+        self.assertEqual(len(self.vocabulary), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()